@@ -248,3 +248,59 @@ CORS_ALLOW_HEADERS = (
 # https://docs.djangoproject.com/en/2.0/howto/static-files/
 
 STATIC_URL = '/static/'
+
+# 自动化测试并发执行线程数，1为按用例顺序串行执行
+AUTOMATION_TEST_WORKERS = 1
+
+# 接口请求按host复用keep-alive连接，每个host保留的最大连接数
+HTTP_POOL_SIZE = 10
+# host会话空闲超过该秒数后释放
+HTTP_SESSION_IDLE_TIMEOUT = 60
+
+# 自动化测试执行引擎，thread 线程执行，async 使用asyncio执行
+AUTOMATION_TEST_ENGINE = 'thread'
+# asyncio引擎下每个host同时发送的最大请求数
+ASYNC_HOST_CONCURRENCY = 100
+# asyncio引擎下读写数据库的线程数
+ASYNC_DB_WORKERS = 4
+
+# 缓存，用于保存用例接口执行计划；web服务与定时任务分进程部署时可改为memcached/redis等共享缓存，
+# 使用locmem时run_scheduler调度进程不缓存执行计划
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+# 用例接口执行计划缓存时间（秒）
+PLAN_CACHE_TIMEOUT = 3600
+
+# 自动化测试结果批量写入数据库的条数
+AUTO_RESULT_BATCH_SIZE = 100
+# 自动化测试执行进程数，大于1时按用例拆分到多个进程执行，用于返回内容较大、校验耗CPU的项目
+AUTOMATION_TEST_PROCESSES = 1
+# 智能执行时，从未变更的接口中随机抽取执行的比例
+SMART_TEST_SAMPLE_RATE = 0.1
+# 解析接口返回内容使用的JSON库: json、simplejson、ujson、orjson，未安装时使用json
+JSON_BACKEND = 'json'
+# 测试结果返回内容压缩方式: zlib、lzma，None为不压缩
+RESPONSE_COMPRESSION = 'zlib'
+# 返回内容超过该字节数时压缩保存
+RESPONSE_COMPRESSION_THRESHOLD = 1024
+# 返回内容超过该字符数时按内容去重保存，None为不去重
+RESPONSE_BLOB_THRESHOLD = 1024
+# 定时任务调度方式: crontab 每次执行写入crontab，daemon 由run_scheduler命令启动的常驻进程调度
+SCHEDULER_MODE = 'crontab'
+# daemon调度时同时执行的任务数
+SCHEDULER_WORKERS = 4
+# daemon调度时检查任务的间隔（秒）
+SCHEDULER_POLL_INTERVAL = 10
+# 定时任务开始时间错开的范围（秒），各任务按ID分散在该范围内，避免同时开始，0为不错开
+SCHEDULER_SPREAD_WINDOW = 120
+# 上一次执行未结束时的默认处理方式: skip 跳过，queue 排队，cancel 取消上一次，定时任务可单独设置
+RUN_OVERLAP_POLICY = 'skip'
+# 执行中的任务更新心跳的间隔（秒）
+RUN_QUEUE_HEARTBEAT = 10
+# 心跳超过该秒数未更新的执行视为进程已退出
+RUN_QUEUE_LOCK_TIMEOUT = 300
+# 所有进程同时执行的任务总数上限，0为不限制
+RUN_MAX_CONCURRENT = 10
@@ -15,6 +15,11 @@ class PrimaryBlogConfig(AppConfig):
     name = get_current_app_name(__file__)
     verbose_name = VERBOSE_APP_NAME
 
+    def ready(self):
+        from api_test.common import plan, selection
+        plan.connect_signals()
+        selection.connect_signals()
+
 
 # from django.contrib import admin
 # # from hys_operation.models import *
@@ -8,7 +8,7 @@ from api_test.models import Project, GlobalHost, ApiGroupLevelFirst, ApiInfo, \
     AutomationGroupLevelFirst, AutomationTestCase, AutomationParameter, AutomationCaseApi, \
     AutomationTestResult, AutomationTestTask, AutomationHead, UserProfile, ApiHead, ApiParameter, ApiResponse, \
     ApiParameterRaw, AutomationParameterRaw, AutomationResponseJson, AutomationTaskRunTime, AutomationReportSendConfig, \
-    VisitorsRecord
+    VisitorsRecord, AutomationLoadTestRun, AutomationLoadTestResult, AutomationRunQueue
 
 from django.contrib import admin
 from django.utils.text import capfirst
@@ -150,7 +150,7 @@ class GlobalHostForm(admin.ModelAdmin):
     ordering = ('id',)
     fieldsets = ([
         'Host配置', {
-            'fields': ('project', 'name', 'host', 'description', 'status')
+            'fields': ('project', 'name', 'host', 'description', 'status', 'maxConcurrency', 'requestsPerSecond')
         }],)
 
 
@@ -337,7 +337,11 @@ class AutomationTestResultForm(ReadOnlyModelAdmin):
     fieldsets = ([
         '测试结果', {
             'fields': ('automationCaseApi', 'testTime', 'url', 'requestType', 'header', 'parameter', 'statusCode',
-                       'examineType', 'data', 'result', 'httpStatus', 'responseData')
+                       'examineType', 'data', 'result', 'examineMessage', 'httpStatus', 'contentType',
+                       'responseData', 'responseBody')
+        }], [
+        '请求耗时', {
+            'fields': ('dnsTime', 'connectTime', 'tlsTime', 'firstByteTime', 'downloadTime', 'responseSize')
         }],)
 
 
@@ -354,7 +358,8 @@ class AutomationTestTaskForm(admin.ModelAdmin):
     fieldsets = ([
           '测试任务', {
                 'fields': ('project', 'Host', 'name', 'type', 'frequency',
-                           'unit', 'startTime', 'endTime')
+                           'unit', 'startTime', 'endTime', 'case', 'virtualUsers', 'duration', 'iterations',
+                           'overlapPolicy', 'priority', 'cases', 'workers')
             }],)
 
 
@@ -362,19 +367,61 @@ admin.site.register(AutomationTestTask, AutomationTestTaskForm)
 
 
 class AutomationTaskRunTimeForm(admin.ModelAdmin):
-    list_display = ('id', 'project', 'startTime', 'elapsedTime')
+    list_display = ('id', 'project', 'startTime', 'elapsedTime', 'status', 'total', 'passCount')
     list_display_links = ('id', 'project')
     list_per_page = 20
     ordering = ('id',)
     fieldsets = ([
         '任务执行时间', {
-            'fields': ('project', 'startTime', 'elapsedTime', 'host')
+            'fields': ('project', 'task', 'startTime', 'endTime', 'elapsedTime', 'duration', 'queueDelay', 'host',
+                       'status')
+        }], [
+        '执行结果', {
+            'fields': ('total', 'passCount', 'failCount', 'errorCount', 'timeoutCount')
         }],)
 
 
 admin.site.register(AutomationTaskRunTime, AutomationTaskRunTimeForm)
 
 
+class AutomationRunQueueForm(admin.ModelAdmin):
+    list_display = ('id', 'project', 'task', 'type', 'priority', 'status', 'scheduledTime', 'startTime', 'queueDelay',
+                    'endTime')
+    list_display_links = ('id', 'project')
+    list_filter = ('status', 'type')
+    list_per_page = 20
+    ordering = ('-id',)
+    fieldsets = ([
+        '任务执行队列', {
+            'fields': ('project', 'task', 'Host', 'type', 'priority', 'status', 'cancelRequested', 'run', 'worker',
+                       'scheduledTime', 'startTime', 'queueDelay', 'endTime', 'heartbeat')
+        }],)
+
+
+admin.site.register(AutomationRunQueue, AutomationRunQueueForm)
+
+
+class AutomationLoadTestResultInRun(admin.TabularInline):
+    model = AutomationLoadTestResult
+    exclude = ('histogram',)
+
+
+class AutomationLoadTestRunForm(admin.ModelAdmin):
+    inlines = [AutomationLoadTestResultInRun]
+    list_display = ('id', 'project', 'case', 'startTime', 'virtualUsers', 'elapsedTime')
+    list_display_links = ('id', 'project')
+    list_filter = ('project',)
+    list_per_page = 20
+    ordering = ('id',)
+    fieldsets = ([
+        '压测执行记录', {
+            'fields': ('project', 'case', 'host', 'startTime', 'elapsedTime', 'virtualUsers', 'duration', 'iterations')
+        }],)
+
+
+admin.site.register(AutomationLoadTestRun, AutomationLoadTestRunForm)
+
+
 class ProjectMemberForm(admin.ModelAdmin):
     search_fields = ('user', 'project')
     list_display = ('id', 'permissionType', 'project', 'user')
@@ -18,18 +18,20 @@ from rest_framework.views import APIView
 from api_test.common.WriteExcel import Write
 from api_test.common.addTask import add
 from api_test.common.api_response import JsonResponse
+from api_test.common.auto_test import rerun_failures
+from api_test.common.blob_store import release
 from api_test.common.common import record_dynamic, create_json, del_task_crontab
 from api_test.common.confighttp import test_api
 from api_test.models import Project, AutomationGroupLevelFirst, \
     AutomationTestCase, AutomationCaseApi, AutomationParameter, GlobalHost, AutomationHead, AutomationTestTask, \
-    AutomationTestResult, ApiInfo, AutomationParameterRaw, AutomationResponseJson
+    AutomationTestResult, ApiInfo, AutomationParameterRaw, AutomationResponseJson, AutomationTaskRunTime
 
 from api_test.serializers import AutomationGroupLevelFirstSerializer, AutomationTestCaseSerializer, \
     AutomationCaseApiSerializer, AutomationCaseApiListSerializer, AutomationTestTaskSerializer, \
     AutomationTestResultSerializer, ApiInfoSerializer, CorrelationDataSerializer, AutomationTestReportSerializer, \
     AutomationTestCaseDeserializer, AutomationCaseApiDeserializer, AutomationHeadDeserializer, \
     AutomationParameterDeserializer, AutomationTestTaskDeserializer, ProjectSerializer, ApiInfoDocSerializer, \
-    AutomationCaseDownloadSerializer, AutomationCaseDownSerializer
+    AutomationCaseDownloadSerializer, AutomationCaseDownSerializer, AutomationTaskRunTimeSerializer
 
 logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
 
@@ -1051,7 +1053,9 @@ class StartTest(APIView):
             obj = AutomationCaseApi.objects.get(id=data["id"], automationTestCase=data["case_id"])
         except ObjectDoesNotExist:
             return JsonResponse(code="999990", msg="接口不存在！")
-        AutomationTestResult.objects.filter(automationCaseApi=data["id"]).delete()
+        results = AutomationTestResult.objects.filter(automationCaseApi=data["id"])
+        release(results)
+        results.delete()
         try:
             result = test_api(host_id=data["host_id"], case_id=data["case_id"],
                               _id=data["id"], project_id=data["project_id"])
@@ -1066,6 +1070,68 @@ class StartTest(APIView):
         }, code="999999", msg="成功！")
 
 
+class RerunFailed(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = ()
+
+    def parameter_check(self, data):
+        """
+        校验参数
+        :param data:
+        :return:
+        """
+        try:
+            # 校验project_id, run_id, host_id类型为int
+            if not data["project_id"] or not data["run_id"] or not data["host_id"]:
+                return JsonResponse(code="999996", msg="参数有误！")
+            if not isinstance(data["project_id"], int) or not isinstance(data["run_id"], int) \
+                    or not isinstance(data["host_id"], int):
+                return JsonResponse(code="999996", msg="参数有误！")
+        except KeyError:
+            return JsonResponse(code="999996", msg="参数有误！")
+
+    def post(self, request):
+        """
+        重新执行某次自动测试中未通过的接口
+        :param request:
+        :return:
+        """
+        data = JSONParser().parse(request)
+        result = self.parameter_check(data)
+        if result:
+            return result
+        try:
+            pro_data = Project.objects.get(id=data["project_id"])
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999995", msg="项目不存在！")
+        pro_data = ProjectSerializer(pro_data)
+        if not pro_data.data["status"]:
+            return JsonResponse(code="999985", msg="该项目已禁用")
+        try:
+            GlobalHost.objects.get(id=data["host_id"], project=data["project_id"])
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999992", msg="host不存在！")
+        try:
+            run = AutomationTaskRunTime.objects.get(id=data["run_id"], project=data["project_id"])
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999996", msg="参数有误！")
+        if run.status == 'running':
+            return JsonResponse(code="999983", msg="执行中，请稍后重试！")
+        try:
+            count = rerun_failures(data["host_id"], data["project_id"], run.id)
+        except Exception as e:
+            logging.exception(e)
+            return JsonResponse(code="999998", msg="失败！")
+        run.refresh_from_db()
+        record_dynamic(project=data["project_id"],
+                       _type="测试", operationObject="自动化测试",
+                       user=request.user.pk, data="重新执行“%s”未通过的接口" % run.startTime)
+        return JsonResponse(data={
+            "count": count,
+            "run": AutomationTaskRunTimeSerializer(run).data
+        }, code="999999", msg="成功！")
+
+
 class AddTimeTask(APIView):
     authentication_classes = (TokenAuthentication,)
     permission_classes = ()
@@ -1083,7 +1149,32 @@ class AddTimeTask(APIView):
                 return JsonResponse(code="999996", msg="参数有误！")
             if not isinstance(data["project_id"], int) or not isinstance(data["Host_id"], int):
                 return JsonResponse(code="999996", msg="参数有误！")
-            if data["type"] not in ["circulation", "timing"]:
+            if data["type"] not in ["circulation", "timing", "load"]:
+                return JsonResponse(code="999996", msg="参数有误！")
+            if data["type"] == "load":
+                # 压测任务 case_id 用例, virtualUsers 虚拟用户数, duration 压测时长(秒)与 iterations 每用户执行次数至少一个
+                if not isinstance(data["case_id"], int) or not isinstance(data["virtualUsers"], int) or \
+                        data["virtualUsers"] < 1:
+                    return JsonResponse(code="999996", msg="参数有误！")
+                duration = data.get("duration")
+                iterations = data.get("iterations")
+                if not duration and not iterations:
+                    return JsonResponse(code="999996", msg="参数有误！")
+                for i in (duration, iterations):
+                    if i is not None and (not isinstance(i, int) or i < 0):
+                        return JsonResponse(code="999996", msg="参数有误！")
+            # overlapPolicy 上一次执行未结束时的处理方式, priority 排队优先级
+            if data.get("overlapPolicy") not in [None, "skip", "queue", "cancel"]:
+                return JsonResponse(code="999996", msg="参数有误！")
+            if not isinstance(data.get("priority", 0), int):
+                return JsonResponse(code="999996", msg="参数有误！")
+            # id 修改的任务ID, case_ids 执行的用例ID（为空时执行全部用例）, workers 并发线程数
+            if data.get("id") is not None and not isinstance(data["id"], int):
+                return JsonResponse(code="999996", msg="参数有误！")
+            case_ids = data.get("case_ids") or []
+            if not isinstance(case_ids, list) or not all(isinstance(i, int) for i in case_ids):
+                return JsonResponse(code="999996", msg="参数有误！")
+            if data.get("workers") is not None and (not isinstance(data["workers"], int) or data["workers"] < 1):
                 return JsonResponse(code="999996", msg="参数有误！")
             try:
                 start_time = datetime.strptime(data["startTime"], "%Y-%m-%d %H:%M:%S")
@@ -1095,9 +1186,32 @@ class AddTimeTask(APIView):
         except KeyError:
             return JsonResponse(code="999996", msg="参数有误！")
 
+    @staticmethod
+    def get_task(data):
+        """
+        要修改的任务，指定id时为该任务，否则为项目下同名的任务
+        :param data:
+        :return:
+        """
+        if data.get("id"):
+            return AutomationTestTask.objects.get(id=data["id"], project=data["project_id"])
+        return AutomationTestTask.objects.get(name=data["name"], project=data["project_id"])
+
+    @staticmethod
+    def duplicate_name(data):
+        """
+        其他项目或本项目的其他任务存在相同名称
+        :param data:
+        :return:
+        """
+        task_name = AutomationTestTask.objects.filter(name=data["name"]).exclude(project=data["project_id"])
+        if data.get("id"):
+            task_name = AutomationTestTask.objects.filter(name=data["name"]).exclude(id=data["id"])
+        return task_name.exists()
+
     def post(self, request):
         """
-        添加测试任务
+        添加测试任务，指定id时修改该任务，同一项目可添加多个任务
         :param request:
         :return:
         """
@@ -1123,6 +1237,9 @@ class AddTimeTask(APIView):
             host_data = GlobalHost.objects.get(id=data["Host_id"], project=data["project_id"])
         except ObjectDoesNotExist:
             return JsonResponse(code="999992", msg="host不存在！")
+        cases = AutomationTestCase.objects.filter(id__in=data.get("case_ids") or [], project=data["project_id"])
+        if len(cases) != len(set(data.get("case_ids") or [])):
+            return JsonResponse(code="999987", msg="用例不存在！")
         if data["type"] == "circulation":
             if not data["frequency"]:
                 return JsonResponse(code="999996", msg="参数有误！")
@@ -1130,56 +1247,96 @@ class AddTimeTask(APIView):
                 return JsonResponse(code="999996", msg="参数有误！")
             if data["unit"] not in ["m", "h", "d", "w"]:
                 return JsonResponse(code="999996", msg="参数有误！")
-            task_name = AutomationTestTask.objects.filter(name=data["name"]).exclude(project=data["project_id"])
-            if len(task_name):
+            if self.duplicate_name(data):
                 return JsonResponse(code="999997", msg="存在相同名称！")
             else:
                 try:
-                    rt = AutomationTestTask.objects.get(project=data["project_id"])
+                    rt = self.get_task(data)
                     serialize = AutomationTestTaskDeserializer(data=data)
                     if serialize.is_valid():
                         serialize.update(instance=rt, validated_data=data)
-                        task_id = serialize.data.get("id")
+                        task_id = rt.id
                     else:
                         return JsonResponse(code="999996", msg="参数有误！")
                 except ObjectDoesNotExist:
+                    if data.get("id"):
+                        return JsonResponse(code="999986", msg="任务不存在！")
                     serialize = AutomationTestTaskDeserializer(data=data)
                     if serialize.is_valid():
                         serialize.save(project=pro_id, Host=host_data)
-                        task_id = serialize.data.get("id")
+                        task_id = serialize.instance.id
                     else:
                         return JsonResponse(code="999996", msg="参数有误！")
             record_dynamic(project=data["project_id"],
                            _type="新增", operationObject="任务",
                            user=request.user.pk, data="新增循环任务\"%s\"" % data["name"])
+            if "case_ids" in data:
+                AutomationTestTask.objects.get(id=task_id).cases.set(cases)
+            add(host_id=data["Host_id"], _type=data["type"], project=str(data["project_id"]),
+                start_time=start_time, end_time=end_time, frequency=data["frequency"], unit=data["unit"],
+                task_id=task_id)
+
+        elif data["type"] == "load":
+            try:
+                case_data = AutomationTestCase.objects.get(id=data["case_id"], project=data["project_id"])
+            except ObjectDoesNotExist:
+                return JsonResponse(code="999987", msg="用例不存在！")
+            if self.duplicate_name(data):
+                return JsonResponse(code="999997", msg="存在相同名称！")
+            else:
+                try:
+                    rt = self.get_task(data)
+                    serialize = AutomationTestTaskDeserializer(data=data)
+                    if serialize.is_valid():
+                        serialize.update(instance=rt, validated_data=data)
+                        task_id = rt.id
+                    else:
+                        return JsonResponse(code="999996", msg="参数有误！")
+                except ObjectDoesNotExist:
+                    if data.get("id"):
+                        return JsonResponse(code="999986", msg="任务不存在！")
+                    serialize = AutomationTestTaskDeserializer(data=data)
+                    if serialize.is_valid():
+                        serialize.save(project=pro_id, Host=host_data, case=case_data)
+                        task_id = serialize.instance.id
+                    else:
+                        return JsonResponse(code="999996", msg="参数有误！")
+            record_dynamic(project=data["project_id"],
+                           _type="新增", operationObject="任务",
+                           user=request.user.pk, data="新增压测任务\"%s\"" % data["name"])
             add(host_id=data["Host_id"], _type=data["type"], project=str(data["project_id"]),
-                start_time=start_time, end_time=end_time, frequency=data["frequency"], unit=data["unit"])
+                start_time=start_time, end_time=end_time, case_id=data["case_id"],
+                virtual_users=data["virtualUsers"], duration=data.get("duration"), iterations=data.get("iterations"),
+                task_id=task_id)
 
         else:
-            task_name = AutomationTestTask.objects.filter(name=data["name"]).exclude(project=data["project_id"])
-            if len(task_name):
+            if self.duplicate_name(data):
                 return JsonResponse(code="999997", msg="存在相同名称！")
             else:
                 try:
-                    rt = AutomationTestTask.objects.get(project=data["project_id"])
+                    rt = self.get_task(data)
                     serialize = AutomationTestTaskDeserializer(data=data)
                     if serialize.is_valid():
                         serialize.update(instance=rt, validated_data=data)
-                        task_id = serialize.data.get("id")
+                        task_id = rt.id
                     else:
                         return JsonResponse(code="999996", msg="参数有误！")
                 except ObjectDoesNotExist:
+                    if data.get("id"):
+                        return JsonResponse(code="999986", msg="任务不存在！")
                     serialize = AutomationTestTaskDeserializer(data=data)
                     if serialize.is_valid():
                         serialize.save(project=pro_id, Host=host_data)
-                        task_id = serialize.data.get("id")
+                        task_id = serialize.instance.id
                     else:
                         return JsonResponse(code="999996", msg="参数有误！")
             record_dynamic(project=data["project_id"],
                            _type="新增", operationObject="任务",
                            user=request.user.pk, data="新增定时任务\"%s\"" % data["name"])
+            if "case_ids" in data:
+                AutomationTestTask.objects.get(id=task_id).cases.set(cases)
             add(host_id=data["Host_id"], _type=data["type"], project=str(data["project_id"]),
-                start_time=start_time, end_time=end_time)
+                start_time=start_time, end_time=end_time, task_id=task_id)
         return JsonResponse(data={"task_id": task_id}, code="999999", msg="成功！")
 
 
@@ -1190,11 +1347,14 @@ class GetTask(APIView):
     def get(self, request):
         """
         获取测试用例执行任务
+        project_id 项目ID
+        task_id 任务ID，为空时返回项目下最早添加的任务
         :param request:
         :return:
         """
         project_id = request.GET.get("project_id")
-        if not project_id.isdecimal():
+        task_id = request.GET.get("task_id")
+        if not project_id.isdecimal() or (task_id and not task_id.isdecimal()):
             return JsonResponse(code="999996", msg="参数有误！")
         try:
             pro_data = Project.objects.get(id=project_id)
@@ -1203,11 +1363,39 @@ class GetTask(APIView):
         pro_data = ProjectSerializer(pro_data)
         if not pro_data.data["status"]:
             return JsonResponse(code="999985", msg="该项目已禁用")
+        tasks = AutomationTestTask.objects.filter(project=project_id).order_by("id")
+        if task_id:
+            tasks = tasks.filter(id=task_id)
+        task = tasks.first()
+        if task:
+            return JsonResponse(code="999999", msg="成功！", data=AutomationTestTaskSerializer(task).data)
+        return JsonResponse(code="999999", msg="成功！")
+
+
+class TaskList(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = ()
+
+    def get(self, request):
+        """
+        项目下的全部执行任务
+        project_id 项目ID
+        :param request:
+        :return:
+        """
+        project_id = request.GET.get("project_id")
+        if not project_id or not project_id.isdecimal():
+            return JsonResponse(code="999996", msg="参数有误！")
         try:
-            obj = AutomationTestTaskSerializer(AutomationTestTask.objects.get(project=project_id)).data
-            return JsonResponse(code="999999", msg="成功！", data=obj)
+            pro_data = Project.objects.get(id=project_id)
         except ObjectDoesNotExist:
-            return JsonResponse(code="999999", msg="成功！")
+            return JsonResponse(code="999995", msg="项目不存在！")
+        pro_data = ProjectSerializer(pro_data)
+        if not pro_data.data["status"]:
+            return JsonResponse(code="999985", msg="该项目已禁用")
+        data = AutomationTestTaskSerializer(AutomationTestTask.objects.filter(project=project_id).order_by("id"),
+                                            many=True).data
+        return JsonResponse(code="999999", msg="成功！", data=data)
 
 
 class DelTask(APIView):
@@ -1226,12 +1414,14 @@ class DelTask(APIView):
                 return JsonResponse(code="999996", msg="参数有误！")
             if not isinstance(data["project_id"], int):
                 return JsonResponse(code="999996", msg="参数有误！")
+            if data.get("task_id") is not None and not isinstance(data["task_id"], int):
+                return JsonResponse(code="999996", msg="参数有误！")
         except KeyError:
             return JsonResponse(code="999996", msg="参数有误！")
 
     def post(self, request):
         """
-        执行测试用例
+        删除执行任务，task_id为空时删除项目下全部任务
         :param request:
         :return:
         """
@@ -1247,10 +1437,13 @@ class DelTask(APIView):
         if not pro_data.data["status"]:
             return JsonResponse(code="999985", msg="该项目已禁用")
         obm = AutomationTestTask.objects.filter(project=data["project_id"])
+        if data.get("task_id"):
+            obm = obm.filter(id=data["task_id"])
         if obm:
             with transaction.atomic():
+                task_ids = list(obm.values_list("id", flat=True))
                 obm.delete()
-                del_task_crontab(str(data["project_id"]))
+                del_task_crontab(str(data["project_id"]), task_ids)
                 record_dynamic(project=data["project_id"],
                                _type="删除", operationObject="任务",
                                user=request.user.pk, data="删除任务")
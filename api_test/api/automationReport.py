@@ -1,13 +1,15 @@
+from datetime import datetime, timedelta
+
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.views import APIView
 
 from api_test.common.api_response import JsonResponse
 from api_test.models import Project, AutomationTaskRunTime, AutomationTestCase, AutomationCaseApi, \
-    AutomationCaseTestResult
-from api_test.serializers import AutomationAutoTestResultSerializer, \
-    AutomationTestLatelyTenTimeSerializer, AutomationTaskRunTimeSerializer, ProjectSerializer
+    AutomationCaseTestResult, AutomationLoadTestRun, AutomationLoadTestResult, AutomationApiLatency
+from api_test.serializers import AutomationAutoTestResultSerializer, AutomationAutoTestResultBriefSerializer, \
+    AutomationTestLatelyTenTimeSerializer, AutomationTaskRunTimeSerializer, ProjectSerializer, \
+    AutomationLoadTestRunSerializer, AutomationLoadTestResultSerializer
 
 
 class TestTime(APIView):
@@ -50,14 +52,19 @@ class AutoTestReport(APIView):
     def get(self, request):
         """
         测试结果报告
+        project_id 项目ID
+        run_id 任务执行记录ID
+        time 测试时间，run_id为空时按测试时间查找执行记录
+        brief 为1时不返回返回内容，通过auto_test_result查看单条结果
         :param request:
         :return:
         """
         project_id = request.GET.get("project_id")
+        run_id = request.GET.get("run_id")
         time = request.GET.get('time')
-        if not project_id or not time:
+        if not project_id or not (run_id or time):
             return JsonResponse(code="999996", msg="参数有误！")
-        if not project_id.isdecimal():
+        if not project_id.isdecimal() or (run_id and not run_id.isdecimal()):
             return JsonResponse(code="999996", msg="参数有误！")
         try:
             pro_data = Project.objects.get(id=project_id)
@@ -66,43 +73,78 @@ class AutoTestReport(APIView):
         pro_data = ProjectSerializer(pro_data)
         if not pro_data.data["status"]:
             return JsonResponse(code="999985", msg="该项目已禁用")
-        obj = AutomationTestCase.objects.filter(project=project_id)
-        if obj:
-            case = Q()
-            for i in obj:
-                case = case | Q(automationTestCase=i.pk)
-            case_data = AutomationCaseApi.objects.filter(case)
-            api = Q()
-            if case_data:
-                for j in case_data:
-                    api = api | Q(automationCaseApi=j.pk)
-
-                data = AutomationAutoTestResultSerializer(
-                    AutomationCaseTestResult.objects.filter(api, testTime=time), many=True).data
-                success = 0
-                fail = 0
-                not_run = 0
-                error = 0
-                for i in data:
-                    if i["result"] == "PASS":
-                        success = success + 1
-                    elif i["result"] == "FAIL":
-                        fail = fail + 1
-                    elif i["result"] == "ERROR":
-                        error = error + 1
-                    else:
-                        not_run = not_run + 1
-                return JsonResponse(code="999999", msg="成功！", data={"data": data,
-                                                                    "total": len(data),
-                                                                    "pass": success,
-                                                                    "fail": fail,
-                                                                    "error": error,
-                                                                    "NotRun": not_run
-                                                                    })
-            else:
-                return JsonResponse(code="999999", msg="成功！")
-        else:
+        if not AutomationTestCase.objects.filter(project=project_id).exists():
             return JsonResponse(code="999987", msg="用例不存在！")
+        runs = AutomationTaskRunTime.objects.filter(project=project_id).order_by("-id")
+        if run_id:
+            runs = runs.filter(id=run_id)
+        else:
+            runs = runs.filter(startTime=time)
+        run = runs.first()
+        if not run:
+            return JsonResponse(code="999999", msg="成功！")
+        results = AutomationCaseTestResult.objects.filter(run=run)\
+            .select_related("automationCaseApi__automationTestCase").order_by("id")
+        if request.GET.get("brief") == "1":
+            # 返回内容压缩保存，列表中不读取不解压
+            data = AutomationAutoTestResultBriefSerializer(results.defer("responseData", "responseBody"),
+                                                           many=True).data
+        else:
+            data = AutomationAutoTestResultSerializer(results, many=True).data
+        success = 0
+        fail = 0
+        not_run = 0
+        error = 0
+        for i in data:
+            if i["result"] == "PASS":
+                success = success + 1
+            elif i["result"] == "FAIL":
+                fail = fail + 1
+            elif i["result"] == "ERROR":
+                error = error + 1
+            else:
+                not_run = not_run + 1
+        return JsonResponse(code="999999", msg="成功！", data={"data": data,
+                                                            "total": len(data),
+                                                            "pass": success,
+                                                            "fail": fail,
+                                                            "error": error,
+                                                            "NotRun": not_run,
+                                                            "run": AutomationTaskRunTimeSerializer(run).data
+                                                            })
+
+
+class AutoTestResult(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = ()
+
+    def get(self, request):
+        """
+        单条自动测试结果，包含返回内容
+        project_id 项目ID
+        result_id 测试结果ID
+        :param request:
+        :return:
+        """
+        project_id = request.GET.get("project_id")
+        result_id = request.GET.get("result_id")
+        if not project_id or not result_id:
+            return JsonResponse(code="999996", msg="参数有误！")
+        if not project_id.isdecimal() or not result_id.isdecimal():
+            return JsonResponse(code="999996", msg="参数有误！")
+        try:
+            pro_data = Project.objects.get(id=project_id)
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999995", msg="项目不存在！")
+        pro_data = ProjectSerializer(pro_data)
+        if not pro_data.data["status"]:
+            return JsonResponse(code="999985", msg="该项目已禁用")
+        try:
+            result = AutomationCaseTestResult.objects.select_related("automationCaseApi__automationTestCase")\
+                .get(id=result_id, automationCaseApi__automationTestCase__project=project_id)
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999990", msg="测试结果不存在！")
+        return JsonResponse(code="999999", msg="成功！", data=AutomationAutoTestResultSerializer(result).data)
 
 
 class AutoLatelyTenTime(APIView):
@@ -136,22 +178,103 @@ class AutoLatelyTenTime(APIView):
             data = AutomationTestLatelyTenTimeSerializer(
                 AutomationTaskRunTime.objects.filter(project=project_id).order_by("-startTime"),
                 many=True).data
+        # 使用执行记录中的统计结果
         for i in data:
-            result = AutomationCaseTestResult.objects.filter(testTime=i["startTime"])
-            _pass = 0
-            fail = 0
-            error = 0
-            for j in result:
-                if j.result == "PASS":
-                    _pass = _pass + 1
-                elif j.result == "ERROR":
-                    error = error + 1
-                elif j.result == "FAIL":
-                    fail = fail + 1
-            total = _pass + error + fail
+            fail = i["failCount"]
+            error = i["errorCount"]
+            total = i["passCount"] + fail + error
             if total:
-                data[data.index(i)]["fail"] = "%.4f" % (fail / total)
-                data[data.index(i)]["error"] = "%.4f" % (error / total)
-                data[data.index(i)]["pass"] = "%.4f" % (1 - fail / total - error / total)
+                i["fail"] = "%.4f" % (fail / total)
+                i["error"] = "%.4f" % (error / total)
+                i["pass"] = "%.4f" % (1 - fail / total - error / total)
         data.reverse()
         return JsonResponse(code="999999", msg="成功！", data=data)
+
+
+class LoadTestReport(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = ()
+
+    def get(self, request):
+        """
+        压测报告
+        project_id 项目ID
+        run_id 压测记录ID，为空时返回最近一次
+        :param request:
+        :return:
+        """
+        project_id = request.GET.get("project_id")
+        run_id = request.GET.get("run_id")
+        if not project_id:
+            return JsonResponse(code="999996", msg="参数有误！")
+        if not project_id.isdecimal() or (run_id and not run_id.isdecimal()):
+            return JsonResponse(code="999996", msg="参数有误！")
+        try:
+            pro_data = Project.objects.get(id=project_id)
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999995", msg="项目不存在！")
+        pro_data = ProjectSerializer(pro_data)
+        if not pro_data.data["status"]:
+            return JsonResponse(code="999985", msg="该项目已禁用")
+        runs = AutomationLoadTestRun.objects.filter(project=project_id).order_by("-id")
+        if run_id:
+            runs = runs.filter(id=run_id)
+        run = runs.first()
+        if not run:
+            return JsonResponse(code="999999", msg="成功！")
+        results = AutomationLoadTestResult.objects.filter(run=run).select_related("automationCaseApi")\
+            .defer("histogram").order_by("automationCaseApi")
+        return JsonResponse(code="999999", msg="成功！", data={
+            "run": AutomationLoadTestRunSerializer(run).data,
+            "data": AutomationLoadTestResultSerializer(results, many=True).data,
+        })
+
+
+class ApiLatencyTrend(APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = ()
+
+    def get(self, request):
+        """
+        接口耗时趋势
+        project_id 项目ID
+        api_id 接口ID，为空时返回项目下所有接口
+        start_date, end_date 日期范围，格式 2018-01-01，默认最近30天
+        :param request:
+        :return:
+        """
+        project_id = request.GET.get("project_id")
+        api_id = request.GET.get("api_id")
+        if not project_id:
+            return JsonResponse(code="999996", msg="参数有误！")
+        if not project_id.isdecimal() or (api_id and not api_id.isdecimal()):
+            return JsonResponse(code="999996", msg="参数有误！")
+        try:
+            end_date = datetime.strptime(request.GET.get("end_date") or datetime.now().strftime("%Y-%m-%d"),
+                                         "%Y-%m-%d")
+            start_date = request.GET.get("start_date")
+            start_date = datetime.strptime(start_date, "%Y-%m-%d") if start_date else end_date - timedelta(days=30)
+        except ValueError:
+            return JsonResponse(code="999996", msg="参数有误！")
+        if start_date > end_date:
+            return JsonResponse(code="999996", msg="参数有误！")
+        try:
+            pro_data = Project.objects.get(id=project_id)
+        except ObjectDoesNotExist:
+            return JsonResponse(code="999995", msg="项目不存在！")
+        pro_data = ProjectSerializer(pro_data)
+        if not pro_data.data["status"]:
+            return JsonResponse(code="999985", msg="该项目已禁用")
+        obi = AutomationApiLatency.objects.filter(project=project_id, testTime__gte=start_date,
+                                                  testTime__lt=end_date + timedelta(days=1))
+        if api_id:
+            obi = obi.filter(automationCaseApi=api_id)
+        trend = {}
+        for i in obi.order_by("testTime").values("automationCaseApi", "testTime", "count", "minTime", "maxTime",
+                                                 "p50", "p95", "p99"):
+            _id = i.pop("automationCaseApi")
+            i["testTime"] = i["testTime"].strftime("%Y-%m-%d %H:%M:%S")
+            trend.setdefault(_id, []).append(i)
+        names = dict(AutomationCaseApi.objects.filter(id__in=list(trend)).values_list("id", "name"))
+        data = [{"api_id": _id, "name": names.get(_id), "data": points} for _id, points in sorted(trend.items())]
+        return JsonResponse(code="999999", msg="成功！", data=data)
@@ -77,6 +77,13 @@ class AddHost(APIView):
             # 必传参数 name, host
             if not data["name"] or not data["host"]:
                 return JsonResponse(code="999995", msg="参数有误！")
+            # 选填参数 maxConcurrency 最大并发请求数, requestsPerSecond 每秒请求数, 0为不限制
+            max_concurrency = data.get("maxConcurrency", 0)
+            if not isinstance(max_concurrency, int) or max_concurrency < 0:
+                return JsonResponse(code="999995", msg="参数有误！")
+            requests_per_second = data.get("requestsPerSecond", 0)
+            if not isinstance(requests_per_second, (int, float)) or requests_per_second < 0:
+                return JsonResponse(code="999995", msg="参数有误！")
         except KeyError:
             return JsonResponse(code="999995", msg="参数有误！")
 
@@ -132,6 +139,13 @@ class UpdateHost(APIView):
             # 必传参数 name, host
             if not data["name"] or not data["host"]:
                 return JsonResponse(code="999995", msg="参数有误！")
+            # 选填参数 maxConcurrency 最大并发请求数, requestsPerSecond 每秒请求数, 0为不限制
+            max_concurrency = data.get("maxConcurrency", 0)
+            if not isinstance(max_concurrency, int) or max_concurrency < 0:
+                return JsonResponse(code="999995", msg="参数有误！")
+            requests_per_second = data.get("requestsPerSecond", 0)
+            if not isinstance(requests_per_second, (int, float)) or requests_per_second < 0:
+                return JsonResponse(code="999995", msg="参数有误！")
         except KeyError:
             return JsonResponse(code="999995", msg="参数有误！")
 
@@ -2,8 +2,21 @@ import re
 
 from crontab import CronTab
 
+from api_test.common.scheduler import UNIT_SECONDS, daemon_mode, spread_offset
 
-def add(host_id, _type, start_time, end_time, project, frequency=None, unit=None):
+
+def task_comment(project, task_id=None):
+    """
+    crontab中任务的注释，同一项目下的多个任务按任务ID区分
+    :param project: 项目ID
+    :param task_id: 任务ID，为空时为旧版本按项目添加的任务
+    :return:
+    """
+    return project if task_id is None else '%s_%s' % (project, task_id)
+
+
+def add(host_id, _type, start_time, end_time, project, frequency=None, unit=None, case_id=None, virtual_users=None,
+        duration=None, iterations=None, task_id=None):
     """
     添加测试任务到crontab
     :param host_id:  测试域名
@@ -13,15 +26,31 @@ def add(host_id, _type, start_time, end_time, project, frequency=None, unit=None
     :param frequency:  时间间隔
     :param unit:  时间单位
     :param project:  项目ID
+    :param case_id:  压测用例ID
+    :param virtual_users:  压测虚拟用户数
+    :param duration:  压测时长（秒）
+    :param iterations:  压测每用户执行次数
+    :param task_id:  任务ID
     :return:
     """
+    if daemon_mode():
+        # 由调度进程读取任务执行
+        return
     start_time = re.split('-|:| ', start_time)
     end_time = re.split('-|:| ', end_time)
     # 创建当前用户的crontab，当然也可以创建其他用户的，但得有足够权限
+    comment = task_comment(project, task_id)
+    task_option = ' --task %s' % task_id if task_id else ''
+    # 按任务ID错开开始时间，cron只能精确到分钟，在命令前sleep
+    period = None
+    if _type == 'circulation' and frequency and unit in UNIT_SECONDS:
+        period = int(frequency) * UNIT_SECONDS[unit]
+    offset = spread_offset(task_id, period)
+    delay = 'sleep %s; ' % offset if offset else ''
     my_user_cron = CronTab(user=True)
-    my_user_cron.remove_all(comment=project)
-    my_user_cron.remove_all(comment=project+"_开始")
-    my_user_cron.remove_all(comment=project+"_结束")
+    my_user_cron.remove_all(comment=comment)
+    my_user_cron.remove_all(comment=comment+"_开始")
+    my_user_cron.remove_all(comment=comment+"_结束")
     # for j in my_user_cron.crons:
     if _type == 'timing':
         _time = '%s %s %s %s *' % (
@@ -30,10 +59,28 @@ def add(host_id, _type, start_time, end_time, project, frequency=None, unit=None
             start_time[2],
             start_time[1],
         )
-        job = my_user_cron.new(command='/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
-                                       'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
-                                       '7J4JE3I5TJCTRFXHQ/api_test/common/auto_start.py %s %s >> /var/lib/task/%s.log'
-                                       % (host_id, project, project))
+        job = my_user_cron.new(command=delay + '/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
+                                               'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
+                                               '7J4JE3I5TJCTRFXHQ/api_test/common/auto_test.py %s %s%s'
+                                               ' >> /var/lib/task/%s.log'
+                                               % (host_id, project, task_option, comment))
+    elif _type == 'load':
+        _time = '%s %s %s %s *' % (
+            start_time[4],
+            start_time[3],
+            start_time[2],
+            start_time[1],
+        )
+        options = ''
+        if duration:
+            options += ' --duration %s' % duration
+        if iterations:
+            options += ' --iterations %s' % iterations
+        job = my_user_cron.new(command=delay + '/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
+                                               'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
+                                               '7J4JE3I5TJCTRFXHQ/api_test/common/load_test.py %s %s %s --users %s%s'
+                                               ' >> /var/lib/task/%s.log'
+                                               % (host_id, project, case_id, virtual_users, options, comment))
     else:
         _time = '%s %s %s %s *' % (
             start_time[4],
@@ -42,14 +89,15 @@ def add(host_id, _type, start_time, end_time, project, frequency=None, unit=None
             start_time[1],
         )
 
-        #  创建任务
+        #  创建任务，第10个参数为循环执行时的偏移秒数，由auto_start.py加在每次执行的命令前
+        task_args = '%s %s' % (task_id, offset) if task_id else ''
         job = my_user_cron.new(command='/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
                                        'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
-                                       '7J4JE3I5TJCTRFXHQ/api_test/common/auto_start.py %s %s %s %s %s %s %s %s >> '
+                                       '7J4JE3I5TJCTRFXHQ/api_test/common/auto_start.py %s %s %s %s %s %s %s %s %s >> '
                                        '/var/lib/task/%s.log'
                                        % (frequency, unit, host_id, end_time[4], end_time[3],
-                                          end_time[2], end_time[1], project, project))
-    job.set_comment(project+"_开始")
+                                          end_time[2], end_time[1], project, task_args, comment))
+    job.set_comment(comment+"_开始")
     # 设置任务执行周期
     job.setall(_time)
     # 最后将crontab写入配置文件
@@ -0,0 +1,220 @@
+"""
+JSON校验
+
+期望的返回内容只编译一次，生成按路径的校验项，编译结果不可变，可在多线程中共用。
+期望内容中的字符串支持以下写法：
+    <any>         只校验字段存在
+    <value>内容   校验值相等，内容按JSON解析，解析失败时按字符串比较
+    <length>n     校验字符串、数组或对象的长度
+    <regex>正则   校验字符串匹配正则
+其余字段校验存在且类型一致，期望值为null时不校验类型，数组中的每个元素都按期望数组的第一个元素校验
+"""
+import ast
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+
+DIRECTIVE_PATTERN = re.compile(r'^<(?P<kind>any|value|length|regex)>(?P<arg>.*)$', re.S)
+
+
+class Failure(namedtuple('Failure', 'path check expected actual')):
+    """
+    校验失败项
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if self.check == 'presence':
+            return '%s: 缺少字段' % self.path
+        if self.check == 'unexpected':
+            return '%s: 多余字段' % self.path
+        return '%s: %s校验失败，期望 %s，实际 %s' % (self.path, self.check, self.expected, brief(self.actual))
+
+
+def brief(value, limit=100):
+    text = json.dumps(value, ensure_ascii=False) if not isinstance(value, str) else value
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+def type_name(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, (list, tuple)):
+        return 'array'
+    if isinstance(value, dict):
+        return 'object'
+    return type(value).__name__
+
+
+def key_path(path, key):
+    if isinstance(key, str) and key.isidentifier():
+        return '%s.%s' % (path, key)
+    return '%s[%s]' % (path, json.dumps(key, ensure_ascii=False))
+
+
+class _Any(object):
+
+    def failures(self, actual, path):
+        return iter(())
+
+
+class _Type(object):
+
+    def __init__(self, name):
+        self.name = name
+
+    def failures(self, actual, path):
+        if type_name(actual) != self.name:
+            yield Failure(path, 'type', self.name, type_name(actual))
+
+
+class _Value(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def failures(self, actual, path):
+        if actual != self.value:
+            yield Failure(path, 'value', brief(self.value), actual)
+
+
+class _Length(object):
+
+    def __init__(self, length):
+        self.length = length
+
+    def failures(self, actual, path):
+        if not isinstance(actual, (str, list, tuple, dict)) or len(actual) != self.length:
+            yield Failure(path, 'length', self.length, len(actual) if hasattr(actual, '__len__') else actual)
+
+
+class _Regex(object):
+
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern)
+
+    def failures(self, actual, path):
+        if not isinstance(actual, str) or not self.pattern.search(actual):
+            yield Failure(path, 'regex', self.pattern.pattern, actual)
+
+
+class _Object(object):
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def failures(self, actual, path):
+        if not isinstance(actual, dict):
+            yield Failure(path, 'type', 'object', type_name(actual))
+            return
+        for key, check in self.fields:
+            field = key_path(path, key)
+            if key not in actual:
+                yield Failure(field, 'presence', key, None)
+            else:
+                yield from check.failures(actual[key], field)
+
+
+class _Array(object):
+
+    def __init__(self, item):
+        self.item = item
+
+    def failures(self, actual, path):
+        if not isinstance(actual, (list, tuple)):
+            yield Failure(path, 'type', 'array', type_name(actual))
+            return
+        if self.item is None:
+            return
+        for index, value in enumerate(actual):
+            yield from self.item.failures(value, '%s[%s]' % (path, index))
+
+
+def _directive(kind, arg):
+    if kind == 'any':
+        return _Any()
+    if kind == 'length':
+        return _Length(int(arg))
+    if kind == 'regex':
+        return _Regex(arg)
+    try:
+        return _Value(json.loads(arg))
+    except ValueError:
+        return _Value(arg)
+
+
+def _compile(expected):
+    if isinstance(expected, dict):
+        return _Object(tuple((key, _compile(value)) for key, value in expected.items()))
+    if isinstance(expected, (list, tuple)):
+        return _Array(_compile(expected[0]) if expected else None)
+    if expected is None:
+        return _Any()
+    if isinstance(expected, str):
+        match = DIRECTIVE_PATTERN.match(expected)
+        if match:
+            return _directive(match.group('kind'), match.group('arg'))
+    return _Type(type_name(expected))
+
+
+class Assertion(object):
+    """
+    编译后的JSON校验
+    """
+
+    def __init__(self, expected):
+        """
+        :param expected: 期望的返回内容
+        """
+        self._root = _compile(expected)
+
+    def verify(self, actual, diagnostic=False):
+        """
+        校验返回内容
+        :param actual: 接口返回的数据
+        :param diagnostic: True 返回全部失败项，False 遇到第一个失败项即停止
+        :return: [Failure]，全部通过时为空
+        """
+        failures = self._root.failures(actual, '$')
+        return list(failures if diagnostic else islice(failures, 1))
+
+
+def load_expected(text):
+    """
+    解析期望的返回内容，兼容Python字面量写法
+    :param text: 期望的返回内容
+    :return:
+    """
+    if not text:
+        return {}
+    try:
+        return json.loads(text)
+    except ValueError:
+        return ast.literal_eval(text.replace('true', 'True').replace('false', 'False').replace('null', 'None'))
+
+
+@lru_cache(maxsize=1024)
+def compile_json(text):
+    """
+    编译期望的返回内容，相同内容只编译一次
+    :param text: 期望的返回内容
+    :return: Assertion
+    """
+    return Assertion(load_expected(text))
+
+
+def describe(failures):
+    """
+    校验失败信息
+    :param failures: [Failure]
+    :return: 全部通过时返回None
+    """
+    return '\n'.join(str(i) for i in failures) or None
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import aiohttp
+from django.conf import settings
+
+from api_test.common.auto_task_test import prepare_request, examine_result
+from api_test.common.common import record_auto_results
+from api_test.common.jsonlib import parse_body
+from api_test.common.throttle import get_throttle
+from api_test.common.timing import Timing
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+def _query(data):
+    """
+    转换为aiohttp可接受的参数格式，列表值按requests的方式展开为同名参数
+    :param data: 请求参数
+    :return:
+    """
+    if isinstance(data, dict):
+        query = []
+        for key, value in data.items():
+            for i in (value if isinstance(value, (list, tuple)) else [value]):
+                if i is not None:
+                    query.append((str(key), str(i)))
+        return query
+    return data or None
+
+
+def _mark(name):
+    async def mark(session, trace_config_ctx, params):
+        trace_config_ctx.trace_request_ctx[name] = time.perf_counter()
+    return mark
+
+
+def _trace_config():
+    """
+    记录请求各阶段开始、结束时间，写入请求的trace_request_ctx
+    :return:
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_mark('request_start'))
+    trace_config.on_dns_resolvehost_start.append(_mark('dns_start'))
+    trace_config.on_dns_resolvehost_end.append(_mark('dns_end'))
+    trace_config.on_connection_create_start.append(_mark('connect_start'))
+    trace_config.on_connection_create_end.append(_mark('connect_end'))
+    trace_config.on_request_end.append(_mark('request_end'))
+    return trace_config
+
+
+def _timing(url, phases, download, size):
+    """
+    根据各阶段时间生成请求耗时，aiohttp建立连接时包含TLS握手，https新建连接时TLS耗时计入连接耗时
+    :param url: 请求地址
+    :param phases: 各阶段时间
+    :param download: 读取返回内容耗时（秒）
+    :param size: 返回内容大小
+    :return:
+    """
+    dns = phases.get('dns_end', 0) - phases.get('dns_start', 0)
+    create = phases.get('connect_end', 0) - phases.get('connect_start', 0)
+    first_byte = phases.get('request_end', 0) - phases.get('request_start', 0) - create
+    tls = None if create and url.lower().startswith('https') else 0
+    return Timing(dns=round(dns * 1000, 3), connect=round((create - dns) * 1000, 3),
+                  tls=tls, first_byte=round(max(0, first_byte) * 1000, 3),
+                  download=round(download * 1000, 3), size=size)
+
+
+class AsyncRunner(object):
+    """
+    asyncio执行引擎，请求在单个事件循环中并发发送，读写数据库在少量线程中执行
+    """
+
+    def __init__(self, host, time, context=None, host_concurrency=None, db_workers=None, timeout=8):
+        """
+        :param host: 测试的host域名
+        :param time: 测试时间
+        :param context: 本次执行的RunContext
+        :param host_concurrency: 每个host同时发送的最大请求数，host设置了最大并发请求数时取较小值
+        :param db_workers: 读写数据库的线程数
+        :param timeout: 连接、读取超时时间（秒）
+        """
+        self.host = host
+        self.time = time
+        self.context = context
+        self.writer = context.writer if context is not None else None
+        self.host_concurrency = host_concurrency or getattr(settings, 'ASYNC_HOST_CONCURRENCY', 100)
+        self.throttle = get_throttle(host)
+        if self.throttle.max_concurrency:
+            self.host_concurrency = min(self.host_concurrency, self.throttle.max_concurrency)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(db_workers or getattr(settings, 'ASYNC_DB_WORKERS', 4))
+        self.semaphores = {}
+        self.loop = None
+        self.session = None
+
+    def _semaphore(self, url):
+        netloc = urlsplit(url).netloc.lower()
+        if netloc not in self.semaphores:
+            self.semaphores[netloc] = asyncio.Semaphore(self.host_concurrency)
+        return self.semaphores[netloc]
+
+    def _db(self, func, *args):
+        return self.loop.run_in_executor(self.executor, func, *args)
+
+    async def send(self, request):
+        """
+        发送请求，参数处理与confighttp中的get/post/put/delete一致
+        :param request: prepare_request生成的请求信息
+        :return: (HTTP状态码, 返回内容, 请求耗时, 原始返回内容)，不支持的请求方式返回None
+        """
+        request_type = request['request_type']
+        if request_type not in ('GET', 'POST', 'PUT', 'DELETE'):
+            return None
+        data = request['parameter']
+        if request['request_parameter_type'] == 'raw' and request_type != 'DELETE':
+            data = json.dumps(data)
+        header = {str(k): str(v) for k, v in request['header'].items()}
+        kwargs = {}
+        if request_type in ('GET', 'DELETE'):
+            kwargs['params'] = _query(data)
+        else:
+            # 由aiohttp按实际请求体计算Content-Length，字符串请求体不自动添加Content-Type
+            header.pop('Content-Length', None)
+            kwargs['data'] = (_query(data) or None) if isinstance(data, dict) else data
+            kwargs['skip_auto_headers'] = () if isinstance(data, dict) else ('Content-Type',)
+        if request_type != 'DELETE':
+            kwargs['timeout'] = aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+        async with self._semaphore(request['url']):
+            wait = self.throttle.delay()
+            if wait:
+                await asyncio.sleep(wait)
+            phases = {}
+            async with self.session.request(request_type, request['url'], headers=header, trace_request_ctx=phases,
+                                            **kwargs) as response:
+                start = time.perf_counter()
+                body = await response.read()
+                timing = _timing(request['url'], phases, time.perf_counter() - start, len(body))
+                text = await response.text(errors='replace')
+                response_data, body = parse_body(text, response.headers.get('Content-Type'))
+                return response.status, response_data, timing, body
+
+    async def run_api(self, case_id, _id, upstream):
+        """
+        执行单个接口，等待上游关联接口执行完成后开始
+        :param case_id: 测试用例ID
+        :param _id:  用例下接口ID
+        :param upstream: 上游接口的任务
+        :return:
+        """
+        if upstream:
+            await asyncio.wait(upstream)
+        if self.context is not None and self.context.cancelled():
+            return 'cancelled'
+        request = None
+        try:
+            request = await self._db(prepare_request, self.host, case_id, _id, self.time, self.context)
+            if request is None:
+                return 'fail'
+            try:
+                response = await self.send(request)
+            except asyncio.TimeoutError:
+                await self._db(lambda: record_auto_results(_id=_id, header=request['header'],
+                                                           parameter=request['parameter'], _result='TimeOut',
+                                                           code="", response_data="", time=self.time,
+                                                           writer=self.writer))
+                return 'timeout'
+            if response is None:
+                return 'ERROR'
+            code, response_data, timing, body = response
+            return await self._db(examine_result, _id, self.time, request, code, response_data, self.context, timing,
+                                  body)
+        except Exception as e:
+            # 连接失败等异常记录为执行错误，与线程执行时一致
+            logger.exception(e)
+            message = str(e)
+            await self._db(lambda: record_auto_results(_id=_id, header=request['header'] if request else None,
+                                                       parameter=request['parameter'] if request else None,
+                                                       _result='ERROR', code="", response_data="", time=self.time,
+                                                       writer=self.writer, message=message))
+            return 'ERROR'
+
+    async def run_all(self, api_case, dependency):
+        tasks = {}
+        async with aiohttp.ClientSession(cookie_jar=aiohttp.DummyCookieJar(),
+                                         connector=aiohttp.TCPConnector(limit=0),
+                                         trace_configs=[_trace_config()]) as self.session:
+            for _id, case_id in api_case.items():
+                upstream = [tasks[i] for i in dependency.get(_id, ()) if i in tasks]
+                tasks[_id] = self.loop.create_task(self.run_api(case_id, _id, upstream))
+            if tasks:
+                await asyncio.wait(list(tasks.values()))
+        return {_id: task.result() for _id, task in tasks.items()}
+
+    def run(self, api_case, dependency):
+        """
+        执行接口
+        :param api_case: 按执行顺序排列的{接口ID: 用例ID}
+        :param dependency: {接口ID: 上游接口ID集合}
+        :return: {接口ID: 执行结果}
+        """
+        self.loop = asyncio.new_event_loop()
+        try:
+            return self.loop.run_until_complete(self.run_all(api_case, dependency))
+        finally:
+            self.loop.close()
+            self.executor.shutdown()
@@ -27,14 +27,21 @@ def task_start_timing():
     now_minute = datetime.datetime.now().minute
     now_hour = datetime.datetime.now().hour
     # now_day = datetime.datetime.now().day
+    # 第9个参数为任务ID，旧版本添加的任务没有
+    task_id = sys.argv[9] if len(sys.argv) > 9 else None
+    comment = sys.argv[8] if task_id is None else '%s_%s' % (sys.argv[8], task_id)
+    task_option = ' --task %s' % task_id if task_id else ''
+    # 第10个参数为错开开始时间的秒数
+    delay = 'sleep %s; ' % sys.argv[10] if len(sys.argv) > 10 and sys.argv[10] != '0' else ''
     my_user_cron = CronTab(user=True)
-    my_user_cron.remove_all(comment=sys.argv[8])
+    my_user_cron.remove_all(comment=comment)
     logging.info('测试开始')
-    job = my_user_cron.new(command='/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
-                                   'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
-                                   '7J4JE3I5TJCTRFXHQ/api_test/common/auto_test.py %s %s  >> /var/lib/task/%s.log'
-                                   % (sys.argv[3], sys.argv[8], sys.argv[8]))
-    job.set_comment(sys.argv[8])
+    job = my_user_cron.new(command=delay + '/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
+                                           'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
+                                           '7J4JE3I5TJCTRFXHQ/api_test/common/auto_test.py %s %s%s  >> '
+                                           '/var/lib/task/%s.log'
+                                           % (sys.argv[3], sys.argv[8], task_option, comment))
+    job.set_comment(comment)
     if sys.argv[2] == 'm':
         _time = '*/%s * * * *' % sys.argv[1]
     elif sys.argv[2] == 'h':
@@ -50,8 +57,8 @@ def task_start_timing():
     jobs = end_task.new(command='/usr/local/python3/bin/python3 /var/lib/jenkins/workspace/'
                                 'api_automation_test_master-JU72M6SAEYKDY6SN3LUUPLXPTX3F35MVFZ5'
                                 '7J4JE3I5TJCTRFXHQ/api_test/common/end_task.py %s >> /var/lib/task/%s.log'
-                                % (sys.argv[8], sys.argv[8]))
-    jobs.set_comment(sys.argv[8]+"_结束")
+                                % (comment, comment))
+    jobs.set_comment(comment+"_结束")
     _time = '%s %s %s %s *' % (
         sys.argv[4],
         sys.argv[5],
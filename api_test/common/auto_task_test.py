@@ -1,246 +1,276 @@
-import django
-import sys
-import os
-
-curPath = os.path.abspath(os.path.dirname(__file__))
-rootPath = os.path.split(curPath)[0]
-PathProject = os.path.split(rootPath)[0]
-sys.path.append(rootPath)
-sys.path.append(PathProject)
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_automation_test.settings")
-django.setup()
-
 import json
 import logging
 import re
-import operator
-from django.core import serializers
-from requests import ReadTimeout
 
+from requests import ReadTimeout
 
-from api_test.common.confighttp import get, post, put, delete
-from api_test.common.common import check_json, record_auto_results
-from api_test.models import AutomationCaseApi, AutomationParameter, AutomationHead, \
-    AutomationParameterRaw, AutomationCaseTestResult
-from api_test.serializers import AutomationCaseApiSerializer, AutomationParameterRawSerializer
+from api_test.common.assertion import compile_json, describe
+from api_test.common.common import record_auto_results
+from api_test.common.http_client import delete, get, post, put
+from api_test.common.json_compare import compare
+from api_test.common.jsonlib import decode_response, response_text
+from api_test.common.plan import get_plan
+from api_test.common.throttle import get_throttle
+from api_test.models import AutomationCaseTestResult
 
 logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
 
 
-def test_api(host, case_id, _id, time):
+def test_api(host, case_id, _id, time, context=None):
     """
     执行接口测试
     :param host: 测试的host域名
     :param case_id: 测试用例ID
     :param _id:  用例下接口ID
     :param time: 测试时间
+    :param context: 本次执行的RunContext，关联参数优先从中取值
     :return:
     """
-    data = AutomationCaseApiSerializer(AutomationCaseApi.objects.get(id=_id, automationTestCase=case_id)).data
-    http_type = data['httpType']
-    request_type = data['requestType']
-    address = host.host + data['apiAddress']
-    head = json.loads(serializers.serialize('json', AutomationHead.objects.filter(automationCaseApi=_id)))
+    writer = _writer(context)
+    request = None
+    try:
+        request = prepare_request(host, case_id, _id, time, context)
+        if request is None:
+            return 'fail'
+        try:
+            with get_throttle(host):
+                response = send_request(request)
+        except ReadTimeout:
+            record_auto_results(_id=_id, header=request['header'], parameter=request['parameter'],
+                                _result='TimeOut', code="", response_data="", time=time, writer=writer)
+            return 'timeout'
+        if response is None:
+            return 'ERROR'
+        code, response_data, timing, body = response
+        return examine_result(_id, time, request, code, response_data, context, timing, body)
+    except Exception as e:
+        # 连接失败等异常记录为执行错误，串行、并发执行时都继续执行后续接口
+        logger.exception(e)
+        record_auto_results(_id=_id, header=request['header'] if request else None,
+                            parameter=request['parameter'] if request else None, _result='ERROR', code="",
+                            response_data="", time=time, writer=writer, message=str(e))
+        return 'ERROR'
+
+
+def _writer(context):
+    return context.writer if context is not None else None
+
+
+def interrelate_json(api_id, time, context=None):
+    """
+    获取关联接口本次执行的返回内容
+    :param api_id: 关联的用例接口ID
+    :param time: 测试时间
+    :param context: 本次执行的RunContext，没有时从测试结果中读取
+    :return:
+    """
+    if context is not None and api_id in context:
+        return context.get(api_id)
+    return decode_response(AutomationCaseTestResult.objects.filter(automationCaseApi=api_id, testTime=time)
+                           .values_list('responseData', flat=True).order_by('id')[0])
+
+
+def interrelate_text(api_id, context=None):
+    """
+    获取关联接口最近一次返回内容的文本，用于正则匹配
+    :param api_id: 关联的用例接口ID
+    :param context: 本次执行的RunContext，没有时从测试结果中读取
+    :return:
+    """
+    if context is not None and api_id in context:
+        return response_text(context.get(api_id))
+    return response_text(decode_response(AutomationCaseTestResult.objects.filter(automationCaseApi=api_id)
+                                         .values_list('responseData', flat=True).order_by('id').last()))
+
+
+def prepare_request(host, case_id, _id, time, context=None):
+    """
+    读取接口信息，生成请求地址、请求头和请求参数，关联数据有误时记录执行错误
+    :param host: 测试的host域名
+    :param case_id: 测试用例ID
+    :param _id:  用例下接口ID
+    :param time: 测试时间
+    :param context: 本次执行的RunContext
+    :return: 请求信息，生成失败时返回None
+    """
+    writer = _writer(context)
+    plan = get_plan(case_id, _id)
+    request_type = plan.request_type
     header = {}
-    request_parameter_type = data['requestParameterType']
-    examine_type = data['examineType']
-    http_code = data['httpCode']
-    response_parameter_list = data['responseData']
-    if http_type == 'HTTP':
-        url = 'http://'+address
-    else:
-        url = 'https://'+address
-    if data['requestParameterType'] == 'form-data':
-        parameter_list = json.loads(serializers.serialize('json',
-                                                          AutomationParameter.objects.filter(automationCaseApi=_id)))
-        parameter = {}
+    request_parameter_type = plan.request_parameter_type
+    examine_type = plan.examine_type
+    http_code = plan.http_code
+    response_parameter_list = plan.response_data
+    url = plan.url(host)
+    def load_json(api_id):
+        return interrelate_json(api_id, time, context)
 
-        for i in parameter_list:
-            key_ = i['fields']['name']
-            value = i['fields']['value']
+    def load_text(api_id):
+        return interrelate_text(api_id, context)
 
+    if plan.form_data:
+        parameter = {}
+        for key_, value, template in plan.parameters:
+            if template is None:
+                parameter[key_] = value
+                continue
             try:
-                if i['fields']['interrelate']:
-                    interrelate_type = re.findall('(?<=<response\[).*?(?=\])', value)
-                    if interrelate_type[0] == "JSON":
-                        api_id = re.findall('(?<=<response\[JSON]\[).*?(?=\])', value)
-                        a = re.findall('(?<=\[").*?(?="])', value)
-                        try:
-                            param_data = eval(json.loads(serializers.serialize(
-                                'json', AutomationCaseTestResult.objects.filter(
-                                    automationCaseApi=api_id[0], testTime=time)))[0]['fields']["responseData"])
-                            for j in a:
-                                param_data = param_data[j]
-                        except Exception:
-                            record_auto_results(_id=_id, header=header, parameter=parameter,
-                                                _result='ERROR', code="", response_data="", time=time)
-                            return 'fail'
-                    elif interrelate_type[0] == "Regular":
-                        api_id = re.findall('(?<=<response\[Regular]\[).*?(?=\])', value)
-                        pattern = re.findall('(?<=\[").*?(?="])', value)
-                        param_data = json.loads(serializers.serialize(
-                            'json',
-                            AutomationCaseTestResult.objects.filter(automationCaseApi=api_id[0])))[-1]['fields']["responseData"]
-                        param_data = re.findall(pattern[0], param_data.replace("\'", "\""))[0]
-                    else:
-                        record_auto_results(_id=_id, header=header, parameter=parameter,
-                                            _result='ERROR', code="", response_data="", time=time)
-                        return 'fail'
-                    pattern = re.compile(r'<response\[.*]')
-                    parameter[key_] = re.sub(pattern, param_data, value)
-                else:
-                    parameter[key_] = value
+                parameter[key_] = template.render(load_json, load_text)
             except Exception as e:
                 logging.exception(e)
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='ERROR', code="", response_data="", time=time)
-                return 'fail'
-        if data["formatRaw"]:
-            request_parameter_type = "raw"
+                                    _result='ERROR', code="", response_data="", time=time, writer=writer)
+                return None
     else:
-        parameter = AutomationParameterRawSerializer(AutomationParameterRaw.objects.filter(automationCaseApi=_id),
-                                                     many=True).data
-        if len(parameter[0]["data"]):
-            try:
-                parameter = eval(parameter[0]["data"])
-            except Exception:
-                record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='ERROR', code="", response_data="", time=time)
-                return 'fail'
-        else:
-            parameter = []
-
-    for i in head:
-        key_ = i['fields']['name']
-        value = i['fields']['value']
-        if i['fields']['interrelate']:
-
-            try:
-                interrelate_type = re.findall('(?<=<response\[).*?(?=\])', value)
-                if interrelate_type[0] == "JSON":
-                    api_id = re.findall('(?<=<response\[JSON]\[).*?(?=\])', value)
-                    a = re.findall('(?<=\[").*?(?="])', value)
-                    try:
-                        param_data = eval(json.loads(serializers.serialize(
-                            'json', AutomationCaseTestResult.objects.filter(automationCaseApi=api_id[0],
-                                                                            testTime=time)))[0]['fields']["responseData"])
-                        for j in a:
-                            param_data = param_data[j]
-                    except Exception as e:
-                        record_auto_results(_id=_id, header=header, parameter=parameter,
-                                            _result='ERROR', code="", response_data="", time=time)
-                        return 'fail'
-                elif interrelate_type[0] == "Regular":
-                    api_id = re.findall('(?<=<response\[Regular]\[).*?(?=\])', value)
-                    pattern = re.findall('(?<=\[").*?(?="])', value)
-                    param_data = json.loads(serializers.serialize(
-                        'json',
-                        AutomationCaseTestResult.objects.filter(automationCaseApi=api_id[0])))[-1]['fields']["responseData"]
-                    param_data = re.findall(pattern[0], param_data.replace("\'", "\""))[0]
-                else:
-                    record_auto_results(_id=_id, header=header, parameter=parameter,
-                                        _result='ERROR', code="", response_data="", time=time)
-                    return 'fail'
-                pattern = re.compile(r'<response\[.*]')
-                header[key_] = re.sub(pattern, param_data, value)
+        if plan.raw_error:
+            record_auto_results(_id=_id, header=header, parameter=plan.raw,
+                                _result='ERROR', code="", response_data="", time=time, writer=writer)
+            return None
+        parameter = plan.parameter()
 
-            except Exception as e:
-                logging.exception("ERROR")
-                logging.error(e)
-                record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='ERROR', code="", response_data="", time=time)
-                return 'fail'
-        else:
+    for key_, value, template in plan.headers:
+        if template is None:
             header[key_] = value
+            continue
+        try:
+            header[key_] = template.render(load_json, load_text)
+        except Exception as e:
+            logging.exception(e)
+            record_auto_results(_id=_id, header=header, parameter=parameter,
+                                _result='ERROR', code="", response_data="", time=time, writer=writer)
+            return None
 
     header["Content-Length"] = '%s' % len(str(parameter))
-    try:
-        if request_type == 'GET':
-            code, response_data = get(header, url, request_parameter_type, parameter)
-        elif request_type == 'POST':
-            code, response_data = post(header, url, request_parameter_type, parameter)
-        elif request_type == 'PUT':
-            code, response_data = put(header, url, request_parameter_type, parameter)
-        elif request_type == 'DELETE':
-            code, response_data = delete(header, url, request_parameter_type, parameter)
-        else:
-            return 'ERROR'
-    except ReadTimeout:
-        record_auto_results(_id=_id, header=header, parameter=parameter,
-                            _result='TimeOut', code="", response_data="", time=time)
-        return 'timeout'
+    return {
+        'url': url,
+        'request_type': request_type,
+        'header': header,
+        'parameter': parameter,
+        'request_parameter_type': request_parameter_type,
+        'examine_type': examine_type,
+        'http_code': http_code,
+        'response_parameter_list': response_parameter_list,
+    }
+
+
+def send_request(request):
+    """
+    发送请求
+    :param request: prepare_request生成的请求信息
+    :return: (HTTP状态码, 返回内容, 请求耗时, 原始返回内容)，不支持的请求方式返回None
+    """
+    request_type = request['request_type']
+    args = (request['header'], request['url'], request['request_parameter_type'], request['parameter'])
+    if request_type == 'GET':
+        return get(*args)
+    elif request_type == 'POST':
+        return post(*args)
+    elif request_type == 'PUT':
+        return put(*args)
+    elif request_type == 'DELETE':
+        return delete(*args)
+    return None
+
+
+def examine_result(_id, time, request, code, response_data, context=None, timing=None, body=None):
+    """
+    校验返回结果并记录
+    :param _id:  用例下接口ID
+    :param time: 测试时间
+    :param request: prepare_request生成的请求信息
+    :param code: HTTP状态码
+    :param response_data: 返回内容
+    :param context: 本次执行的RunContext，保存返回内容供后续接口关联
+    :param timing: 请求耗时
+    :param body: 原始返回内容
+    :return:
+    """
+    writer = _writer(context)
+    if context is not None:
+        context.set(_id, response_data)
+    header = request['header']
+    parameter = request['parameter']
+    examine_type = request['examine_type']
+    http_code = request['http_code']
+    response_parameter_list = request['response_parameter_list']
     if examine_type == 'no_check':
         record_auto_results(_id=_id, header=header, parameter=parameter,
-                            _result='PASS', code=code, response_data=response_data, time=time)
+                            _result='PASS', code=code, response_data=response_data, time=time, writer=writer,
+                            timing=timing, body=body)
         return 'success'
 
     elif examine_type == 'json':
         if int(http_code) == code:
-            try:
-                result = check_json(eval(response_parameter_list), response_data)
-            except:
-                result = check_json(eval(response_parameter_list.replace('true', 'True').replace('false', 'False')), response_data)
-            if result:
+            # 自动测试遇到第一个失败项即停止
+            failures = compile_json(response_parameter_list).verify(response_data)
+            if not failures:
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='PASS', code=code, response_data=response_data, time=time)
+                                    _result='PASS', code=code, response_data=response_data, time=time, writer=writer,
+                                    timing=timing, body=body)
+                return 'success'
             else:
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='FAIL', code=code, response_data=response_data, time=time)
-            return result
+                                    _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                    timing=timing, body=body, message=describe(failures))
+                return 'fail'
         else:
             record_auto_results(_id=_id, header=header, parameter=parameter,
-                                _result='FAIL', code=code, response_data=response_data, time=time)
+                                _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                timing=timing, body=body)
             return 'fail'
 
     elif examine_type == 'only_check_status':
         if int(http_code) == code:
             record_auto_results(_id=_id, header=header, parameter=parameter,
-                                _result='PASS', code=code, response_data=response_data, time=time)
+                                _result='PASS', code=code, response_data=response_data, time=time, writer=writer,
+                                timing=timing, body=body)
             return 'success'
         else:
             record_auto_results(_id=_id, header=header, parameter=parameter,
-                                _result='FAIL', code=code, response_data=response_data, time=time)
+                                _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                timing=timing, body=body)
             return 'fail'
 
     elif examine_type == 'entirely_check':
         if int(http_code) == code:
-            try:
-                result = operator.eq(eval(response_parameter_list), response_data)
-            except:
-                result = operator.eq(eval(response_parameter_list.replace('true', 'True').replace('false', 'False')), response_data)
-            if result:
+            failure = compare(response_parameter_list, response_data)
+            if not failure:
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='PASS', code=code, response_data=response_data, time=time)
+                                    _result='PASS', code=code, response_data=response_data, time=time, writer=writer,
+                                    timing=timing, body=body)
                 return 'success'
             else:
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='FAIL', code=code, response_data=response_data, time=time)
+                                    _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                    timing=timing, body=body, message=str(failure))
                 return 'fail'
         else:
             record_auto_results(_id=_id, header=header, parameter=parameter,
-                                _result='FAIL', code=code, response_data=response_data, time=time)
+                                _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                timing=timing, body=body)
             return 'fail'
 
     elif examine_type == 'Regular_check':
         if int(http_code) == code:
-            try:
-                result = re.findall(response_parameter_list, json.dumps(response_data))
-            except:
-                result = re.findall(response_parameter_list, eval(response_data.replace('true', 'True').replace('false', 'False')))
+            result = re.findall(response_parameter_list, json.dumps(response_data))
             if result:
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='PASS', code=code, response_data=response_data, time=time)
+                                    _result='PASS', code=code, response_data=response_data, time=time, writer=writer,
+                                    timing=timing, body=body)
                 return 'success'
             else:
                 record_auto_results(_id=_id, header=header, parameter=parameter,
-                                    _result='FAIL', code=code, response_data=response_data, time=time)
+                                    _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                    timing=timing, body=body)
                 return 'fail'
         else:
             record_auto_results(_id=_id, header=header, parameter=parameter,
-                                _result='FAIL', code=code, response_data=response_data, time=time)
+                                _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                                timing=timing, body=body)
             return 'fail'
 
     else:
         record_auto_results(_id=_id, header=header, parameter=parameter,
-                            _result='FAIL', code=code, response_data=response_data, time=time)
+                            _result='FAIL', code=code, response_data=response_data, time=time, writer=writer,
+                            timing=timing, body=body)
         return 'fail'
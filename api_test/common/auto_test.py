@@ -1,61 +1,269 @@
+import argparse
 import datetime
-import django
 import sys
 import os
 import pytz
+from collections import OrderedDict
 
-curPath = os.path.abspath(os.path.dirname(__file__))
-rootPath = os.path.split(curPath)[0]
-PathProject = os.path.split(rootPath)[0]
-sys.path.append(rootPath)
-sys.path.append(PathProject)
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_automation_test.settings")
-django.setup()
+if __name__ == '__main__':
+    # 以脚本方式执行时加入项目目录并初始化Django，作为模块导入时由调用方初始化
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from api_test.common.bootstrap import setup
+    setup()
+
+from django.conf import settings
 
 from api_test.common.sendEmail import send_email
 from api_test.common.auto_task_test import test_api
-from api_test.models import AutomationCaseApi, AutomationTaskRunTime, AutomationTestCase, GlobalHost, Project
+from api_test.common.blob_store import release
+from api_test.common.latency import save_latency
+from api_test.common.parallel import build_dependency, run_parallel, upstream_closure
+from api_test.common.process_runner import run_processes
+from api_test.common.result_writer import ResultWriter, count_results
+from api_test.common.selection import select_changed
+from api_test.common.run_context import RunContext
+from api_test.models import AutomationApiLatency, AutomationCaseApi, AutomationCaseTestResult, AutomationTaskRunTime, \
+    AutomationTestCase, AutomationTestTask, GlobalHost, Project
+
+
+def run_apis(host, time, api_case, dependency, context, workers=1, engine='thread'):
+    """
+    执行接口
+    :param host: 测试的host域名
+    :param time: 测试时间
+    :param api_case: 按执行顺序排列的{接口ID: 用例ID}
+    :param dependency: {接口ID: 上游接口ID集合}，串行执行时不使用
+    :param context: 本次执行的RunContext
+    :param workers: 并发线程数，大于1时按接口关联关系并发执行
+    :param engine: 执行引擎，thread 线程执行，async 使用asyncio执行
+    :return: [执行结果]
+    """
+    if engine == 'async':
+        # aiohttp只在使用asyncio引擎时需要
+        from api_test.common.async_test import AsyncRunner
+        return list(AsyncRunner(host, time, context).run(api_case, dependency).values())
+    if workers > 1:
+        def run_api(i):
+            if context.cancelled():
+                return 'cancelled'
+            return test_api(host=host, case_id=api_case[i], _id=i, time=time, context=context)
+        return list(run_parallel(list(api_case), dependency, run_api, workers).values())
+    results = []
+    for _id, case_id in api_case.items():
+        if context.cancelled():
+            break
+        results.append(test_api(host=host, case_id=case_id, _id=_id, time=time, context=context))
+    return results
+
+
+def project_api_case(project_id, case_ids=None):
+    """
+    项目下所有用例接口，按执行顺序排列
+    :param project_id: 项目ID
+    :param case_ids: 只取这些用例下的接口，为空时取全部用例
+    :return: {接口ID: 用例ID}
+    """
+    api_case = OrderedDict()
+    cases = AutomationTestCase.objects.filter(project=project_id)
+    if case_ids:
+        cases = cases.filter(id__in=case_ids)
+    for j in cases:
+        for i in AutomationCaseApi.objects.filter(automationTestCase=j.pk).values_list('id', flat=True):
+            api_case[i] = j.pk
+    return api_case
+
+
+def execute(host, run, api_case, dependency, workers, engine, processes, cancel=None):
+    """
+    执行接口，测试结果写入执行记录
+    :param host: 测试的host域名
+    :param run: AutomationTaskRunTime
+    :param api_case: 按执行顺序排列的{接口ID: 用例ID}
+    :param dependency: {接口ID: 上游接口ID集合}
+    :param workers: 并发线程数
+    :param engine: 执行引擎
+    :param processes: 进程数
+    :param cancel: threading.Event，设置后不再执行未开始的接口，多进程执行时不支持
+    :return: {接口ID: Histogram}
+    """
+    if processes > 1:
+        _, latency = run_processes(host.id, run.startTime, api_case, dependency, processes, workers, engine, run.id)
+        return latency
+    writer = ResultWriter(run_id=run.id)
+    # 测试结果批量写入，执行结束或异常退出时写入剩余结果
+    with writer:
+        run_apis(host, run.startTime, api_case, dependency, RunContext(writer, cancel), workers, engine)
+    return writer.latency
+
 
+def _options(workers, engine, processes):
+    if workers is None:
+        workers = getattr(settings, 'AUTOMATION_TEST_WORKERS', 1)
+    if engine is None:
+        engine = getattr(settings, 'AUTOMATION_TEST_ENGINE', 'thread')
+    if processes is None:
+        processes = getattr(settings, 'AUTOMATION_TEST_PROCESSES', 1)
+    return workers, engine, processes
 
-def automation_task():
-    # data = AutomationCaseApi.objects.filter(automationTestCase=sys.argv[1])
+
+def automation_task(host_id, project_id, workers=None, engine=None, processes=None, smart=False, sample_rate=None,
+                    cancel=None, case_ids=None, task_id=None):
+    """
+    执行项目下所有用例接口
+    :param host_id: 测试域名ID
+    :param project_id: 项目ID
+    :param workers: 并发线程数，大于1时按接口关联关系并发执行
+    :param engine: 执行引擎，thread 线程执行，async 使用asyncio执行
+    :param processes: 进程数，大于1时按用例拆分到多个进程执行
+    :param smart: 只执行最近一次全部通过后有变更的接口及其上下游接口，并抽取部分其余接口
+    :param sample_rate: smart时未变更接口的抽取比例
+    :param cancel: threading.Event，设置后停止执行，执行记录状态为已取消
+    :param case_ids: 只执行这些用例，为空时执行全部用例
+    :param task_id: 触发执行的定时任务ID
+    :return:
+    """
+    workers, engine, processes = _options(workers, engine, processes)
     tz = pytz.timezone('Asia/Shanghai')
     start_time = datetime.datetime.now(tz)
     format_start_time = start_time.strftime('%Y-%m-%d %H:%M:%S')
-    case = AutomationTestCase.objects.filter(project=sys.argv[2])
-    host = GlobalHost.objects.get(id=sys.argv[1], project=sys.argv[2])
-    _pass = 0
-    fail = 0
-    error = 0
-    time_out = 0
-    for j in case:
-        data = AutomationCaseApi.objects.filter(automationTestCase=j.pk)
-        for i in data:
-            result = test_api(host=host, case_id=j.pk, _id=i.pk, time=format_start_time)
-            if result == 'success':
-                _pass = _pass+1
-            elif result == 'fail':
-                fail = fail+1
-            elif result == 'ERROR':
-                error = error+1
-            elif result == 'timeout':
-                time_out = time_out+1
-    total = _pass+fail+error+time_out
+    host = GlobalHost.objects.get(id=host_id, project=project_id)
+    run = AutomationTaskRunTime(project=Project.objects.get(id=project_id), task_id=task_id,
+                                startTime=format_start_time, elapsedTime=0, host=host.name, status='running')
+    run.save()
+    try:
+        api_case = project_api_case(project_id, case_ids)
+        dependency = {}
+        if smart:
+            dependency = build_dependency(list(api_case))
+            api_case = select_changed(project_id, api_case, dependency, sample_rate)
+            dependency = {_id: dependency[_id] for _id in api_case}
+        elif workers > 1 or engine == 'async' or processes > 1:
+            dependency = build_dependency(list(api_case))
+        latency = execute(host, run, api_case, dependency, workers, engine, processes, cancel)
+    except Exception:
+        finish_run(run, start_time, status='failed')
+        raise
+    if cancel is not None and cancel.is_set():
+        finish_run(run, start_time, status='cancelled')
+        return run
+    finish_run(run, start_time)
+    save_latency(run, latency)
+    send_result(run, start_time, project_id)
+    return run
+
+
+def rerun_failures(host_id, project_id, run_id, workers=None, engine=None, processes=None):
+    """
+    重新执行某次执行记录中失败、错误、超时的接口及其关联的上游接口，结果合并到该执行记录
+    :param host_id: 测试域名ID
+    :param project_id: 项目ID
+    :param run_id: 任务执行记录ID
+    :param workers: 并发线程数
+    :param engine: 执行引擎
+    :param processes: 进程数
+    :return: 重新执行的接口数
+    """
+    workers, engine, processes = _options(workers, engine, processes)
+    run = AutomationTaskRunTime.objects.get(id=run_id, project=project_id)
+    host = GlobalHost.objects.get(id=host_id, project=project_id)
+    api_case = project_api_case(project_id)
+    failed = set(AutomationCaseTestResult.objects.filter(run=run, result__in=('FAIL', 'ERROR', 'TimeOut'))
+                 .values_list('automationCaseApi', flat=True))
+    dependency = build_dependency(list(api_case))
+    selected = upstream_closure(failed.intersection(api_case), dependency)
+    api_case = OrderedDict((_id, case_id) for _id, case_id in api_case.items() if _id in selected)
+    if not api_case:
+        return 0
+    # 重新执行的接口只保留本次结果
+    results = AutomationCaseTestResult.objects.filter(run=run, automationCaseApi__in=list(api_case))
+    release(results)
+    results.delete()
+    AutomationApiLatency.objects.filter(run=run, automationCaseApi__in=list(api_case)).delete()
+    status = run.status
+    run.status = 'running'
+    run.save(update_fields=['status'])
+    try:
+        latency = execute(host, run, api_case, {_id: dependency[_id] for _id in api_case}, workers, engine,
+                          processes)
+    finally:
+        count_results(run)
+        run.status = status
+        run.save()
+    save_latency(run, latency)
+    return len(api_case)
+
+
+def send_result(run, start_time, project_id):
+    """
+    有未通过的接口时发送邮件
+    :param run: AutomationTaskRunTime
+    :param start_time: 开始时间
+    :param project_id: 项目ID
+    :return:
+    """
+    _pass, fail, error, time_out, total = run.passCount, run.failCount, run.errorCount, run.timeoutCount, run.total
     result_data = "Hi, all:\n    测试时间： %s\n" \
                   "    总执行测试接口数： %s:\n" \
                   "    成功： %s,  失败： %s, 执行错误： %s, 超时： %s\n" \
                   "    详情查看地址：http://apitest.60community.com/#/projectReport/project=%s" % (start_time, total,
                                                                                             _pass, fail, error, time_out
-                                                                                             , sys.argv[2])
+                                                                                             , project_id)
     if total != _pass:
-        if send_email(sys.argv[2], result_data):
+        if send_email(project_id, result_data):
             print("邮件发送成功")
         else:
             print("邮件发送失败")
-    elapsed_time = (datetime.datetime.now(tz) - start_time).seconds
-    AutomationTaskRunTime(project=Project.objects.get(id=sys.argv[2]), startTime=format_start_time,
-                          elapsedTime=elapsed_time, host=host.name).save()
+
+
+def finish_run(run, start_time, status='finished'):
+    """
+    统计执行结果，更新任务执行记录
+    :param run: AutomationTaskRunTime
+    :param start_time: 开始时间
+    :param status: 执行状态
+    :return:
+    """
+    tz = pytz.timezone('Asia/Shanghai')
+    end_time = datetime.datetime.now(tz)
+    count_results(run)
+    run.status = status
+    run.endTime = end_time.strftime('%Y-%m-%d %H:%M:%S')
+    run.duration = round((end_time - start_time).total_seconds(), 3)
+    run.elapsedTime = (end_time - start_time).seconds
+    run.save()
 
 
 if __name__ == '__main__':
-    automation_task()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('host_id', help='测试域名ID')
+    parser.add_argument('project_id', help='项目ID')
+    parser.add_argument('--workers', type=int, default=None, help='并发执行线程数')
+    parser.add_argument('--engine', choices=['thread', 'async'], default=None, help='执行引擎')
+    parser.add_argument('--processes', type=int, default=None, help='执行进程数')
+    parser.add_argument('--rerun', type=int, default=None, help='只重新执行该执行记录中未通过的接口')
+    parser.add_argument('--smart', action='store_true', help='只执行最近一次全部通过后有变更的接口')
+    parser.add_argument('--sample', type=float, default=None, help='smart时未变更接口的抽取比例')
+    parser.add_argument('--policy', choices=['skip', 'queue', 'cancel'], default=None,
+                        help='上一次执行未结束时的处理方式，为空时使用定时任务的设置')
+    parser.add_argument('--priority', type=int, default=None, help='排队时的优先级')
+    parser.add_argument('--direct', action='store_true', help='不经过执行队列直接执行')
+    parser.add_argument('--task', type=int, default=None, help='定时任务ID，按任务的用例、并发数执行')
+    args = parser.parse_args()
+    task = AutomationTestTask.objects.get(id=args.task, project=args.project_id) if args.task else None
+    if args.rerun:
+        rerun_failures(args.host_id, args.project_id, args.rerun, args.workers, args.engine, args.processes)
+    elif args.direct:
+        if task is not None:
+            automation_task(args.host_id, args.project_id, args.workers or task.workers, args.engine, args.processes,
+                            args.smart, args.sample, case_ids=list(task.cases.values_list('id', flat=True)),
+                            task_id=task.id)
+        else:
+            automation_task(args.host_id, args.project_id, args.workers, args.engine, args.processes, args.smart,
+                            args.sample)
+    else:
+        from api_test.common.run_queue import drain, enqueue
+        # crontab触发时经过执行队列，同一任务不重叠执行，本进程执行完后继续执行该项目排队中的执行
+        enqueue(args.project_id, args.host_id, task.type if task else 'circulation', task=task, priority=args.priority,
+                policy=args.policy)
+        drain(args.project_id, workers=args.workers, engine=args.engine, processes=args.processes,
+              smart=args.smart, sample_rate=args.sample)
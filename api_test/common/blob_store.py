@@ -0,0 +1,139 @@
+"""
+返回内容按内容寻址去重保存
+
+超过settings.RESPONSE_BLOB_THRESHOLD的返回内容保存到ResponseBlob，以内容的sha256为键，相同内容只保存一份，
+测试结果中只保存引用。ResponseBlob.refCount为引用数，删除测试结果前调用release减少引用，
+引用数为0的内容由purge_results清理。
+"""
+import hashlib
+from collections import Counter
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.functions import Substr
+
+from api_test.common.compression import MARKER, CompressedTextField
+
+REFERENCE = MARKER + 'sha256:'
+BODY_FIELDS = ('responseData', 'responseBody')
+
+
+def _blob_model():
+    return apps.get_model('api_test', 'ResponseBlob')
+
+
+def reference_digest(value):
+    """
+    引用中的sha256
+    :param value: 保存的内容
+    :return: 不是引用时返回None
+    """
+    if isinstance(value, str) and value.startswith(REFERENCE):
+        return value[len(REFERENCE):]
+    return None
+
+
+def store(text):
+    """
+    保存内容并增加引用数
+    :param text: 返回内容
+    :return: 引用
+    """
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    blob = _blob_model()
+    if not blob.objects.filter(digest=digest).update(refCount=F('refCount') + 1):
+        try:
+            with transaction.atomic():
+                blob.objects.create(digest=digest, content=text, size=len(text.encode('utf-8')), refCount=1)
+        except IntegrityError:
+            # 其他线程已保存相同内容
+            blob.objects.filter(digest=digest).update(refCount=F('refCount') + 1)
+    return REFERENCE + digest
+
+
+@lru_cache(maxsize=64)
+def load(digest):
+    """
+    读取内容，内容不可变，读取结果可缓存
+    :param digest: sha256
+    :return:
+    """
+    return _blob_model().objects.values_list('content', flat=True).get(digest=digest)
+
+
+def references(queryset, fields=BODY_FIELDS):
+    """
+    测试结果中的引用数
+    :param queryset: 测试结果
+    :param fields: 保存返回内容的字段
+    :return: Counter({sha256: 引用数})
+    """
+    # 只取引用长度的内容，避免读取时加载
+    length = len(REFERENCE) + 64
+    annotations = {'%sRef' % i: Substr(i, 1, length, output_field=models.CharField()) for i in fields}
+    counter = Counter()
+    for row in queryset.annotate(**annotations).values_list(*annotations):
+        counter.update(i for i in map(reference_digest, row) if i)
+    return counter
+
+
+def release(queryset, fields=BODY_FIELDS):
+    """
+    删除测试结果前减少引用数
+    :param queryset: 要删除的测试结果
+    :param fields: 保存返回内容的字段
+    :return:
+    """
+    blob = _blob_model()
+    for digest, count in references(queryset, fields).items():
+        blob.objects.filter(digest=digest).update(refCount=F('refCount') - count)
+
+
+def recount():
+    """
+    按全部测试结果重新统计引用数，修正级联删除等未调用release造成的偏差
+    :return:
+    """
+    counter = Counter()
+    for model in (apps.get_model('api_test', 'AutomationCaseTestResult'),
+                  apps.get_model('api_test', 'AutomationTestResult')):
+        counter.update(references(model.objects.all()))
+    blob = _blob_model()
+    with transaction.atomic():
+        blob.objects.update(refCount=0)
+        for digest, count in counter.items():
+            blob.objects.filter(digest=digest).update(refCount=count)
+
+
+def collect():
+    """
+    删除没有引用的内容
+    :return: 删除的数量
+    """
+    return _blob_model().objects.filter(refCount__lte=0).delete()[0]
+
+
+class BlobTextField(CompressedTextField):
+    """
+    去重保存的TextField，超过阈值的内容保存到ResponseBlob，读取时自动加载
+    """
+
+    def from_db_value(self, value, expression, connection):
+        digest = reference_digest(value)
+        if digest:
+            try:
+                return load(digest)
+            except ObjectDoesNotExist:
+                return None
+        return super(BlobTextField, self).from_db_value(value, expression, connection)
+
+    def get_db_prep_save(self, value, connection):
+        # 只在写入时保存内容，查询条件中的值不保存
+        threshold = getattr(settings, 'RESPONSE_BLOB_THRESHOLD', 1024)
+        if isinstance(value, str) and threshold is not None and len(value) >= threshold:
+            return store(value)
+        return super(BlobTextField, self).get_db_prep_save(value, connection)
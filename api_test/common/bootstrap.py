@@ -0,0 +1,39 @@
+"""
+Django初始化
+
+api_test.common下的模块导入时不初始化Django，以脚本方式执行时在入口调用setup()。
+HTTP请求、模板替换、结果校验等不访问数据库的模块（http_client、template、assertion、json_compare、jsonlib、
+timing、session_pool、throttle、histogram）可以在未配置Django时导入使用，读取配置通过setting()，
+未配置时使用默认值。
+"""
+import os
+
+SETTINGS_MODULE = 'api_automation_test.settings'
+
+
+def setup():
+    """
+    初始化Django，已初始化时不重复执行
+    :return:
+    """
+    import django
+    from django.apps import apps
+    if apps.ready:
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', SETTINGS_MODULE)
+    django.setup()
+
+
+def setting(name, default=None):
+    """
+    读取配置
+    :param name: 配置名
+    :param default: 未设置或未配置Django时的默认值
+    :return:
+    """
+    from django.conf import settings
+    from django.core.exceptions import ImproperlyConfigured
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
@@ -1,26 +1,19 @@
 import datetime
 
-import django
-import sys
-import os
-
-from api_test.serializers import ProjectDynamicDeserializer
-
-curPath = os.path.abspath(os.path.dirname(__file__))
-rootPath = os.path.split(curPath)[0]
-PathProject = os.path.split(rootPath)[0]
-sys.path.append(rootPath)
-sys.path.append(PathProject)
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_automation_test.settings")
-django.setup()
-
 from crontab import CronTab
 from rest_framework.views import exception_handler
 
 from api_test.common import GlobalStatusCode
+from api_test.common.addTask import task_comment
 from api_test.common.api_response import JsonResponse
+from api_test.common.assertion import Assertion
+from api_test.common.blob_store import release
+from api_test.common.jsonlib import response_fields
+from api_test.common.scheduler import daemon_mode
+from api_test.common.timing import timing_fields
 from api_test.models import AutomationTestResult, AutomationCaseApi, AutomationResponseJson, \
     AutomationCaseTestResult
+from api_test.serializers import ProjectDynamicDeserializer
 
 
 def custom_exception_handler(exc, context):
@@ -84,43 +77,22 @@ def verify_parameter(expect_parameter, method):
     return api
 
 
-result = 'success'
-
-
 def check_json(src_data, dst_data):
     """
     校验的json
     :param src_data:  校验内容
     :param dst_data:  接口返回的数据（被校验的内容
-    :return:
+    :return: success 通过，fail 不通过
     """
-    global result
     try:
-        if isinstance(src_data, dict):
-            """若为dict格式"""
-            for key in src_data:
-                if key not in dst_data:
-                    result = 'fail'
-                else:
-                    # if src_data[key] != dst_data[key]:
-                    #     result = False
-                    this_key = key
-                    """递归"""
-                    if isinstance(src_data[this_key], dict) and isinstance(dst_data[this_key], dict):
-                        check_json(src_data[this_key], dst_data[this_key])
-                    elif isinstance(type(src_data[this_key]), type(dst_data[this_key])):
-                        result = 'fail'
-                    else:
-                        pass
-            return result
-        return 'fail'
-
-    except Exception as e:
+        return 'fail' if Assertion(src_data).verify(dst_data) else 'success'
+    except Exception:
         return 'fail'
 
 
 def record_results(_id, url, request_type, header, parameter, host,
-                   status_code, examine_type, examine_data, _result, code, response_data):
+                   status_code, examine_type, examine_data, _result, code, response_data, timing=None, message=None,
+                   body=None):
     """
     记录手动测试结果
     :param _id: ID
@@ -135,22 +107,29 @@ def record_results(_id, url, request_type, header, parameter, host,
     :param code:  HTTP状态码
     :param response_data:  返回结果
     :param host:  测试地址
+    :param timing:  请求耗时
+    :param message:  校验失败信息
+    :param body:  原始返回内容
     :return:
     """
+    fields = response_fields(response_data, body)
+    fields.update(timing_fields(timing))
     rt = AutomationTestResult.objects.filter(automationCaseApi=_id)
     if rt:
+        release(rt)
         rt.update(url=url, requestType=request_type, header=header, parameter=parameter, host=host,
                   statusCode=status_code, examineType=examine_type, data=examine_data,
-                  result=_result, httpStatus=code, responseData=response_data)
+                  result=_result, httpStatus=code, examineMessage=message, **fields)
     else:
         result_ = AutomationTestResult(automationCaseApi=AutomationCaseApi.objects.get(id=_id), host=host,
                                        url=url, requestType=request_type, header=header, parameter=parameter,
                                        statusCode=status_code, examineType=examine_type, data=examine_data,
-                                       result=_result, httpStatus=code, responseData=response_data)
+                                       result=_result, httpStatus=code, examineMessage=message, **fields)
         result_.save()
 
 
-def record_auto_results(_id, time,  header, parameter, _result, code, response_data):
+def record_auto_results(_id, time,  header, parameter, _result, code, response_data, writer=None, timing=None,
+                        message=None, body=None):
     """
     记录自动测试结果
     :param _id: ID
@@ -160,11 +139,20 @@ def record_auto_results(_id, time,  header, parameter, _result, code, response_d
     :param _result:  是否通过
     :param code:  HTTP状态码
     :param response_data:  返回结果
+    :param writer: ResultWriter，有时写入缓冲批量保存
+    :param timing:  请求耗时
+    :param message:  校验失败信息
+    :param body:  原始返回内容
     :return:
     """
-    result_ = AutomationCaseTestResult(automationCaseApi=AutomationCaseApi.objects.get(id=_id), header=header,
+    if writer is not None:
+        writer.add(_id=_id, time=time, header=header, parameter=parameter, _result=_result, code=code,
+                   response_data=response_data, timing=timing, message=message, body=body)
+        return
+    result_ = AutomationCaseTestResult(automationCaseApi_id=_id, header=header,
                                        parameter=parameter, testTime=time,
-                                       result=_result, httpStatus=code, responseData=response_data)
+                                       result=_result, httpStatus=code, examineMessage=message,
+                                       **response_fields(response_data, body), **timing_fields(timing))
     result_.save()
 
 
@@ -183,11 +171,20 @@ def create_json(api_id, api, data):
             create_json(api_id, m, data[i])
 
 
-def del_task_crontab(project):
+def del_task_crontab(project, task_ids=()):
+    """
+    删除crontab中的任务
+    :param project: 项目ID
+    :param task_ids: 任务ID，同时删除旧版本按项目添加的任务
+    :return:
+    """
+    if daemon_mode():
+        return
     my_user_cron = CronTab(user=True)
-    my_user_cron.remove_all(comment=project)
-    my_user_cron.remove_all(comment=project+"_开始")
-    my_user_cron.remove_all(comment=project+"_结束")
+    for comment in [task_comment(project)] + [task_comment(project, i) for i in task_ids]:
+        my_user_cron.remove_all(comment=comment)
+        my_user_cron.remove_all(comment=comment+"_开始")
+        my_user_cron.remove_all(comment=comment+"_结束")
     my_user_cron.write()
 
 
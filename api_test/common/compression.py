@@ -0,0 +1,77 @@
+"""
+返回内容压缩存储
+
+超过阈值的文本压缩后以base64保存在原TextField中，开头为压缩方式标记，读取时自动解压，
+没有标记的内容（旧数据或未达到阈值）原样读取
+"""
+import base64
+import lzma
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+MARKER = '\x1f'
+
+CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+
+def compress_text(text, method=None, threshold=None):
+    """
+    压缩文本，未达到阈值或压缩后更大时不压缩
+    :param text: 文本
+    :param method: 压缩方式 zlib、lzma，为空时使用settings.RESPONSE_COMPRESSION，设置为None时不压缩
+    :param threshold: 压缩阈值（字节），为空时使用settings.RESPONSE_COMPRESSION_THRESHOLD
+    :return:
+    """
+    if not isinstance(text, str):
+        return text
+    if method is None:
+        method = getattr(settings, 'RESPONSE_COMPRESSION', 'zlib')
+    if threshold is None:
+        threshold = getattr(settings, 'RESPONSE_COMPRESSION_THRESHOLD', 1024)
+    data = text.encode('utf-8')
+    if method in CODECS and len(data) >= threshold:
+        value = '%s%s:%s' % (MARKER, method, base64.b64encode(CODECS[method][0](data)).decode('ascii'))
+        if len(value) < len(text):
+            return value
+    if text.startswith(MARKER):
+        # 原文本以标记开头时加上raw标记，避免读取时被当作压缩内容
+        return '%sraw:%s' % (MARKER, text)
+    return text
+
+
+def decompress_text(value):
+    """
+    解压compress_text的结果
+    :param value: 保存的内容
+    :return:
+    """
+    if not isinstance(value, str) or not value.startswith(MARKER):
+        return value
+    method, _, data = value[1:].partition(':')
+    if method == 'raw':
+        return data
+    return CODECS[method][1](base64.b64decode(data)).decode('utf-8')
+
+
+def is_compressed(value):
+    return isinstance(value, str) and value.startswith(MARKER)
+
+
+class CompressedTextField(models.TextField):
+    """
+    压缩保存的TextField，读写时自动解压、压缩
+    """
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def to_python(self, value):
+        return decompress_text(super(CompressedTextField, self).to_python(value))
+
+    def get_prep_value(self, value):
+        return compress_text(super(CompressedTextField, self).get_prep_value(value))
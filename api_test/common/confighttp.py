@@ -1,27 +1,16 @@
-import django
-import sys
-import os
-
-
-curPath = os.path.abspath(os.path.dirname(__file__))
-rootPath = os.path.split(curPath)[0]
-PathProject = os.path.split(rootPath)[0]
-sys.path.append(rootPath)
-sys.path.append(PathProject)
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_automation_test.settings")
-django.setup()
-
 import json
 import logging
 import re
-import operator
 
-import requests
-import simplejson
 from django.core import serializers
 from requests import ReadTimeout
 
-from api_test.common.common import check_json, record_results
+from api_test.common.assertion import compile_json, describe
+from api_test.common.common import record_results
+from api_test.common.http_client import delete, get, post, put
+from api_test.common.json_compare import compare
+from api_test.common.jsonlib import decode_response, loads_literal, response_text
+from api_test.common.template import parse
 from api_test.models import GlobalHost, AutomationCaseApi, AutomationParameter, AutomationTestResult, AutomationHead, \
     AutomationParameterRaw
 from api_test.serializers import AutomationCaseApiSerializer, AutomationParameterRawSerializer
@@ -53,6 +42,14 @@ def test_api(host_id, case_id, project_id, _id):
         url = 'http://'+address
     else:
         url = 'https://'+address
+
+    def load_json(api_id):
+        return decode_response(AutomationTestResult.objects.filter(automationCaseApi=api_id)
+                               .values_list('responseData', flat=True).last())
+
+    def load_text(api_id):
+        return response_text(load_json(api_id))
+
     if data['requestParameterType'] == 'form-data':
         parameter_list = json.loads(serializers.serialize('json',
                                                           AutomationParameter.objects.filter(automationCaseApi=_id)))
@@ -64,45 +61,10 @@ def test_api(host_id, case_id, project_id, _id):
 
             try:
                 if i['fields']['interrelate']:
-                    interrelate_type = re.findall('(?<=<response\[).*?(?=\])', value)
-                    if interrelate_type[0] == "JSON":
-                        api_id = re.findall('(?<=<response\[JSON]\[).*?(?=\])', value)
-                        a = re.findall('(?<=\[").*?(?="])', value)
-                        try:
-                            param_data = eval(json.loads(serializers.serialize(
-                                'json',
-                                AutomationTestResult.objects.filter(automationCaseApi=api_id[0])))
-                                              [0]['fields']["responseData"])
-                            for j in a:
-                                param_data = param_data[j]
-                        except Exception as e:
-                            logging.exception(e)
-                            record_results(_id=_id, url=url, request_type=request_type, header=header,
-                                           parameter=parameter,
-                                           host=host.name,
-                                           status_code=http_code, examine_type=examine_type,
-                                           examine_data=response_parameter_list,
-                                           _result='ERROR', code="", response_data="关联有误！")
-                            return 'fail'
-                    elif interrelate_type[0] == "Regular":
-                        api_id = re.findall('(?<=<response\[Regular]\[).*?(?=\])', value)
-                        pattern = re.findall('(?<=\[").*?(?="])', value)
-                        param_data = json.loads(serializers.serialize(
-                            'json',
-                            AutomationTestResult.objects.filter(automationCaseApi=api_id[0])))[-1]['fields']["responseData"]
-                        param_data = re.findall(pattern[0], param_data.replace("\'", "\""))[0]
-                    else:
-                        record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
-                                       host=host.name,
-                                       status_code=http_code, examine_type=examine_type, examine_data=response_parameter_list,
-                                       _result='ERROR', code="", response_data="")
-                        return 'fail'
-                    pattern = re.compile(r'<response\[.*]')
-                    parameter[key_] = re.sub(pattern, str(param_data), value)
-
+                    parameter[key_] = parse(value).render(load_json, load_text)
                 else:
                     parameter[key_] = value
-            except KeyError as e:
+            except Exception as e:
                 logging.exception(e)
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                host=host.name,
@@ -118,7 +80,7 @@ def test_api(host_id, case_id, project_id, _id):
         if len(parameter):
             if len(parameter[0]["data"]):
                 try:
-                    parameter = eval(parameter[0]["data"])
+                    parameter = loads_literal(parameter[0]["data"])
                 except Exception as e:
                     logging.exception(e)
                     record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
@@ -135,42 +97,8 @@ def test_api(host_id, case_id, project_id, _id):
         key_ = i['fields']['name']
         value = i['fields']['value']
         if i['fields']['interrelate']:
-
             try:
-                interrelate_type = re.findall('(?<=<response\[).*?(?=\])', value)
-                if interrelate_type[0] == "JSON":
-                    api_id = re.findall('(?<=<response\[JSON]\[).*?(?=\])', value)
-                    a = re.findall('(?<=\[").*?(?="])', value)
-                    try:
-                        param_data = eval(json.loads(serializers.serialize(
-                            'json',
-                            AutomationTestResult.objects.filter(automationCaseApi=api_id[0])))[-1]['fields']["responseData"])
-                        for j in a:
-                            param_data = param_data[j]
-                    except Exception as e:
-                        logging.exception(e)
-                        record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
-                                       host=host.name,
-                                       status_code=http_code, examine_type=examine_type,
-                                       examine_data=response_parameter_list,
-                                       _result='ERROR', code="", response_data="关联有误！")
-                        return 'fail'
-                elif interrelate_type[0] == "Regular":
-                    api_id = re.findall('(?<=<response\[Regular]\[).*?(?=\])', value)
-                    pattern = re.findall('(?<=\[").*?(?="])', value)
-                    param_data = json.loads(serializers.serialize(
-                        'json',
-                        AutomationTestResult.objects.filter(automationCaseApi=api_id[0])))[0]['fields']["responseData"]
-                    param_data = re.findall(pattern[0], param_data.replace("\'", "\""))[0]
-                else:
-                    record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
-                                   host=host.name,
-                                   status_code=http_code, examine_type=examine_type,
-                                   examine_data=response_parameter_list,
-                                   _result='ERROR', code="", response_data="")
-                    return 'fail'
-                pattern = re.compile(r'<response\[.*]')
-                header[key_] = re.sub(pattern, str(param_data), value)
+                header[key_] = parse(value).render(load_json, load_text)
             except Exception as e:
                 logging.exception(e)
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
@@ -183,13 +111,13 @@ def test_api(host_id, case_id, project_id, _id):
     # header["Content-Length"] = '%s' % len(str(parameter))
     try:
         if request_type == 'GET':
-            code, response_data = get(header, url, request_parameter_type, parameter)
+            code, response_data, timing, body = get(header, url, request_parameter_type, parameter)
         elif request_type == 'POST':
-            code, response_data = post(header, url, request_parameter_type, parameter)
+            code, response_data, timing, body = post(header, url, request_parameter_type, parameter)
         elif request_type == 'PUT':
-            code, response_data = put(header, url, request_parameter_type, parameter)
+            code, response_data, timing, body = put(header, url, request_parameter_type, parameter)
         elif request_type == 'DELETE':
-            code, response_data = delete(header, url, parameter)
+            code, response_data, timing, body = delete(header, url, request_parameter_type, parameter)
         else:
             return 'ERROR'
     except ReadTimeout:
@@ -201,68 +129,71 @@ def test_api(host_id, case_id, project_id, _id):
     if examine_type == 'no_check':
         record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter, host=host.name,
                        status_code=http_code, examine_type=examine_type, examine_data=response_parameter_list,
-                       _result='PASS', code=code, response_data=response_data)
+                       _result='PASS', code=code, response_data=response_data,
+                       timing=timing, body=body)
         return 'success'
 
     elif examine_type == 'json':
         if int(http_code) == code:
             if not response_parameter_list:
                 response_parameter_list = "{}"
-            try:
-                logging.info(response_parameter_list)
-                logging.info(response_data)
-                result = check_json(json.loads(response_parameter_list), response_data)
-            except Exception:
-                logging.info(response_parameter_list)
-                result = check_json(eval(response_parameter_list.replace('true', 'True').replace('false', 'False')), response_data)
-            if result:
+            logging.info(response_parameter_list)
+            logging.info(response_data)
+            # 手动测试返回全部失败项
+            failures = compile_json(response_parameter_list).verify(response_data, diagnostic=True)
+            if not failures:
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                status_code=http_code, examine_type="JSON校验", examine_data=response_parameter_list,
-                               host=host.name, _result='PASS', code=code, response_data=response_data)
+                               host=host.name, _result='PASS', code=code, response_data=response_data,
+                               timing=timing, body=body)
+                return 'success'
             else:
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                status_code=http_code, examine_type="JSON校验", examine_data=response_parameter_list,
-                               host=host.name, _result='FAIL', code=code, response_data=response_data)
-            return result
+                               host=host.name, _result='FAIL', code=code, response_data=response_data,
+                               timing=timing, body=body, message=describe(failures))
+                return 'fail'
         else:
             record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                            status_code=http_code, examine_type="JSON校验", examine_data=response_parameter_list,
-                           host=host.name, _result='FAIL', code=code, response_data=response_data)
+                           host=host.name, _result='FAIL', code=code, response_data=response_data,
+                           timing=timing, body=body)
             return 'fail'
 
     elif examine_type == 'only_check_status':
         if int(http_code) == code:
             record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                            status_code=http_code, examine_type="校验HTTP状态", examine_data=response_parameter_list,
-                           host=host.name, _result='PASS', code=code, response_data=response_data)
+                           host=host.name, _result='PASS', code=code, response_data=response_data,
+                           timing=timing, body=body)
             return 'success'
         else:
             record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                            status_code=http_code, examine_type="校验HTTP状态", examine_data=response_parameter_list,
-                           host=host.name, _result='FAIL', code=code, response_data=response_data)
+                           host=host.name, _result='FAIL', code=code, response_data=response_data,
+                           timing=timing, body=body)
             return 'fail'
 
     elif examine_type == 'entirely_check':
         if int(http_code) == code:
-            try:
-                result = operator.eq(json.loads(response_parameter_list), response_data)
-            except Exception as e:
-                logging.exception(e)
-                result = operator.eq(eval(response_parameter_list.replace('true', 'True').replace('false', 'False')), response_data)
-            if result:
+            failure = compare(response_parameter_list, response_data)
+            if not failure:
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                status_code=http_code, examine_type="完全校验", examine_data=response_parameter_list,
-                               host=host.name, _result='PASS', code=code, response_data=response_data)
+                               host=host.name, _result='PASS', code=code, response_data=response_data,
+                               timing=timing, body=body)
                 return 'success'
             else:
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                status_code=http_code, examine_type="完全校验", examine_data=response_parameter_list,
-                               host=host.name, _result='FAIL', code=code, response_data=response_data)
+                               host=host.name, _result='FAIL', code=code, response_data=response_data,
+                               timing=timing, body=body, message=str(failure))
                 return 'fail'
         else:
             record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                            status_code=http_code, examine_type="完全校验", examine_data=response_parameter_list,
-                           host=host.name, _result='FAIL', code=code, response_data=response_data)
+                           host=host.name, _result='FAIL', code=code, response_data=response_data,
+                           timing=timing, body=body)
             return 'fail'
 
     elif examine_type == 'Regular_check':
@@ -277,121 +208,25 @@ def test_api(host_id, case_id, project_id, _id):
             if result:
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                status_code=http_code, examine_type="正则校验", examine_data=response_parameter_list,
-                               host=host.name, _result='PASS', code=code, response_data=response_data)
+                               host=host.name, _result='PASS', code=code, response_data=response_data,
+                               timing=timing, body=body)
                 return 'success'
             else:
                 record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                                status_code=http_code, examine_type="正则校验", examine_data=response_parameter_list,
-                               host=host.name, _result='FAIL', code=code, response_data=response_data)
+                               host=host.name, _result='FAIL', code=code, response_data=response_data,
+                               timing=timing, body=body)
                 return 'fail'
         else:
             record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                            status_code=http_code, examine_type="正则校验", examine_data=response_parameter_list,
-                           host=host.name, _result='FAIL', code=code, response_data=response_data)
+                           host=host.name, _result='FAIL', code=code, response_data=response_data,
+                           timing=timing, body=body)
             return 'fail'
 
     else:
         record_results(_id=_id, url=url, request_type=request_type, header=header, parameter=parameter,
                        status_code=http_code, examine_type=examine_type, examine_data=response_parameter_list,
-                       host=host.name, _result='FAIL', code=code, response_data=response_data)
+                       host=host.name, _result='FAIL', code=code, response_data=response_data,
+                       timing=timing, body=body)
         return 'fail'
-
-
-def post(header, address, request_parameter_type, data):
-    """
-    post 请求
-    :param header:  请求头
-    :param address:  host地址
-    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
-    :param data: 请求参数
-    :return:
-    """
-    if request_parameter_type == 'raw':
-        data = json.dumps(data)
-    response = requests.post(url=address, data=data, headers=header, timeout=8)
-    try:
-        return response.status_code, response.json()
-    except json.decoder.JSONDecodeError:
-        return response.status_code, ''
-    except simplejson.errors.JSONDecodeError:
-        return response.status_code, ''
-    except Exception as e:
-        logging.exception('ERROR')
-        logging.error(e)
-        return {}, {}
-
-
-def get(header, address, request_parameter_type, data):
-    """
-    get 请求
-    :param header:  请求头
-    :param address:  host地址
-    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
-    :param data: 请求参数
-    :return:
-    """
-    if request_parameter_type == 'raw':
-        data = json.dumps(data)
-    response = requests.get(url=address, params=data, headers=header, timeout=8)
-    if response.status_code == 301:
-        response = requests.get(url=response.headers["location"])
-    try:
-        return response.status_code, response.json()
-    except json.decoder.JSONDecodeError:
-        return response.status_code, ''
-    except simplejson.errors.JSONDecodeError:
-        return response.status_code, ''
-    except Exception as e:
-        logging.exception('ERROR')
-        logging.error(e)
-        return {}, {}
-
-
-def put(header, address, request_parameter_type, data):
-    """
-    put 请求
-    :param header:  请求头
-    :param address:  host地址
-    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
-    :param data: 请求参数
-    :return:
-    """
-    if request_parameter_type == 'raw':
-        data = json.dumps(data)
-    response = requests.put(url=address, data=data, headers=header, timeout=8)
-    try:
-        return response.status_code, response.json()
-    except json.decoder.JSONDecodeError:
-        return response.status_code, ''
-    except simplejson.errors.JSONDecodeError:
-        return response.status_code, ''
-    except Exception as e:
-        logging.exception('ERROR')
-        logging.error(e)
-        return {}, {}
-
-
-def delete(header, address, data):
-    """
-    put 请求
-    :param header:  请求头
-    :param address:  host地址
-    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
-    :param data: 请求参数
-    :return:
-    """
-    print(header)
-    print(address)
-    print(data)
-    response = requests.delete(url=address, params=data, headers=header)
-    try:
-        return response.status_code, response.json()
-    except json.decoder.JSONDecodeError:
-        return response.status_code, ''
-    except simplejson.errors.JSONDecodeError:
-        return response.status_code, ''
-    except Exception as e:
-        logging.exception('ERROR')
-        logging.error(e)
-        return {}, {}
-
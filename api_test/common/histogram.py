@@ -0,0 +1,125 @@
+"""
+HDR风格的延迟直方图
+
+数值按2的幂分段，每段再等分为固定数量的子桶，相对误差不超过 1/2^(sub_bucket_bits-1)，
+记录和合并都是O(1)，只保存非零桶，适合大量请求的延迟统计
+"""
+import json
+
+
+class Histogram(object):
+    """
+    延迟直方图，数值为整数（如微秒）
+    """
+
+    def __init__(self, sub_bucket_bits=7):
+        """
+        :param sub_bucket_bits: 子桶位数，7位时相对误差小于1.6%
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+
+    def _value(self, index):
+        """
+        桶内的最大值
+        :param index: 桶序号
+        :return:
+        """
+        if index < self.sub_bucket_count:
+            return index
+        shift, top = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        return ((top + self.half_count + 1) << shift) - 1
+
+    def record(self, value, count=1):
+        """
+        记录数值
+        :param value: 数值，小于0时按0记录
+        :param count: 次数
+        :return:
+        """
+        value = max(0, int(value))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        合并另一个直方图
+        :param other: Histogram，子桶位数需相同
+        :return:
+        """
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError('sub_bucket_bits不一致')
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def percentile(self, percent):
+        """
+        百分位数
+        :param percent: 百分比，如99.9
+        :return: 没有数据时返回None
+        """
+        if not self.count:
+            return None
+        rank = max(1, int(round(percent / 100.0 * self.count + 0.5 - 1e-9)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._value(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def encode(self):
+        """
+        编码为紧凑字符串，只保存非零桶
+        :return:
+        """
+        return json.dumps({
+            'b': self.sub_bucket_bits,
+            'c': sorted(self.counts.items()),
+            't': self.total,
+            'min': self.min,
+            'max': self.max,
+        }, separators=(',', ':'))
+
+    @classmethod
+    def decode(cls, data):
+        """
+        由encode的结果还原
+        :param data: 编码后的字符串
+        :return:
+        """
+        data = json.loads(data)
+        histogram = cls(data['b'])
+        histogram.counts = {int(index): count for index, count in data['c']}
+        histogram.count = sum(histogram.counts.values())
+        histogram.total = data['t']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
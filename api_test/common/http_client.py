@@ -0,0 +1,121 @@
+"""
+接口请求
+
+只依赖requests，不访问数据库，未配置Django时也可以导入使用
+"""
+import json
+import logging
+
+from requests.utils import guess_json_utf
+
+from api_test.common.jsonlib import parse_body
+from api_test.common.session_pool import get_session_pool
+from api_test.common.timing import timed_request
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+def _text(response):
+    """
+    返回内容文本，未指定编码时与response.json()一样按JSON的UTF编码解码，不使用chardet检测
+    :param response: requests的Response
+    :return:
+    """
+    if not response.encoding and response.content:
+        encoding = guess_json_utf(response.content)
+        if encoding is not None:
+            try:
+                return response.content.decode(encoding)
+            except UnicodeDecodeError:
+                pass
+    return response.text
+
+
+def post(header, address, request_parameter_type, data):
+    """
+    post 请求
+    :param header:  请求头
+    :param address:  host地址
+    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
+    :param data: 请求参数
+    :return: (HTTP状态码, 返回内容, 请求耗时, 原始返回内容)
+    """
+    if request_parameter_type == 'raw':
+        data = json.dumps(data)
+    response, timing = timed_request(get_session_pool().request, 'POST', address, data=data, headers=header,
+                                     timeout=8)
+    try:
+        response_data, body = parse_body(_text(response), response.headers.get('Content-Type'))
+        return response.status_code, response_data, timing, body
+    except Exception as e:
+        logging.exception('ERROR')
+        logging.error(e)
+        return {}, {}, timing, None
+
+
+def get(header, address, request_parameter_type, data):
+    """
+    get 请求
+    :param header:  请求头
+    :param address:  host地址
+    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
+    :param data: 请求参数
+    :return: (HTTP状态码, 返回内容, 请求耗时, 原始返回内容)
+    """
+    if request_parameter_type == 'raw':
+        data = json.dumps(data)
+    response, timing = timed_request(get_session_pool().request, 'GET', address, params=data, headers=header,
+                                     timeout=8)
+    if response.status_code == 301:
+        response, redirect_timing = timed_request(get_session_pool().request, 'GET', response.headers["location"])
+        timing = timing + redirect_timing
+    try:
+        response_data, body = parse_body(_text(response), response.headers.get('Content-Type'))
+        return response.status_code, response_data, timing, body
+    except Exception as e:
+        logging.exception('ERROR')
+        logging.error(e)
+        return {}, {}, timing, None
+
+
+def put(header, address, request_parameter_type, data):
+    """
+    put 请求
+    :param header:  请求头
+    :param address:  host地址
+    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
+    :param data: 请求参数
+    :return: (HTTP状态码, 返回内容, 请求耗时, 原始返回内容)
+    """
+    if request_parameter_type == 'raw':
+        data = json.dumps(data)
+    response, timing = timed_request(get_session_pool().request, 'PUT', address, data=data, headers=header,
+                                     timeout=8)
+    try:
+        response_data, body = parse_body(_text(response), response.headers.get('Content-Type'))
+        return response.status_code, response_data, timing, body
+    except Exception as e:
+        logging.exception('ERROR')
+        logging.error(e)
+        return {}, {}, timing, None
+
+
+def delete(header, address, request_parameter_type, data):
+    """
+    delete 请求
+    :param header:  请求头
+    :param address:  host地址
+    :param request_parameter_type: 接口请求参数格式 （form-data, raw, Restful）
+    :param data: 请求参数
+    :return: (HTTP状态码, 返回内容, 请求耗时, 原始返回内容)
+    """
+    logger.debug('DELETE %s 请求头: %s 请求参数: %s', address, header, data)
+    response, timing = timed_request(get_session_pool().request, 'DELETE', address, params=data, headers=header)
+    try:
+        response_data, body = parse_body(_text(response), response.headers.get('Content-Type'))
+        return response.status_code, response_data, timing, body
+    except Exception as e:
+        logging.exception('ERROR')
+        logging.error(e)
+        return {}, {}, timing, None
+
@@ -0,0 +1,159 @@
+"""
+完全校验的流式比较
+
+按期望内容的文本逐段解析并与返回数据比较，遇到第一个不一致即停止，不生成完整的期望对象。
+数组逐个元素比较，作为数组元素的对象使用json的C实现整体解析后比较，
+内存占用只与单个元素的大小有关。
+"""
+from json import JSONDecoder
+from json.decoder import WHITESPACE, scanstring
+
+from api_test.common.assertion import Failure, brief, key_path, type_name, load_expected
+
+_decoder = JSONDecoder()
+
+
+class _Mismatch(Exception):
+
+    def __init__(self, failure):
+        super(_Mismatch, self).__init__(failure)
+        self.failure = failure
+
+
+def first_difference(expected, actual, path='$'):
+    """
+    已解析的期望内容与返回数据的第一个不一致
+    :param expected: 期望内容
+    :param actual: 返回数据
+    :param path: 当前路径
+    :return: Failure，一致时返回None
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key, value in expected.items():
+            if key not in actual:
+                return Failure(key_path(path, key), 'presence', key, None)
+            failure = first_difference(value, actual[key], key_path(path, key))
+            if failure:
+                return failure
+        for key in actual:
+            if key not in expected:
+                return Failure(key_path(path, key), 'unexpected', None, actual[key])
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        for index, (value, item) in enumerate(zip(expected, actual)):
+            failure = first_difference(value, item, '%s[%s]' % (path, index))
+            if failure:
+                return failure
+        if len(expected) != len(actual):
+            return Failure(path, 'length', len(expected), len(actual))
+        return None
+    if type_name(expected) != type_name(actual) and not (expected == actual):
+        return Failure(path, 'type', type_name(expected), type_name(actual))
+    if expected != actual:
+        return Failure(path, 'value', brief(expected), actual)
+    return None
+
+
+class _StreamComparator(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def _skip(self, idx):
+        return WHITESPACE.match(self.text, idx).end()
+
+    def _expect(self, idx, char):
+        if self.text[idx:idx + 1] != char:
+            raise ValueError('期望内容不是合法的JSON，位置 %s 应为 %s' % (idx, char))
+        return idx + 1
+
+    def value(self, idx, actual, path, whole=False):
+        """
+        比较从idx开始的一个值
+        :param idx: 值在期望内容中的起始位置
+        :param actual: 返回数据
+        :param path: 当前路径
+        :param whole: 对象整体解析后比较
+        :return: 值结束的位置
+        """
+        char = self.text[idx:idx + 1]
+        if char == '[':
+            return self.array(idx, actual, path)
+        if char == '{' and not whole:
+            return self.object(idx, actual, path)
+        expected, end = _decoder.raw_decode(self.text, idx)
+        if expected != actual:
+            failure = first_difference(expected, actual, path)
+            if failure:
+                raise _Mismatch(failure)
+        return end
+
+    def object(self, idx, actual, path):
+        if not isinstance(actual, dict):
+            raise _Mismatch(Failure(path, 'type', 'object', type_name(actual)))
+        idx = self._skip(idx + 1)
+        seen = set()
+        if self.text[idx:idx + 1] == '}':
+            idx += 1
+        else:
+            while True:
+                idx = self._expect(idx, '"')
+                key, idx = scanstring(self.text, idx)
+                idx = self._skip(self._expect(self._skip(idx), ':'))
+                field = key_path(path, key)
+                if key not in actual:
+                    raise _Mismatch(Failure(field, 'presence', key, None))
+                idx = self._skip(self.value(idx, actual[key], field))
+                seen.add(key)
+                if self.text[idx:idx + 1] == ',':
+                    idx = self._skip(idx + 1)
+                    continue
+                idx = self._expect(idx, '}')
+                break
+        if len(seen) != len(actual):
+            key = next(i for i in actual if i not in seen)
+            raise _Mismatch(Failure(key_path(path, key), 'unexpected', None, actual[key]))
+        return idx
+
+    def array(self, idx, actual, path):
+        if not isinstance(actual, list):
+            raise _Mismatch(Failure(path, 'type', 'array', type_name(actual)))
+        idx = self._skip(idx + 1)
+        count = 0
+        if self.text[idx:idx + 1] == ']':
+            idx += 1
+        else:
+            while True:
+                if count >= len(actual):
+                    raise _Mismatch(Failure(path, 'length', '> %s' % count, len(actual)))
+                idx = self._skip(self.value(idx, actual[count], '%s[%s]' % (path, count), whole=True))
+                count += 1
+                if self.text[idx:idx + 1] == ',':
+                    idx = self._skip(idx + 1)
+                    continue
+                idx = self._expect(idx, ']')
+                break
+        if count != len(actual):
+            raise _Mismatch(Failure(path, 'length', count, len(actual)))
+        return idx
+
+    def compare(self, actual):
+        idx = self.value(self._skip(0), actual, '$')
+        if self._skip(idx) != len(self.text):
+            raise ValueError('期望内容不是合法的JSON，位置 %s 存在多余内容' % idx)
+
+
+def compare(text, actual):
+    """
+    完全校验，期望内容不是JSON时按Python字面量解析后比较
+    :param text: 期望的返回内容
+    :param actual: 接口返回的数据
+    :return: Failure，一致时返回None
+    """
+    try:
+        _StreamComparator(text or '').compare(actual)
+    except _Mismatch as e:
+        return e.failure
+    except ValueError:
+        return first_difference(load_expected(text), actual)
+    return None
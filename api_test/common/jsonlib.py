@@ -0,0 +1,168 @@
+"""
+JSON解析与序列化
+
+解析使用的库由settings.JSON_BACKEND指定: json、simplejson、ujson、orjson，未安装时使用标准库json。
+测试结果中的返回内容以JSON保存，读取旧数据（Python字面量格式）时使用ast.literal_eval，不使用eval。
+"""
+import ast
+import json
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+from api_test.common.bootstrap import setting
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+class Body(namedtuple('Body', ['text', 'content_type'])):
+    """
+    接口返回的原始内容及Content-Type
+    """
+    __slots__ = ()
+
+
+def _stdlib():
+    return json.loads, lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _simplejson():
+    import simplejson
+    return simplejson.loads, lambda obj: simplejson.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def _ujson():
+    import ujson
+    return ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+
+def _orjson():
+    import orjson
+    return orjson.loads, lambda obj: orjson.dumps(obj).decode('utf-8')
+
+
+BACKENDS = {
+    'json': _stdlib,
+    'simplejson': _simplejson,
+    'ujson': _ujson,
+    'orjson': _orjson,
+}
+
+
+def _load_backend(name):
+    try:
+        return BACKENDS[name]()
+    except (KeyError, ImportError) as e:
+        logger.warning('JSON_BACKEND %s 不可用，使用标准库json: %s', name, e)
+        return _stdlib()
+
+
+@lru_cache(maxsize=None)
+def _backend():
+    # 第一次解析时读取配置，导入时不依赖Django
+    return _load_backend(setting('JSON_BACKEND', 'json'))
+
+
+def loads(text):
+    """
+    解析JSON，内容不是JSON时抛出ValueError
+    :param text: JSON文本
+    :return:
+    """
+    try:
+        return _backend()[0](text)
+    except ValueError:
+        raise
+    except Exception as e:
+        # ujson、orjson的部分异常不是ValueError
+        raise ValueError(e)
+
+
+def dumps(obj):
+    """
+    紧凑格式的JSON，非ASCII字符不转义
+    :param obj: 可序列化为JSON的数据
+    :return: str
+    """
+    return _backend()[1](obj)
+
+
+def loads_literal(text):
+    """
+    解析JSON，不是JSON时按Python字面量解析
+    :param text: 文本
+    :return:
+    """
+    try:
+        return loads(text)
+    except ValueError:
+        return ast.literal_eval(text)
+
+
+def encode_response(response_data):
+    """
+    保存到测试结果中的返回内容，解析后的数据序列化为JSON，字符串（如错误信息）原样保存
+    :param response_data: 返回内容
+    :return:
+    """
+    if response_data is None or isinstance(response_data, str):
+        return response_data
+    return dumps(response_data)
+
+
+def response_fields(response_data, body=None):
+    """
+    测试结果中返回内容对应的字段，返回内容为JSON时只保存JSON，否则同时保存原始内容
+    :param response_data: 解析后的返回内容
+    :param body: 原始返回内容
+    :return:
+    """
+    return {
+        'responseData': encode_response(response_data),
+        'responseBody': body.text if body is not None and response_data == '' else None,
+        'contentType': body.content_type if body is not None else None,
+    }
+
+
+def decode_response(text):
+    """
+    读取测试结果中的返回内容，兼容以Python字面量保存的旧数据，都无法解析时返回原文本
+    :param text: 保存的返回内容
+    :return:
+    """
+    if not text:
+        return text
+    try:
+        return loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def response_text(response_data):
+    """
+    返回内容的JSON文本，用于正则匹配。使用标准库默认的", "、": "分隔符，与旧版本的文本格式一致，
+    已保存的正则关联（如 "token": "(.*?)"）仍可匹配；保存、内部传递的数据使用紧凑格式的dumps
+    :param response_data: 返回内容
+    :return:
+    """
+    if isinstance(response_data, str):
+        return response_data
+    return json.dumps(response_data, ensure_ascii=False)
+
+
+def parse_body(text, content_type=None):
+    """
+    解析接口返回的原始内容
+    :param text: 返回内容文本
+    :param content_type: Content-Type
+    :return: (解析后的数据，不是JSON时为'', Body)
+    """
+    body = Body(text, content_type)
+    try:
+        return loads(text), body
+    except ValueError:
+        return '', body
@@ -0,0 +1,39 @@
+import datetime
+
+from api_test.models import AutomationApiLatency
+
+
+def _ms(value):
+    return round(value / 1000.0, 3)
+
+
+def merge_latency(*latencies):
+    """
+    合并多个进程统计的接口耗时
+    :param latencies: {接口ID: Histogram}
+    :return:
+    """
+    merged = {}
+    for latency in latencies:
+        for _id, histogram in latency.items():
+            if _id in merged:
+                merged[_id].merge(histogram)
+            else:
+                merged[_id] = histogram
+    return merged
+
+
+def save_latency(run, latency):
+    """
+    保存本次执行各接口的耗时统计
+    :param run: AutomationTaskRunTime
+    :param latency: {接口ID: Histogram}，耗时单位微秒
+    :return:
+    """
+    test_time = datetime.datetime.strptime(run.startTime, '%Y-%m-%d %H:%M:%S')
+    rows = [AutomationApiLatency(project_id=run.project_id, run=run, automationCaseApi_id=_id, testTime=test_time,
+                                 count=histogram.count, minTime=_ms(histogram.min), maxTime=_ms(histogram.max),
+                                 p50=_ms(histogram.percentile(50)), p95=_ms(histogram.percentile(95)),
+                                 p99=_ms(histogram.percentile(99)))
+            for _id, histogram in latency.items() if histogram.count]
+    AutomationApiLatency.objects.bulk_create(rows)
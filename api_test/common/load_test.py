@@ -0,0 +1,180 @@
+import argparse
+import datetime
+import sys
+import os
+import pytz
+
+if __name__ == '__main__':
+    # 以脚本方式执行时加入项目目录并初始化Django，作为模块导入时由调用方初始化
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from api_test.common.bootstrap import setup
+    setup()
+
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.db import connection
+
+from api_test.common.auto_task_test import prepare_request, send_request, examine_result
+from api_test.common.histogram import Histogram
+from api_test.common.result_writer import NullWriter
+from api_test.common.run_context import RunContext
+from api_test.common.throttle import get_throttle
+from api_test.models import AutomationCaseApi, AutomationLoadTestResult, AutomationLoadTestRun, GlobalHost
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+class LoadRunner(object):
+    """
+    压测执行，每个虚拟用户按顺序循环执行用例下的接口，延迟记录到直方图
+    """
+
+    def __init__(self, host, case_id, virtual_users, duration=None, iterations=None, time_=None):
+        """
+        :param host: 测试的host域名
+        :param case_id: 测试用例ID
+        :param virtual_users: 虚拟用户数
+        :param duration: 压测时长（秒），达到时长后停止
+        :param iterations: 每个虚拟用户执行次数，与duration都为空时执行1次
+        :param time_: 测试时间
+        """
+        self.host = host
+        self.case_id = case_id
+        self.virtual_users = max(1, virtual_users)
+        self.duration = duration
+        self.iterations = iterations if iterations or duration else 1
+        self.time = time_
+        self.throttle = get_throttle(host)
+        self.api_ids = list(AutomationCaseApi.objects.filter(automationTestCase=case_id)
+                            .order_by('id').values_list('id', flat=True))
+
+    def _request(self, _id, context, histogram, errors):
+        try:
+            request = prepare_request(self.host, self.case_id, _id, self.time, context)
+            if request is None:
+                errors[_id] += 1
+                return
+            with self.throttle:
+                start = time.perf_counter()
+                response = send_request(request)
+                elapsed = time.perf_counter() - start
+            # 延迟以微秒记录
+            histogram.record(elapsed * 1000000)
+            if response is None:
+                errors[_id] += 1
+                return
+            code, response_data, timing, body = response
+            if examine_result(_id, self.time, request, code, response_data, context, timing, body) != 'success':
+                errors[_id] += 1
+        except Exception as e:
+            logger.debug(e)
+            errors[_id] += 1
+
+    def _user(self, deadline, output):
+        """
+        单个虚拟用户
+        :param deadline: 结束时间
+        :param output: 保存执行结果
+        :return:
+        """
+        histograms = {_id: Histogram() for _id in self.api_ids}
+        attempts = Counter()
+        errors = Counter()
+        # 结果不逐条写入，关联参数从本用户的返回内容中取值
+        context = RunContext(NullWriter())
+        try:
+            n = 0
+            while (self.iterations is None or n < self.iterations) and \
+                    (deadline is None or time.perf_counter() < deadline):
+                for _id in self.api_ids:
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        return
+                    attempts[_id] += 1
+                    self._request(_id, context, histograms[_id], errors)
+                n += 1
+        finally:
+            output.append((histograms, attempts, errors))
+            connection.close()
+
+    def run(self):
+        """
+        执行压测
+        :return: ({接口ID: Histogram}, {接口ID: 请求数}, {接口ID: 失败数}, 耗时)
+        """
+        if not self.api_ids:
+            # 用例下没有接口时不启动虚拟用户，只按时长执行时会一直空转
+            return {}, Counter(), Counter(), 0
+        start = time.perf_counter()
+        deadline = start + self.duration if self.duration else None
+        output = []
+        threads = [threading.Thread(target=self._user, args=(deadline, output), daemon=True)
+                   for _ in range(self.virtual_users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        histograms = {_id: Histogram() for _id in self.api_ids}
+        attempts = Counter()
+        errors = Counter()
+        for user_histograms, user_attempts, user_errors in output:
+            for _id, histogram in user_histograms.items():
+                histograms[_id].merge(histogram)
+            attempts.update(user_attempts)
+            errors.update(user_errors)
+        return histograms, attempts, errors, elapsed
+
+
+def _ms(value):
+    return None if value is None else round(value / 1000.0, 3)
+
+
+def load_task(host_id, project_id, case_id, virtual_users, duration=None, iterations=None):
+    """
+    执行用例压测并保存结果
+    :param host_id: 测试域名ID
+    :param project_id: 项目ID
+    :param case_id: 测试用例ID
+    :param virtual_users: 虚拟用户数
+    :param duration: 压测时长（秒）
+    :param iterations: 每个虚拟用户执行次数
+    :return: AutomationLoadTestRun
+    """
+    tz = pytz.timezone('Asia/Shanghai')
+    format_start_time = datetime.datetime.now(tz).strftime('%Y-%m-%d %H:%M:%S')
+    host = GlobalHost.objects.get(id=host_id, project=project_id)
+    runner = LoadRunner(host, case_id, virtual_users, duration, iterations, format_start_time)
+    histograms, attempts, errors, elapsed = runner.run()
+    run = AutomationLoadTestRun(project_id=project_id, case_id=case_id, host=host.name,
+                                startTime=format_start_time, elapsedTime=round(elapsed, 3),
+                                virtualUsers=runner.virtual_users, duration=duration, iterations=runner.iterations)
+    run.save()
+    results = []
+    for _id in runner.api_ids:
+        histogram = histograms[_id]
+        count = attempts[_id]
+        results.append(AutomationLoadTestResult(
+            run=run, automationCaseApi_id=_id, count=count, errors=errors[_id],
+            minTime=_ms(histogram.min), maxTime=_ms(histogram.max), meanTime=_ms(histogram.mean),
+            p50=_ms(histogram.percentile(50)), p90=_ms(histogram.percentile(90)),
+            p99=_ms(histogram.percentile(99)), p999=_ms(histogram.percentile(99.9)),
+            throughput=round(histogram.count / elapsed, 3) if elapsed else 0,
+            errorRate=round(errors[_id] / count, 4) if count else 0,
+            histogram=histogram.encode()))
+    AutomationLoadTestResult.objects.bulk_create(results)
+    return run
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('host_id', help='测试域名ID')
+    parser.add_argument('project_id', help='项目ID')
+    parser.add_argument('case_id', help='用例ID')
+    parser.add_argument('--users', type=int, default=1, help='虚拟用户数')
+    parser.add_argument('--duration', type=int, default=None, help='压测时长（秒）')
+    parser.add_argument('--iterations', type=int, default=None, help='每个虚拟用户执行次数')
+    args = parser.parse_args()
+    load_task(args.host_id, args.project_id, args.case_id, args.users, args.duration, args.iterations)
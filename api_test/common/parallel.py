@@ -0,0 +1,149 @@
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+from django.db import connection
+
+from api_test.common.template import parse
+from api_test.models import AutomationParameter, AutomationHead
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+def build_dependency(api_ids):
+    """
+    根据关联参数和关联请求头生成接口依赖关系
+    只保留对执行顺序靠前接口的引用，与串行执行时能取到的关联数据保持一致
+    :param api_ids: 按执行顺序排列的用例接口ID
+    :return: {接口ID: 上游接口ID集合}
+    """
+    order = {_id: index for index, _id in enumerate(api_ids)}
+    dependency = {_id: set() for _id in api_ids}
+    for model in (AutomationParameter, AutomationHead):
+        rows = model.objects.filter(automationCaseApi__in=api_ids,
+                                    interrelate=True).values_list('automationCaseApi', 'value')
+        for _id, value in rows:
+            for upstream in parse(value).api_ids:
+                if not upstream.isdigit():
+                    continue
+                upstream = int(upstream)
+                if upstream in order and order[upstream] < order[_id]:
+                    dependency[_id].add(upstream)
+    return dependency
+
+
+def upstream_closure(nodes, dependency):
+    """
+    获取节点及其全部上游节点
+    :param nodes: 节点集合
+    :param dependency: {节点: 上游节点集合}
+    :return: 节点集合
+    """
+    selected = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node in selected:
+            continue
+        selected.add(node)
+        stack.extend(dependency.get(node, ()))
+    return selected
+
+
+def run_parallel(nodes, dependency, func, workers):
+    """
+    按依赖关系并发执行，无依赖的节点同时执行，有依赖的节点等上游全部完成后执行
+    :param nodes: 按执行顺序排列的节点
+    :param dependency: {节点: 上游节点集合}
+    :param func: 执行函数，参数为节点，返回执行结果
+    :param workers: 并发线程数
+    :return: {节点: 执行结果}
+    """
+    results = {}
+    if not nodes:
+        return results
+    workers = max(1, min(workers, len(nodes)))
+    index = {node: i for i, node in enumerate(nodes)}
+    pending = {node: set(dependency.get(node, ())) for node in nodes}
+    downstream = defaultdict(list)
+    for node, upstream in pending.items():
+        for i in upstream:
+            downstream[i].append(node)
+    # 就绪队列按原执行顺序出队，单线程时与串行执行顺序一致
+    ready = queue.PriorityQueue()
+    for node in nodes:
+        if not pending[node]:
+            ready.put((index[node], node))
+    lock = threading.Lock()
+    remaining = [len(nodes)]
+
+    def worker():
+        try:
+            while True:
+                _, node = ready.get()
+                if node is None:
+                    break
+                try:
+                    result = func(node)
+                except Exception as e:
+                    logger.exception(e)
+                    result = 'ERROR'
+                with lock:
+                    results[node] = result
+                    remaining[0] -= 1
+                    for i in downstream[node]:
+                        pending[i].discard(node)
+                        if not pending[i]:
+                            ready.put((index[i], i))
+                    if not remaining[0]:
+                        for n in range(workers):
+                            ready.put((len(nodes) + n, None))
+        finally:
+            # 每个线程使用独立的数据库连接，线程结束时释放
+            connection.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def shard(nodes, dependency, group, count):
+    """
+    按依赖关系和分组拆分为互不关联的若干份，每份内保持原执行顺序
+    :param nodes: 按执行顺序排列的节点
+    :param dependency: {节点: 上游节点集合}
+    :param group: 节点所属分组，同一分组的节点分在同一份中，如所属用例
+    :param count: 最多拆分的份数
+    :return: [[节点]]
+    """
+    parent = {node: node for node in nodes}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    first = {}
+    for node in nodes:
+        key = group(node)
+        if key in first:
+            parent[find(node)] = find(first[key])
+        else:
+            first[key] = node
+        for i in dependency.get(node, ()):
+            if i in parent:
+                parent[find(node)] = find(i)
+    components = defaultdict(list)
+    for node in nodes:
+        components[find(node)].append(node)
+    # 由大到小依次分配给当前节点最少的一份
+    shards = [[] for _ in range(max(1, min(count, len(components))))]
+    for component in sorted(components.values(), key=len, reverse=True):
+        min(shards, key=len).extend(component)
+    index = {node: i for i, node in enumerate(nodes)}
+    return [sorted(i, key=index.get) for i in shards if i]
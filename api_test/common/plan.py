@@ -0,0 +1,154 @@
+import copy
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from api_test.common.jsonlib import loads_literal
+from api_test.common.template import parse
+from api_test.models import AutomationCaseApi, AutomationHead, AutomationParameter, AutomationParameterRaw
+
+PLAN_CACHE_KEY = 'automation_case_api_plan_%s'
+
+# 为False时不使用缓存，每次从数据库生成执行计划
+_cache_enabled = True
+
+
+class CaseApiPlan(object):
+    """
+    用例接口执行计划，执行时不再读取数据库
+    """
+
+    def __init__(self, api, headers, parameters, raw):
+        """
+        :param api: 用例接口
+        :param headers: 请求头 [(参数名, 内容, 是否关联)]，关联参数编译为 (参数名, 内容, Template)
+        :param parameters: 表单参数 [(参数名, 内容, 是否关联)]，同上
+        :param raw: 源数据参数内容
+        """
+        self.id = api.id
+        self.case_id = api.automationTestCase_id
+        self.scheme = 'http://' if api.httpType == 'HTTP' else 'https://'
+        self.api_address = api.apiAddress
+        self.request_type = api.requestType
+        self.request_parameter_type = api.requestParameterType
+        if api.requestParameterType == 'form-data' and api.formatRaw:
+            self.request_parameter_type = 'raw'
+        self.form_data = api.requestParameterType == 'form-data'
+        self.examine_type = api.examineType
+        self.http_code = api.httpCode
+        self.response_data = api.responseData
+        self.headers = [self._compile(*i) for i in headers]
+        self.parameters = [self._compile(*i) for i in parameters]
+        self.raw = raw
+        self.raw_parameter = []
+        self.raw_error = False
+        if raw:
+            try:
+                self.raw_parameter = loads_literal(raw)
+            except Exception:
+                self.raw_error = True
+
+    @staticmethod
+    def _compile(name, value, interrelate):
+        return name, value, parse(value) if interrelate else None
+
+    def url(self, host):
+        """
+        请求地址
+        :param host: 测试的host域名
+        :return:
+        """
+        return self.scheme + host.host + self.api_address
+
+    def parameter(self):
+        """
+        源数据请求参数，每次执行返回新的副本
+        :return:
+        """
+        return copy.deepcopy(self.raw_parameter)
+
+
+def compile_plan(_id):
+    """
+    读取用例接口、请求头、请求参数生成执行计划
+    :param _id: 用例下接口ID
+    :return:
+    """
+    api = AutomationCaseApi.objects.get(id=_id)
+    headers = list(AutomationHead.objects.filter(automationCaseApi=_id).order_by('id')
+                   .values_list('name', 'value', 'interrelate'))
+    parameters = []
+    raw = None
+    if api.requestParameterType == 'form-data':
+        parameters = list(AutomationParameter.objects.filter(automationCaseApi=_id).order_by('id')
+                          .values_list('name', 'value', 'interrelate'))
+    else:
+        raw = AutomationParameterRaw.objects.filter(automationCaseApi=_id).values_list('data', flat=True).first()
+    return CaseApiPlan(api, headers, parameters, raw)
+
+
+def shared_cache():
+    """
+    缓存是否为多个进程共享，locmem缓存只在本进程内有效，其他进程修改用例接口时无法清除
+    :return:
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def disable_cache():
+    """
+    本进程不缓存执行计划，用于常驻进程使用进程内缓存时，避免执行修改前的用例接口
+    :return:
+    """
+    global _cache_enabled
+    _cache_enabled = False
+
+
+def get_plan(case_id, _id):
+    """
+    获取用例接口执行计划，优先使用缓存
+    :param case_id: 测试用例ID
+    :param _id: 用例下接口ID
+    :return:
+    """
+    key = PLAN_CACHE_KEY % _id
+    plan = cache.get(key) if _cache_enabled else None
+    if plan is None:
+        plan = compile_plan(_id)
+        if _cache_enabled:
+            cache.set(key, plan, getattr(settings, 'PLAN_CACHE_TIMEOUT', 3600))
+    if str(plan.case_id) != str(case_id):
+        raise AutomationCaseApi.DoesNotExist
+    return plan
+
+
+def invalidate_plan(*ids):
+    """
+    用例接口修改、删除后清除执行计划缓存
+    :param ids: 用例下接口ID
+    :return:
+    """
+    cache.delete_many([PLAN_CACHE_KEY % i for i in ids])
+
+
+def _invalidate_api(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_plan, instance.pk))
+
+
+def _invalidate_child(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_plan, instance.automationCaseApi_id))
+
+
+def connect_signals():
+    """
+    用例接口及其请求头、请求参数变更时清除执行计划
+    :return:
+    """
+    for name, signal in (('save', post_save), ('delete', post_delete)):
+        signal.connect(_invalidate_api, sender=AutomationCaseApi, dispatch_uid='plan_api_%s' % name)
+        for model in (AutomationHead, AutomationParameter, AutomationParameterRaw):
+            signal.connect(_invalidate_child, sender=model, dispatch_uid='plan_%s_%s' % (model.__name__, name))
@@ -0,0 +1,76 @@
+import math
+import multiprocessing
+from collections import OrderedDict
+
+from django.db import connections
+
+from api_test.common.bootstrap import setup
+from api_test.common.latency import merge_latency
+from api_test.common.parallel import shard
+from api_test.common.session_pool import reset_session_pool
+
+
+def _init_worker():
+    """
+    子进程初始化，使用独立的数据库连接和HTTP会话
+    :return:
+    """
+    setup()
+    reset_session_pool()
+
+
+def _run_shard(args):
+    """
+    子进程中执行一份接口
+    :param args: (host_id, 测试时间, [(接口ID, 用例ID)], {接口ID: 上游接口ID集合}, 并发线程数, 执行引擎, 进程数,
+                 任务执行记录ID)
+    :return: ([执行结果], {接口ID: 耗时Histogram})
+    """
+    host_id, time, items, dependency, workers, engine, shards, run_id = args
+    # 放在函数内避免与auto_test循环导入
+    from api_test.common.auto_test import run_apis
+    from api_test.common.result_writer import ResultWriter
+    from api_test.common.run_context import RunContext
+    from api_test.models import GlobalHost
+    try:
+        host = GlobalHost.objects.get(id=host_id)
+        # host的并发数和每秒请求数限制由各进程平分
+        if host.maxConcurrency:
+            host.maxConcurrency = int(math.ceil(host.maxConcurrency / shards))
+        if host.requestsPerSecond:
+            host.requestsPerSecond = host.requestsPerSecond / shards
+        writer = ResultWriter(run_id=run_id)
+        with writer:
+            results = run_apis(host, time, OrderedDict(items), dependency, RunContext(writer), workers, engine)
+        return results, writer.latency
+    finally:
+        connections.close_all()
+
+
+def run_processes(host_id, time, api_case, dependency, processes, workers=1, engine='thread', run_id=None):
+    """
+    多进程执行，按用例及接口关联关系拆分为互不关联的若干份，每个进程执行一份
+    :param host_id: 测试域名ID
+    :param time: 测试时间
+    :param api_case: 按执行顺序排列的{接口ID: 用例ID}
+    :param dependency: {接口ID: 上游接口ID集合}
+    :param processes: 进程数
+    :param workers: 每个进程的并发线程数
+    :param engine: 每个进程的执行引擎
+    :param run_id: 任务执行记录ID
+    :return: ([执行结果], {接口ID: 耗时Histogram})
+    """
+    shards = shard(list(api_case), dependency, api_case.get, processes)
+    tasks = [(host_id, time, [(i, api_case[i]) for i in nodes], {i: dependency.get(i, set()) for i in nodes},
+              workers, engine, len(shards), run_id) for nodes in shards]
+    if not tasks:
+        return [], {}
+    # fork前关闭数据库连接，避免子进程共用父进程的连接
+    connections.close_all()
+    pool = multiprocessing.Pool(len(tasks), initializer=_init_worker)
+    try:
+        results = pool.map(_run_shard, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    return [result for i in results for result in i[0]], merge_latency(*[i[1] for i in results])
@@ -0,0 +1,113 @@
+import threading
+
+from django.conf import settings
+from django.db.models import Count
+
+from api_test.common.histogram import Histogram
+from api_test.common.jsonlib import response_fields
+from api_test.common.timing import timing_fields
+from api_test.models import AutomationCaseTestResult
+
+RESULT_FIELD = {
+    'PASS': 'passCount',
+    'FAIL': 'failCount',
+    'ERROR': 'errorCount',
+    'TimeOut': 'timeoutCount',
+}
+
+
+class ResultWriter(object):
+    """
+    自动测试结果缓冲写入，达到批量大小后使用bulk_create一次写入，同时统计各接口的请求耗时
+    """
+
+    def __init__(self, batch_size=None, run_id=None):
+        """
+        :param batch_size: 每批写入的结果数
+        :param run_id: 任务执行记录ID
+        """
+        self.run_id = run_id
+        self.batch_size = max(1, batch_size or getattr(settings, 'AUTO_RESULT_BATCH_SIZE', 100))
+        self._buffer = []
+        self._lock = threading.Lock()
+        # {接口ID: Histogram}，耗时单位微秒
+        self.latency = {}
+
+    def add(self, _id, time, header, parameter, _result, code, response_data, timing=None, message=None, body=None):
+        """
+        添加一条测试结果
+        :param _id: 用例下接口ID
+        :param time: 测试时间
+        :param header: 请求头
+        :param parameter: 请求参数
+        :param _result: 是否通过
+        :param code: HTTP状态码
+        :param response_data: 返回结果
+        :param timing: 请求耗时
+        :param message: 校验失败信息
+        :param body: 原始返回内容
+        :return:
+        """
+        result_ = AutomationCaseTestResult(automationCaseApi_id=_id, run_id=self.run_id, header=header,
+                                           parameter=parameter, testTime=time, result=_result, httpStatus=code,
+                                           examineMessage=message, **response_fields(response_data, body),
+                                           **timing_fields(timing))
+        with self._lock:
+            if timing is not None:
+                self.latency.setdefault(_id, Histogram()).record(timing.total * 1000)
+            self._buffer.append(result_)
+            if len(self._buffer) < self.batch_size:
+                return
+            rows, self._buffer = self._buffer, []
+        self._write(rows)
+
+    def flush(self):
+        """
+        写入缓冲中的全部结果
+        :return:
+        """
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        self._write(rows)
+
+    def _write(self, rows):
+        if rows:
+            AutomationCaseTestResult.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+
+class NullWriter(object):
+    """
+    丢弃测试结果，压测时不逐条保存
+    """
+
+    def add(self, **kwargs):
+        pass
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+def count_results(run):
+    """
+    按已保存的测试结果统计执行记录的成功、失败、错误、超时数，不保存执行记录
+    :param run: AutomationTaskRunTime
+    :return:
+    """
+    counter = dict(AutomationCaseTestResult.objects.filter(run=run).values_list('result')
+                   .annotate(count=Count('id')).order_by())
+    for result, field in RESULT_FIELD.items():
+        setattr(run, field, counter.get(result, 0))
+    run.total = sum(counter.get(result, 0) for result in RESULT_FIELD)
+    return run
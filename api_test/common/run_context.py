@@ -0,0 +1,36 @@
+class RunContext(object):
+    """
+    一次执行中各用例接口的返回内容，关联参数直接从内存中取值
+    """
+
+    def __init__(self, writer=None, cancel=None):
+        """
+        :param writer: 本次执行的ResultWriter，测试结果批量写入
+        :param cancel: threading.Event，设置后不再执行未开始的接口
+        """
+        self.writer = writer
+        self.cancel = cancel
+        self._responses = {}
+
+    def cancelled(self):
+        return self.cancel is not None and self.cancel.is_set()
+
+    def set(self, _id, response_data):
+        """
+        保存接口返回内容
+        :param _id: 用例下接口ID
+        :param response_data: 解析后的返回内容
+        :return:
+        """
+        self._responses[int(_id)] = response_data
+
+    def get(self, _id):
+        """
+        获取接口返回内容，未执行或未返回时抛出KeyError
+        :param _id: 用例下接口ID
+        :return:
+        """
+        return self._responses[int(_id)]
+
+    def __contains__(self, _id):
+        return int(_id) in self._responses
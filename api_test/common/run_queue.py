@@ -0,0 +1,243 @@
+"""
+任务执行队列
+
+定时任务触发时先加入AutomationRunQueue，再由调度进程或触发的进程从队列中取出执行。
+同一定时任务同时只执行一个，不属于定时任务的执行（手动触发）按项目和HOST区分，不同任务可以同时执行。
+上一次执行未结束时按任务的overlapPolicy（为空时使用settings.RUN_OVERLAP_POLICY）处理：
+    skip    跳过本次
+    queue   排队等待，同一任务最多只有一个排队中的执行
+    cancel  取消排队中的执行，并通知执行中的任务在当前接口结束后停止（多进程执行、压测不支持中途停止）
+排队中的执行按priority从高到低、加入顺序先后执行。
+所有进程执行中的总数达到RUN_MAX_CONCURRENT时不再取出，计划执行时间到开始执行的等待时间记录为queueDelay。
+执行中的进程定时更新心跳，心跳超过RUN_QUEUE_LOCK_TIMEOUT秒未更新的视为进程已退出，释放任务锁。
+"""
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from api_test.models import AutomationRunQueue, AutomationTaskRunTime, Project
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+def _worker_name():
+    return '%s:%s:%s' % (socket.gethostname(), os.getpid(), threading.get_ident())
+
+
+def _lock_project(project_id):
+    # 锁定项目记录，同一项目的入队、取出串行执行
+    return Project.objects.select_for_update().get(id=project_id)
+
+
+def _same_target(project_id, task_id, host_id):
+    """
+    不能同时执行的排队项：同一定时任务，或同一项目、HOST下不属于定时任务的执行
+    """
+    entries = AutomationRunQueue.objects.filter(project=project_id)
+    if task_id:
+        return entries.filter(task=task_id)
+    return entries.filter(task=None, Host=host_id)
+
+
+def at_capacity():
+    """
+    执行中的总数是否已达到RUN_MAX_CONCURRENT
+    """
+    limit = getattr(settings, 'RUN_MAX_CONCURRENT', 0)
+    return bool(limit) and AutomationRunQueue.objects.filter(status='running').count() >= limit
+
+
+def _within_capacity(entry_id):
+    """
+    取出后确认没有超过RUN_MAX_CONCURRENT，多个进程同时取出时按开始时间先后保留
+    """
+    limit = getattr(settings, 'RUN_MAX_CONCURRENT', 0)
+    if not limit:
+        return True
+    running = AutomationRunQueue.objects.filter(status='running').order_by('startTime', 'id')
+    return entry_id in running.values_list('id', flat=True)[:limit]
+
+
+def recover_stale(project_id=None):
+    """
+    心跳超时的执行视为进程已退出，标记为执行失败
+    :param project_id: 项目ID，为空时处理全部项目
+    :return: 处理的数量
+    """
+    now = datetime.datetime.now()
+    timeout = datetime.timedelta(seconds=getattr(settings, 'RUN_QUEUE_LOCK_TIMEOUT', 300))
+    stale = AutomationRunQueue.objects.filter(status='running', heartbeat__lt=now - timeout)
+    if project_id:
+        stale = stale.filter(project=project_id)
+    runs = list(stale.exclude(run=None).values_list('run', flat=True))
+    AutomationTaskRunTime.objects.filter(id__in=runs, status='running').update(status='failed')
+    return stale.update(status='failed', endTime=now)
+
+
+def enqueue(project_id, host_id, _type='circulation', task=None, priority=None, policy=None, scheduled=None):
+    """
+    加入执行队列
+    :param project_id: 项目ID
+    :param host_id: 测试域名ID
+    :param _type: 执行类型
+    :param task: AutomationTestTask，手动触发时为空
+    :param priority: 优先级，为空时使用任务的优先级
+    :param policy: 上一次执行未结束时的处理方式，为空时使用任务的设置
+    :param scheduled: 计划执行时间，为空时为加入时间
+    :return: AutomationRunQueue，被跳过时状态为skipped
+    """
+    if priority is None:
+        priority = task.priority if task is not None else 0
+    if policy is None:
+        policy = task.overlapPolicy if task is not None else None
+    policy = policy or getattr(settings, 'RUN_OVERLAP_POLICY', 'skip')
+    now = datetime.datetime.now()
+    entry = AutomationRunQueue(project_id=project_id, task=task, Host_id=host_id, type=_type, priority=priority,
+                               scheduledTime=scheduled or now)
+    with transaction.atomic():
+        _lock_project(project_id)
+        recover_stale(project_id)
+        active = _same_target(project_id, entry.task_id, host_id).filter(status__in=('queued', 'running'))
+        if policy == 'skip' and active.exists():
+            entry.status = 'skipped'
+        elif policy == 'queue' and active.filter(status='queued', type=_type).exists():
+            # 已有排队中的相同执行，不重复排队
+            entry.status = 'skipped'
+        elif policy == 'cancel':
+            active.filter(status='queued').update(status='cancelled', endTime=now)
+            active.filter(status='running').update(cancelRequested=True)
+        if entry.status == 'skipped':
+            entry.endTime = now
+        entry.save()
+    if entry.status == 'skipped':
+        logger.info('项目 %s 任务 %s 上一次执行未结束，跳过本次执行', project_id, entry.task_id)
+    return entry
+
+
+def claim(project_id=None):
+    """
+    取出一个可以执行的排队项，已在执行的任务跳过
+    :param project_id: 只取该项目的排队项
+    :return: AutomationRunQueue，没有可执行的或执行中的总数已达到上限时返回None
+    """
+    if at_capacity():
+        return None
+    queued = AutomationRunQueue.objects.filter(status='queued').order_by('-priority', 'id')
+    if project_id:
+        queued = queued.filter(project=project_id)
+    locked = set()
+    for entry in queued:
+        key = (entry.project_id, entry.task_id, entry.Host_id if entry.task_id is None else None)
+        if key in locked:
+            continue
+        now = datetime.datetime.now()
+        with transaction.atomic():
+            _lock_project(entry.project_id)
+            recover_stale(entry.project_id)
+            if _same_target(entry.project_id, entry.task_id, entry.Host_id).filter(status='running').exists():
+                locked.add(key)
+                continue
+            delay = max((now - (entry.scheduledTime or entry.createTime)).total_seconds(), 0)
+            claimed = AutomationRunQueue.objects.filter(id=entry.id, status='queued') \
+                .update(status='running', worker=_worker_name(), startTime=now, heartbeat=now,
+                        queueDelay=round(delay, 3))
+        if not claimed:
+            continue
+        if not _within_capacity(entry.id):
+            # 其他进程同时取出，超过上限，放回队列
+            AutomationRunQueue.objects.filter(id=entry.id, status='running') \
+                .update(status='queued', worker=None, startTime=None, heartbeat=None, queueDelay=None)
+            return None
+        entry.refresh_from_db()
+        return entry
+    return None
+
+
+def _watch(entry_id, cancel, done):
+    """
+    执行期间定时更新心跳，收到取消请求时设置cancel
+    """
+    interval = getattr(settings, 'RUN_QUEUE_HEARTBEAT', 10)
+    try:
+        while not done.wait(interval):
+            try:
+                AutomationRunQueue.objects.filter(id=entry_id).update(heartbeat=datetime.datetime.now())
+                if AutomationRunQueue.objects.filter(id=entry_id, cancelRequested=True).exists():
+                    cancel.set()
+            except Exception as e:
+                logger.exception(e)
+    finally:
+        connection.close()
+
+
+def execute_entry(entry, **options):
+    """
+    执行取出的排队项
+    :param entry: AutomationRunQueue
+    :param options: 自动化测试参数，见automation_task
+    :return: AutomationRunQueue
+    """
+    # 延迟导入，执行模块导入时会初始化Django
+    from api_test.common.auto_test import automation_task
+    from api_test.common.load_test import load_task
+    cancel = threading.Event()
+    done = threading.Event()
+    watcher = threading.Thread(target=_watch, args=(entry.id, cancel, done), daemon=True)
+    watcher.start()
+    status = 'finished'
+    try:
+        if entry.type == 'load':
+            task = entry.task
+            load_task(entry.Host_id, entry.project_id, task.case_id, task.virtualUsers, task.duration,
+                      task.iterations)
+        else:
+            if entry.task_id is not None:
+                # 按定时任务的用例和并发数执行，参数中指定的并发数优先
+                options['case_ids'] = list(entry.task.cases.values_list('id', flat=True))
+                options['task_id'] = entry.task_id
+                if options.get('workers') is None:
+                    options['workers'] = entry.task.workers
+            entry.run = automation_task(entry.Host_id, entry.project_id, cancel=cancel, **options)
+            if entry.run.status == 'cancelled':
+                status = 'cancelled'
+    except Exception as e:
+        logger.exception('执行队列 %s 执行失败: %s', entry.id, e)
+        status = 'failed'
+    finally:
+        done.set()
+        watcher.join()
+        entry.status = status
+        entry.endTime = datetime.datetime.now()
+        entry.save(update_fields=['status', 'endTime', 'run'])
+        if entry.run is not None:
+            AutomationTaskRunTime.objects.filter(id=entry.run.id).update(queueDelay=entry.queueDelay)
+    return entry
+
+
+def drain(project_id=None, **options):
+    """
+    依次执行队列中可以执行的排队项，直到没有可执行的，执行中的总数达到上限时等待
+    :param project_id: 只执行该项目的排队项
+    :param options: 自动化测试参数，见automation_task
+    :return: 执行的数量
+    """
+    count = 0
+    queued = AutomationRunQueue.objects.filter(status='queued')
+    if project_id:
+        queued = queued.filter(project=project_id)
+    while True:
+        close_old_connections()
+        entry = claim(project_id)
+        if entry is None:
+            if not (at_capacity() and queued.exists()):
+                return count
+            time.sleep(getattr(settings, 'RUN_QUEUE_HEARTBEAT', 10))
+            continue
+        execute_entry(entry, **options)
+        count += 1
@@ -0,0 +1,155 @@
+"""
+常驻进程的定时任务调度
+
+settings.SCHEDULER_MODE为daemon时，新增、删除任务不再写crontab，由run_scheduler命令启动的调度进程
+每隔SCHEDULER_POLL_INTERVAL秒读取AutomationTestTask，到达执行时间的任务加入执行队列（见run_queue），
+再从队列中取出交给常驻的线程池执行，执行线程复用已加载的Django和数据库连接。
+定时、压测任务在开始时间执行一次；循环任务从开始时间起每隔 间隔*单位 执行一次，直到结束时间。
+调度进程未运行期间错过的执行不补执行，检查间隔内错过多次时只执行一次。
+为避免大量任务在同一时刻开始，每个任务的执行时间按任务ID推迟SCHEDULER_SPREAD_WINDOW秒内的固定偏移，
+同一任务每次的偏移相同，循环任务的执行间隔不变；crontab方式执行时偏移通过命令前的sleep实现。
+"""
+import datetime
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from api_test.common.run_queue import claim, enqueue, execute_entry
+from api_test.models import AutomationTestTask
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+UNIT_SECONDS = {
+    'm': 60,
+    'h': 60 * 60,
+    'd': 24 * 60 * 60,
+    'w': 7 * 24 * 60 * 60,
+}
+
+
+def daemon_mode():
+    return getattr(settings, 'SCHEDULER_MODE', 'crontab') == 'daemon'
+
+
+def spread_offset(task_id, period=None):
+    """
+    任务执行时间的偏移，按任务ID均匀分散在SCHEDULER_SPREAD_WINDOW内
+    :param task_id: 任务ID
+    :param period: 循环任务的执行间隔（秒），偏移小于执行间隔
+    :return: 偏移秒数
+    """
+    window = getattr(settings, 'SCHEDULER_SPREAD_WINDOW', 0) or 0
+    if period:
+        window = min(window, period)
+    if not task_id or window < 1:
+        return 0
+    return int(hashlib.md5(str(task_id).encode('utf-8')).hexdigest(), 16) % int(window)
+
+
+def task_offset(task):
+    """
+    任务执行时间的偏移
+    :param task: AutomationTestTask
+    :return: timedelta
+    """
+    period = None
+    if task.type == 'circulation' and task.frequency and task.unit in UNIT_SECONDS:
+        period = task.frequency * UNIT_SECONDS[task.unit]
+    return datetime.timedelta(seconds=spread_offset(task.id, period))
+
+
+def last_fire(task, after, until):
+    """
+    任务在(after, until]内最近一次的执行时间
+    :param task: AutomationTestTask
+    :param after: 上次检查时间
+    :param until: 本次检查时间
+    :return: datetime，没有需要执行的时返回None
+    """
+    start = task.startTime
+    if task.type != 'circulation':
+        return start if after < start <= until else None
+    if not task.frequency or task.unit not in UNIT_SECONDS:
+        return None
+    until = min(until, task.endTime)
+    if until < start:
+        return None
+    step = datetime.timedelta(seconds=task.frequency * UNIT_SECONDS[task.unit])
+    fire = start + (until - start) // step * step
+    return fire if fire > after else None
+
+
+class Scheduler(object):
+    """
+    定时任务调度
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        """
+        :param workers: 同时执行的任务数
+        :param poll_interval: 检查间隔（秒）
+        """
+        self.workers = max(1, workers or getattr(settings, 'SCHEDULER_WORKERS', 4))
+        self.poll_interval = poll_interval or getattr(settings, 'SCHEDULER_POLL_INTERVAL', 10)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.checked = datetime.datetime.now()
+        self.running = set()
+        self._stop = threading.Event()
+
+    def due(self, now):
+        """
+        (上次检查时间, now]内需要执行的任务，每次重新读取任务，修改即时生效
+        :param now: 本次检查时间
+        :return: [(AutomationTestTask, 计划执行时间)]
+        """
+        due = []
+        for task in AutomationTestTask.objects.filter(startTime__lte=now).order_by('id'):
+            offset = task_offset(task)
+            fire = last_fire(task, self.checked - offset, now - offset)
+            if fire:
+                due.append((task, fire + offset))
+        return due
+
+    def dispatch(self, entry):
+        future = self.executor.submit(execute_entry, entry)
+        self.running.add(future)
+        future.add_done_callback(self.running.discard)
+        return future
+
+    def tick(self, now=None):
+        """
+        到期的任务加入执行队列，并在有空闲线程时从队列中取出执行
+        :param now: 本次检查时间
+        :return: [Future]
+        """
+        now = now or datetime.datetime.now()
+        close_old_connections()
+        for task, scheduled in self.due(now):
+            enqueue(task.project_id, task.Host_id, task.type, task=task, scheduled=scheduled)
+        self.checked = now
+        futures = []
+        while len(self.running) < self.workers:
+            entry = claim()
+            if entry is None:
+                break
+            futures.append(self.dispatch(entry))
+        return futures
+
+    def run(self):
+        logger.info('调度进程启动，执行线程数 %s，检查间隔 %s 秒', self.workers, self.poll_interval)
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                # 数据库暂时不可用等情况下继续调度
+                logger.exception('检查定时任务失败: %s', e)
+            self._stop.wait(self.poll_interval)
+        self.executor.shutdown(wait=True)
+        logger.info('调度进程退出')
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,78 @@
+import datetime
+import random
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.utils import timezone
+
+from api_test.common.parallel import upstream_closure
+from api_test.models import AutomationCaseApi, AutomationHead, AutomationParameter, AutomationParameterRaw, \
+    AutomationTaskRunTime
+
+
+def last_green_time(project_id):
+    """
+    项目最近一次全部通过的执行时间
+    :param project_id: 项目ID
+    :return: 没有时返回None
+    """
+    for run in AutomationTaskRunTime.objects.filter(project=project_id, status='finished', total__gt=0)\
+            .order_by('-id').only('startTime', 'total', 'passCount'):
+        if run.passCount == run.total:
+            return datetime.datetime.strptime(run.startTime, '%Y-%m-%d %H:%M:%S')
+    return None
+
+
+def changed_since(api_ids, since):
+    """
+    接口定义、请求头、请求参数在某时间之后有修改的接口
+    :param api_ids: 用例接口ID
+    :param since: 时间
+    :return: 接口ID集合
+    """
+    changed = set(AutomationCaseApi.objects.filter(id__in=api_ids, updateTime__gt=since)
+                  .values_list('id', flat=True))
+    for model in (AutomationHead, AutomationParameter, AutomationParameterRaw):
+        changed.update(model.objects.filter(automationCaseApi__in=api_ids, updateTime__gt=since)
+                       .values_list('automationCaseApi', flat=True))
+    return changed
+
+
+def select_changed(project_id, api_case, dependency, sample_rate=None):
+    """
+    选择最近一次全部通过后有变更的接口、依赖其关联数据的下游接口，以及按比例抽取的其余接口，
+    并加入执行所需的上游接口
+    :param project_id: 项目ID
+    :param api_case: 按执行顺序排列的{接口ID: 用例ID}
+    :param dependency: {接口ID: 上游接口ID集合}
+    :param sample_rate: 未变更接口的抽取比例
+    :return: 按执行顺序排列的{接口ID: 用例ID}，没有全部通过的执行记录时返回全部接口
+    """
+    since = last_green_time(project_id)
+    if since is None:
+        return api_case
+    if sample_rate is None:
+        sample_rate = getattr(settings, 'SMART_TEST_SAMPLE_RATE', 0.1)
+    downstream = {_id: set() for _id in api_case}
+    for _id, upstream in dependency.items():
+        for i in upstream:
+            downstream[i].add(_id)
+    selected = upstream_closure(changed_since(list(api_case), since), downstream)
+    rest = [_id for _id in api_case if _id not in selected]
+    selected.update(random.sample(rest, int(round(len(rest) * min(max(sample_rate, 0), 1)))))
+    selected = upstream_closure(selected, dependency)
+    return OrderedDict((_id, case_id) for _id, case_id in api_case.items() if _id in selected)
+
+
+def _touch_api(sender, instance, **kwargs):
+    AutomationCaseApi.objects.filter(id=instance.automationCaseApi_id).update(updateTime=timezone.now())
+
+
+def connect_signals():
+    """
+    删除请求头、请求参数时更新用例接口的修改时间
+    :return:
+    """
+    for model in (AutomationHead, AutomationParameter, AutomationParameterRaw):
+        post_delete.connect(_touch_api, sender=model, dispatch_uid='selection_%s_delete' % model.__name__)
@@ -8,18 +8,14 @@ Created on 2017年8月22日
 import smtplib
 from email.mime.text import MIMEText
 from email.header import Header
-import django
 import sys
 import os
 
-
-curPath = os.path.abspath(os.path.dirname(__file__))
-rootPath = os.path.split(curPath)[0]
-PathProject = os.path.split(rootPath)[0]
-sys.path.append(rootPath)
-sys.path.append(PathProject)
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_automation_test.settings")
-django.setup()
+if __name__ == '__main__':
+    # 以脚本方式执行时加入项目目录并初始化Django，作为模块导入时由调用方初始化
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from api_test.common.bootstrap import setup
+    setup()
 
 from api_test.serializers import ProjectMemberSerializer
 from api_test.models import AutomationReportSendConfig, ProjectMember, Project
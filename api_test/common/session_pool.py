@@ -0,0 +1,123 @@
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+
+from api_test.common.bootstrap import setting
+from api_test.common.timing import TimingAdapter
+
+
+class _NoCookiePolicy(DefaultCookiePolicy):
+    """
+    会话不保存返回的cookie，保持与每次单独请求时相同的行为
+    """
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class _HostSession(object):
+    """
+    单个host的会话及使用状态
+    """
+
+    def __init__(self, pool_size):
+        self.session = requests.Session()
+        self.session.cookies.set_policy(_NoCookiePolicy())
+        adapter = TimingAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.last_used = time.time()
+        self.active = 0
+
+
+class SessionPool(object):
+    """
+    按host复用的keep-alive会话池，同一host的请求复用TCP/TLS连接
+    """
+
+    def __init__(self, pool_size=10, idle_timeout=60):
+        """
+        :param pool_size: 每个host保留的最大连接数
+        :param idle_timeout: 会话空闲多少秒后释放
+        """
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, url):
+        address = urlsplit(url)
+        key = (address.scheme.lower(), address.netloc.lower())
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = self._sessions[key] = _HostSession(self.pool_size)
+            entry.active += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.active -= 1
+            entry.last_used = time.time()
+
+    def _evict(self, now):
+        for key, entry in list(self._sessions.items()):
+            if not entry.active and now - entry.last_used > self.idle_timeout:
+                del self._sessions[key]
+                entry.session.close()
+
+    def request(self, method, url, **kwargs):
+        """
+        发送请求
+        :param method: 请求方式
+        :param url: 请求地址
+        :param kwargs: requests请求参数
+        :return:
+        """
+        entry = self._acquire(url)
+        try:
+            return entry.session.request(method, url, **kwargs)
+        finally:
+            self._release(entry)
+
+    def close(self):
+        """
+        关闭所有会话
+        :return:
+        """
+        with self._lock:
+            for entry in self._sessions.values():
+                entry.session.close()
+            self._sessions.clear()
+
+
+_session_pool = None
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """
+    获取进程内共享的会话池
+    :return:
+    """
+    global _session_pool
+    if _session_pool is None:
+        with _session_pool_lock:
+            if _session_pool is None:
+                _session_pool = SessionPool(pool_size=setting('HTTP_POOL_SIZE', 10),
+                                            idle_timeout=setting('HTTP_SESSION_IDLE_TIMEOUT', 60))
+    return _session_pool
+
+
+def reset_session_pool():
+    """
+    丢弃当前进程的会话池，fork出的子进程不与父进程共用连接
+    :return:
+    """
+    global _session_pool
+    _session_pool = None
@@ -0,0 +1,109 @@
+"""
+关联参数模板
+
+关联参数中可包含多个占位符，如 Bearer <response[JSON][12]>["data"]["token"]，
+解析为 文本 与 Placeholder 组成的模板，执行时依次取值拼接，不再对每个值做正则查找替换
+    JSON关联:  <response[JSON][接口ID]>["key1"]["key2"]...  或  <response[JSON][接口ID]["key1"]["key2"]>
+    正则关联:  <response[Regular][接口ID]["正则表达式"]，结尾可以带>
+"""
+import re
+from functools import lru_cache
+
+# 接口ID后没有>时，取值路径后的>属于占位符
+PLACEHOLDER_PATTERN = re.compile(r'<response\[(?P<kind>[^\]]*)]\[(?P<api_id>[^\]]*)](?P<close>>)?'
+                                 r'(?P<path>(?:\[".*?"])*)(?(close)|>?)')
+SEGMENT_PATTERN = re.compile(r'\["(.*?)"]')
+
+
+class TemplateError(Exception):
+    pass
+
+
+class Placeholder(object):
+    """
+    关联占位符
+    """
+
+    def __init__(self, kind, api_id, path):
+        """
+        :param kind: 关联类型 JSON/Regular
+        :param api_id: 关联的用例接口ID
+        :param path: JSON取值路径，正则关联时为正则表达式
+        """
+        self.kind = kind
+        self.api_id = api_id
+        self.path = tuple(path)
+        self.pattern = None
+        self.error = None
+        if kind == 'Regular':
+            try:
+                self.pattern = re.compile(self.path[0])
+            except (IndexError, re.error):
+                self.error = '正则关联表达式有误: %s' % api_id
+        elif kind != 'JSON':
+            self.error = '不支持的关联类型: %s' % kind
+
+    def render(self, load_json, load_text):
+        """
+        取关联值
+        :param load_json: 根据接口ID获取返回内容
+        :param load_text: 根据接口ID获取返回内容文本
+        :return:
+        """
+        if self.error:
+            raise TemplateError(self.error)
+        if self.kind == 'JSON':
+            data = load_json(self.api_id)
+            for key in self.path:
+                data = data[key]
+            return str(data)
+        return str(self.pattern.findall(load_text(self.api_id))[0])
+
+
+class Template(object):
+    """
+    关联参数模板，由文本和占位符组成
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.placeholders = [i for i in parts if isinstance(i, Placeholder)]
+
+    @property
+    def api_ids(self):
+        """
+        引用的用例接口ID
+        :return:
+        """
+        return [i.api_id for i in self.placeholders]
+
+    def render(self, load_json, load_text):
+        """
+        生成参数值
+        :param load_json: 根据接口ID获取返回内容
+        :param load_text: 根据接口ID获取返回内容文本
+        :return:
+        """
+        if not self.placeholders:
+            raise TemplateError('关联参数中没有关联数据')
+        return ''.join(i if isinstance(i, str) else i.render(load_json, load_text) for i in self.parts)
+
+
+@lru_cache(maxsize=1024)
+def parse(value):
+    """
+    解析关联参数
+    :param value: 参数内容
+    :return: Template，关联格式有误时在生成参数值时抛出TemplateError
+    """
+    parts = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(value or ''):
+        if match.start() > position:
+            parts.append(value[position:match.start()])
+        parts.append(Placeholder(match.group('kind'), match.group('api_id'),
+                                 SEGMENT_PATTERN.findall(match.group('path'))))
+        position = match.end()
+    if value and position < len(value):
+        parts.append(value[position:])
+    return Template(parts)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    令牌桶限速，每秒生成rate个令牌，最多积累burst个
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: 每秒请求数
+        :param burst: 允许的突发请求数，默认1秒的令牌数
+        """
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst or rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        预约一个令牌
+        :return: 需要等待的秒数，调用方等待后再发送请求
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+
+class HostThrottle(object):
+    """
+    单个host的并发数和每秒请求数限制，线程执行时用 with 包裹请求
+    """
+
+    def __init__(self, max_concurrency=0, requests_per_second=0):
+        """
+        :param max_concurrency: 最大并发请求数，0为不限制
+        :param requests_per_second: 每秒请求数，0为不限制
+        """
+        self.max_concurrency = max_concurrency or 0
+        self.requests_per_second = requests_per_second or 0
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+        self.bucket = TokenBucket(self.requests_per_second) if self.requests_per_second else None
+
+    def delay(self):
+        """
+        按每秒请求数限制需要等待的秒数
+        :return:
+        """
+        return self.bucket.reserve() if self.bucket else 0
+
+    def __enter__(self):
+        if self.semaphore:
+            self.semaphore.acquire()
+        wait = self.delay()
+        if wait:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.semaphore:
+            self.semaphore.release()
+
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(host):
+    """
+    获取host的限速配置，同一进程内的执行共用，配置修改后重新生成
+    :param host: 测试的host域名
+    :return:
+    """
+    config = (host.maxConcurrency or 0, host.requestsPerSecond or 0)
+    with _throttles_lock:
+        throttle = _throttles.get(host.id)
+        if throttle is None or (throttle.max_concurrency, throttle.requests_per_second) != config:
+            throttle = _throttles[host.id] = HostThrottle(*config)
+        return throttle
@@ -0,0 +1,152 @@
+"""
+请求耗时统计
+
+requests发送时按阶段记录: DNS解析、TCP连接、TLS握手、首字节、下载，以及返回内容大小
+复用keep-alive连接时DNS、连接、TLS耗时为0
+"""
+import socket
+import threading
+import time
+from collections import namedtuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+_local = threading.local()
+
+
+class Timing(namedtuple('Timing', ['dns', 'connect', 'tls', 'first_byte', 'download', 'size'])):
+    """
+    单次请求耗时（毫秒）及返回内容大小（字节），未统计的阶段为None
+    """
+
+    def fields(self):
+        """
+        测试结果中对应的字段
+        :return:
+        """
+        return {
+            'dnsTime': self.dns,
+            'connectTime': self.connect,
+            'tlsTime': self.tls,
+            'firstByteTime': self.first_byte,
+            'downloadTime': self.download,
+            'responseSize': self.size,
+        }
+
+    @property
+    def total(self):
+        """
+        请求总耗时（毫秒）
+        :return:
+        """
+        return sum(i or 0 for i in (self.dns, self.connect, self.tls, self.first_byte, self.download))
+
+    def __add__(self, other):
+        return Timing(*[None if a is None and b is None else (a or 0) + (b or 0) for a, b in zip(self, other)])
+
+
+def timing_fields(timing):
+    """
+    测试结果中的耗时字段，没有耗时时各字段为None
+    :param timing: Timing
+    :return:
+    """
+    return (timing or Timing(None, None, None, None, None, None)).fields()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _add_phase(name, seconds):
+    phases = getattr(_local, 'phases', None)
+    if phases is not None:
+        phases[name] += seconds
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """
+    分别统计DNS解析和TCP连接耗时
+    """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, "Failed to establish a new connection: %s" % e)
+        resolved = time.perf_counter()
+        _add_phase('dns', resolved - start)
+        host = self.host
+        error = None
+        try:
+            # 使用已解析的地址建立连接，TLS校验仍使用原host
+            for address in list(dict.fromkeys(i[4][0] for i in addresses)):
+                self.host = address
+                try:
+                    return super(TimedHTTPConnection, self)._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+            raise error
+        finally:
+            self.host = host
+            _add_phase('connect', time.perf_counter() - resolved)
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """
+    在DNS解析和TCP连接之外统计TLS握手耗时
+    """
+
+    def connect(self):
+        phases = getattr(_local, 'phases', None)
+        before = sum(phases.values()) if phases else 0
+        start = time.perf_counter()
+        super(TimedHTTPSConnection, self).connect()
+        if phases is not None:
+            _add_phase('tls', time.perf_counter() - start - (sum(phases.values()) - before))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """
+    使用统计耗时的连接
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def timed_request(send, *args, **kwargs):
+    """
+    发送请求并统计耗时
+    :param send: 发送请求的方法，返回requests的Response
+    :return: (Response, Timing)
+    """
+    phases = _local.phases = {'dns': 0.0, 'connect': 0.0, 'tls': 0.0}
+    start = time.perf_counter()
+    try:
+        response = send(*args, **kwargs)
+    finally:
+        _local.phases = None
+    total = time.perf_counter() - start
+    # elapsed为发送请求到解析完返回头的时间，之后读取返回内容
+    elapsed = response.elapsed.total_seconds()
+    first_byte = max(0.0, elapsed - phases['dns'] - phases['connect'] - phases['tls'])
+    return response, Timing(dns=_ms(phases['dns']), connect=_ms(phases['connect']), tls=_ms(phases['tls']),
+                            first_byte=_ms(first_byte), download=_ms(max(0.0, total - elapsed)),
+                            size=len(response.content))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api_test.common.result_writer import count_results
+from api_test.models import AutomationTaskRunTime, AutomationCaseTestResult
+
+
+class Command(BaseCommand):
+    help = '按测试时间关联历史测试结果与任务执行记录，并统计执行结果'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None, help='项目ID，为空时处理全部项目')
+
+    def handle(self, *args, **options):
+        runs = AutomationTaskRunTime.objects.all().order_by('id')
+        if options['project']:
+            runs = runs.filter(project=options['project'])
+        count = 0
+        for run in runs.iterator():
+            # 旧数据只能通过测试时间和项目对应到执行记录
+            AutomationCaseTestResult.objects.filter(
+                run__isnull=True, testTime=run.startTime,
+                automationCaseApi__automationTestCase__project=run.project_id).update(run=run)
+            count_results(run)
+            if run.status == 'running':
+                run.status = 'finished'
+            run.save()
+            count += 1
+        self.stdout.write('已处理执行记录 %s 条' % count)
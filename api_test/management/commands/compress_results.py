@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Substr
+
+from api_test.common.compression import MARKER, compress_text
+from api_test.models import AutomationCaseTestResult, AutomationTestResult
+
+BODY_FIELDS = ('responseData', 'responseBody')
+
+
+class Command(BaseCommand):
+    help = '压缩保存历史测试结果中的返回内容'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500, help='每批处理的结果数')
+
+    def handle(self, *args, **options):
+        for model in (AutomationCaseTestResult, AutomationTestResult):
+            count = 0
+            last_id = 0
+            # 读取保存的原始内容，不经过字段的解压和引用加载
+            raw = {'%sRaw' % i: Substr(i, 1, output_field=models.TextField()) for i in BODY_FIELDS}
+            while True:
+                rows = list(self._uncompressed(model).filter(id__gt=last_id).order_by('id').annotate(**raw)
+                            .values_list('id', *raw)[:options['batch']])
+                if not rows:
+                    break
+                for row in rows:
+                    values = {field: value for field, value in zip(BODY_FIELDS, row[1:]) if self._rewrite(value)}
+                    if values:
+                        model.objects.filter(id=row[0]).update(**values)
+                        count += 1
+                last_id = rows[-1][0]
+            self.stdout.write('%s 已压缩 %s 条' % (model._meta.verbose_name, count))
+
+    @staticmethod
+    def _rewrite(value):
+        # 已压缩、已去重保存的内容以标记开头；压缩后不变且未达到去重阈值的不需要重写
+        if value is None or value.startswith(MARKER):
+            return False
+        threshold = getattr(settings, 'RESPONSE_BLOB_THRESHOLD', 1024)
+        return compress_text(value) != value or (threshold is not None and len(value) >= threshold)
+
+    @staticmethod
+    def _uncompressed(model):
+        # 只取开头字符判断，避免读取时解压；任一字段不为空且没有标记的需要处理
+        queryset = model.objects.annotate(**{
+            '%sPrefix' % i: Substr(i, 1, 1, output_field=models.CharField()) for i in BODY_FIELDS})
+        condition = Q()
+        for i in BODY_FIELDS:
+            condition |= Q(**{'%s__isnull' % i: False}) & ~Q(**{'%sPrefix' % i: MARKER})
+        return queryset.filter(condition)
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from api_test.common.blob_store import collect, recount, release
+from api_test.models import AutomationTaskRunTime, AutomationCaseTestResult
+
+
+class Command(BaseCommand):
+    help = '清理历史执行记录及测试结果，并删除没有引用的返回内容'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='删除多少天前的执行记录，为空时只清理返回内容')
+        parser.add_argument('--recount', action='store_true', help='清理前按全部测试结果重新统计引用数')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None:
+            before = (datetime.now() - timedelta(days=options['days'])).strftime('%Y-%m-%d %H:%M:%S')
+            count = 0
+            for run in AutomationTaskRunTime.objects.filter(startTime__lt=before).order_by('id').iterator():
+                release(run.results.all())
+                run.delete()
+                count += 1
+            # 未关联执行记录的旧结果按测试时间删除
+            results = AutomationCaseTestResult.objects.filter(run__isnull=True, testTime__lt=before)
+            release(results)
+            results.delete()
+            self.stdout.write('已删除执行记录 %s 条' % count)
+        if options['recount']:
+            recount()
+        self.stdout.write('已删除返回内容 %s 条' % collect())
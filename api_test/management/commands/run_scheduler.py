@@ -0,0 +1,30 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+
+from api_test.common import plan
+from api_test.common.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)  # 这里使用 __name__ 动态搜索定义的 logger 配置，这里有一个层次关系的知识点。
+
+
+class Command(BaseCommand):
+    help = '启动定时任务调度进程，settings.SCHEDULER_MODE为daemon时使用'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='同时执行的任务数')
+        parser.add_argument('--poll', type=float, default=None, help='检查任务的间隔（秒）')
+
+    def handle(self, *args, **options):
+        if not plan.shared_cache():
+            # web进程修改用例接口时只清除web进程内的缓存，调度进程常驻，缓存的执行计划会一直使用修改前的内容
+            logger.warning('缓存不是共享缓存，调度进程不缓存用例接口执行计划')
+            plan.disable_cache()
+        scheduler = Scheduler(options['workers'], options['poll'])
+        signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
+            scheduler.executor.shutdown(wait=True)
@@ -7,6 +7,9 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
+from api_test.common.blob_store import BlobTextField
+from api_test.common.compression import CompressedTextField
+
 HTTP_CHOICE = (
     ('HTTP', 'HTTP'),
     ('HTTPS', 'HTTPS')
@@ -60,9 +63,33 @@ RESULT_CHOICE = (
 )
 
 
+RUN_STATUS_CHOICE = (
+    ('running', '执行中'),
+    ('finished', '已完成'),
+    ('failed', '执行失败'),
+    ('cancelled', '已取消'),
+)
+
+OVERLAP_POLICY_CHOICE = (
+    ('skip', '跳过'),
+    ('queue', '排队'),
+    ('cancel', '取消上一次'),
+)
+
+QUEUE_STATUS_CHOICE = (
+    ('queued', '排队中'),
+    ('running', '执行中'),
+    ('finished', '已完成'),
+    ('failed', '执行失败'),
+    ('skipped', '已跳过'),
+    ('cancelled', '已取消'),
+)
+
+
 TASK_CHOICE = (
     ('circulation', '循环'),
     ('timing', '定时'),
+    ('load', '压测'),
 )
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -168,6 +195,8 @@ class GlobalHost(models.Model):
     host = models.CharField(max_length=1024, verbose_name='Host地址')
     description = models.CharField(max_length=1024, blank=True, null=True, verbose_name='描述')
     status = models.BooleanField(default=True, verbose_name='状态')
+    maxConcurrency = models.IntegerField(default=0, verbose_name='最大并发请求数')
+    requestsPerSecond = models.FloatField(default=0, verbose_name='每秒请求数')
 
     def __unicode__(self):
         return self.name
@@ -463,6 +492,7 @@ class AutomationCaseApi(models.Model):
     examineType = models.CharField(default='no_check', max_length=50, verbose_name='校验方式', choices=EXAMINE_TYPE_CHOICE)
     httpCode = models.CharField(max_length=50, blank=True, null=True, verbose_name='HTTP状态', choices=HTTP_CODE_CHOICE)
     responseData = models.TextField(blank=True, null=True, verbose_name='返回内容')
+    updateTime = models.DateTimeField(auto_now=True, db_index=True, verbose_name='更新时间')
 
     def __unicode__(self):
         return self.name
@@ -485,6 +515,7 @@ class AutomationHead(models.Model):
     name = models.CharField(max_length=1024, verbose_name='参数名')
     value = models.CharField(max_length=1024, verbose_name='内容')
     interrelate = models.BooleanField(default=False, verbose_name='是否关联')
+    updateTime = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
     def __unicode__(self):
         return self.value
@@ -504,6 +535,7 @@ class AutomationParameter(models.Model):
     name = models.CharField(max_length=1024, verbose_name='参数名')
     value = models.CharField(max_length=1024, verbose_name='内容')
     interrelate = models.BooleanField(default=False, verbose_name='是否关联')
+    updateTime = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
     def __unicode__(self):
         return self.value
@@ -521,6 +553,7 @@ class AutomationParameterRaw(models.Model):
     automationCaseApi = models.ForeignKey(AutomationCaseApi, related_name='parameterRaw',
                                           on_delete=models.CASCADE, verbose_name='接口')
     data = models.TextField(verbose_name='源数据请求参数', blank=True, null=True)
+    updateTime = models.DateTimeField(auto_now=True, verbose_name='更新时间')
 
     class Meta:
         verbose_name = '源数据参数'
@@ -546,6 +579,28 @@ class AutomationResponseJson(models.Model):
         verbose_name_plural = '结果JSON参数管理'
 
 
+class ResponseBlob(models.Model):
+    """
+    测试结果返回内容，以内容的sha256为键，相同内容只保存一份
+    """
+    id = models.AutoField(primary_key=True)
+    digest = models.CharField(max_length=64, unique=True, verbose_name='sha256')
+    content = CompressedTextField(verbose_name='内容')
+    size = models.IntegerField(verbose_name='大小(字节)')
+    refCount = models.IntegerField(default=0, db_index=True, verbose_name='引用数')
+    createTime = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+
+    def __unicode__(self):
+        return self.digest
+
+    def __str__(self):
+        return self.digest
+
+    class Meta:
+        verbose_name = '返回内容'
+        verbose_name_plural = '返回内容'
+
+
 class AutomationTestResult(models.Model):
     """
     手动执行结果
@@ -563,8 +618,17 @@ class AutomationTestResult(models.Model):
     data = models.TextField(blank=True, null=True, verbose_name='规则内容')
     result = models.CharField(max_length=50, verbose_name='测试结果', choices=RESULT_CHOICE)
     httpStatus = models.CharField(max_length=50, blank=True, null=True, verbose_name='http状态', choices=HTTP_CODE_CHOICE)
-    responseData = models.TextField(blank=True, null=True, verbose_name='实际返回内容')
+    responseData = BlobTextField(blank=True, null=True, verbose_name='实际返回内容')
     testTime = models.DateTimeField(auto_now_add=True, verbose_name='测试时间')
+    dnsTime = models.FloatField(blank=True, null=True, verbose_name='DNS解析耗时(ms)')
+    connectTime = models.FloatField(blank=True, null=True, verbose_name='TCP连接耗时(ms)')
+    tlsTime = models.FloatField(blank=True, null=True, verbose_name='TLS握手耗时(ms)')
+    firstByteTime = models.FloatField(blank=True, null=True, verbose_name='首字节耗时(ms)')
+    downloadTime = models.FloatField(blank=True, null=True, verbose_name='下载耗时(ms)')
+    responseSize = models.IntegerField(blank=True, null=True, verbose_name='返回内容大小(字节)')
+    examineMessage = models.TextField(blank=True, null=True, verbose_name='校验失败信息')
+    responseBody = BlobTextField(blank=True, null=True, verbose_name='原始返回内容')
+    contentType = models.CharField(max_length=255, blank=True, null=True, verbose_name='Content-Type')
 
     def __unicode__(self):
         return self.httpStatus
@@ -579,7 +643,7 @@ class AutomationTestTask(models.Model):
     用例定时任务
     """
     id = models.AutoField(primary_key=True)
-    project = models.OneToOneField(Project, on_delete=models.CASCADE, verbose_name='项目')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='项目')
     Host = models.ForeignKey(GlobalHost, on_delete=models.CASCADE, verbose_name='HOST')
     name = models.CharField(max_length=50, verbose_name='任务名称')
     type = models.CharField(max_length=50, verbose_name='类型', choices=TASK_CHOICE)
@@ -587,6 +651,17 @@ class AutomationTestTask(models.Model):
     unit = models.CharField(max_length=50, blank=True, null=True, verbose_name='单位', choices=UNIT_CHOICE)
     startTime = models.DateTimeField(max_length=50, verbose_name='开始时间')
     endTime = models.DateTimeField(max_length=50, verbose_name='结束时间')
+    case = models.ForeignKey(AutomationTestCase, blank=True, null=True, on_delete=models.CASCADE,
+                             verbose_name='压测用例')
+    virtualUsers = models.IntegerField(blank=True, null=True, verbose_name='虚拟用户数')
+    duration = models.IntegerField(blank=True, null=True, verbose_name='压测时长(秒)')
+    iterations = models.IntegerField(blank=True, null=True, verbose_name='每用户执行次数')
+    overlapPolicy = models.CharField(max_length=50, blank=True, null=True, verbose_name='执行重叠时',
+                                     choices=OVERLAP_POLICY_CHOICE)
+    priority = models.IntegerField(default=0, verbose_name='优先级')
+    cases = models.ManyToManyField(AutomationTestCase, blank=True, related_name='tasks',
+                                   verbose_name='执行用例')
+    workers = models.IntegerField(blank=True, null=True, verbose_name='并发线程数')
 
     def __unicode__(self):
         return self.name
@@ -605,9 +680,20 @@ class AutomationTaskRunTime(models.Model):
     """
     id = models.AutoField(primary_key=True)
     project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='项目')
-    startTime = models.CharField(max_length=50, verbose_name='开始时间')
+    task = models.ForeignKey(AutomationTestTask, blank=True, null=True, on_delete=models.SET_NULL,
+                             verbose_name='定时任务')
+    startTime = models.CharField(max_length=50, db_index=True, verbose_name='开始时间')
     host = models.CharField(max_length=1024, null=True, blank=True, verbose_name='测试地址')
     elapsedTime = models.CharField(max_length=50, verbose_name='结束时间')
+    status = models.CharField(max_length=50, default='running', verbose_name='状态', choices=RUN_STATUS_CHOICE)
+    endTime = models.CharField(max_length=50, null=True, blank=True, verbose_name='结束时间')
+    duration = models.FloatField(blank=True, null=True, verbose_name='耗时(秒)')
+    total = models.IntegerField(default=0, verbose_name='执行接口数')
+    passCount = models.IntegerField(default=0, verbose_name='成功数')
+    failCount = models.IntegerField(default=0, verbose_name='失败数')
+    errorCount = models.IntegerField(default=0, verbose_name='执行错误数')
+    timeoutCount = models.IntegerField(default=0, verbose_name='超时数')
+    queueDelay = models.FloatField(blank=True, null=True, verbose_name='排队耗时(秒)')
 
     class Meta:
         verbose_name = '用例任务执行时间'
@@ -621,12 +707,23 @@ class AutomationCaseTestResult(models.Model):
     id = models.AutoField(primary_key=True)
     automationCaseApi = models.ForeignKey(AutomationCaseApi, on_delete=models.CASCADE, verbose_name='接口'
                                           , related_name="auto_result")
+    run = models.ForeignKey(AutomationTaskRunTime, blank=True, null=True, on_delete=models.CASCADE,
+                            verbose_name='任务执行记录', related_name="results")
     header = models.CharField(max_length=1024, blank=True, null=True, verbose_name='请求头')
     parameter = models.TextField(blank=True, null=True, verbose_name='请求参数')
     result = models.CharField(max_length=50, verbose_name='测试结果', choices=RESULT_CHOICE)
     httpStatus = models.CharField(max_length=50, blank=True, null=True, verbose_name='http状态', choices=HTTP_CODE_CHOICE)
-    responseData = models.TextField(blank=True, null=True, verbose_name='实际返回内容')
+    responseData = BlobTextField(blank=True, null=True, verbose_name='实际返回内容')
     testTime = models.CharField(max_length=128, null=True, blank=True, verbose_name='测试时间')
+    dnsTime = models.FloatField(blank=True, null=True, verbose_name='DNS解析耗时(ms)')
+    connectTime = models.FloatField(blank=True, null=True, verbose_name='TCP连接耗时(ms)')
+    tlsTime = models.FloatField(blank=True, null=True, verbose_name='TLS握手耗时(ms)')
+    firstByteTime = models.FloatField(blank=True, null=True, verbose_name='首字节耗时(ms)')
+    downloadTime = models.FloatField(blank=True, null=True, verbose_name='下载耗时(ms)')
+    responseSize = models.IntegerField(blank=True, null=True, verbose_name='返回内容大小(字节)')
+    examineMessage = models.TextField(blank=True, null=True, verbose_name='校验失败信息')
+    responseBody = BlobTextField(blank=True, null=True, verbose_name='原始返回内容')
+    contentType = models.CharField(max_length=255, blank=True, null=True, verbose_name='Content-Type')
 
     def __unicode__(self):
         return self.httpStatus
@@ -636,6 +733,102 @@ class AutomationCaseTestResult(models.Model):
         verbose_name_plural = '自动测试结果管理'
 
 
+class AutomationRunQueue(models.Model):
+    """
+    任务执行队列，同一定时任务同时只执行一个，不属于定时任务的执行按项目和HOST区分
+    """
+    id = models.AutoField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='项目')
+    task = models.ForeignKey(AutomationTestTask, blank=True, null=True, on_delete=models.SET_NULL,
+                             verbose_name='定时任务')
+    Host = models.ForeignKey(GlobalHost, on_delete=models.CASCADE, verbose_name='HOST')
+    type = models.CharField(max_length=50, default='circulation', verbose_name='类型', choices=TASK_CHOICE)
+    priority = models.IntegerField(default=0, verbose_name='优先级')
+    status = models.CharField(max_length=50, default='queued', verbose_name='状态', choices=QUEUE_STATUS_CHOICE)
+    cancelRequested = models.BooleanField(default=False, verbose_name='请求取消')
+    run = models.ForeignKey(AutomationTaskRunTime, blank=True, null=True, on_delete=models.SET_NULL,
+                            verbose_name='任务执行记录')
+    worker = models.CharField(max_length=255, blank=True, null=True, verbose_name='执行进程')
+    createTime = models.DateTimeField(auto_now_add=True, verbose_name='加入时间')
+    scheduledTime = models.DateTimeField(blank=True, null=True, verbose_name='计划执行时间')
+    startTime = models.DateTimeField(blank=True, null=True, verbose_name='开始时间')
+    endTime = models.DateTimeField(blank=True, null=True, verbose_name='结束时间')
+    heartbeat = models.DateTimeField(blank=True, null=True, verbose_name='心跳时间')
+    queueDelay = models.FloatField(blank=True, null=True, verbose_name='排队耗时(秒)')
+
+    class Meta:
+        verbose_name = '任务执行队列'
+        verbose_name_plural = '任务执行队列'
+        index_together = (('status', 'priority'), ('project', 'status'))
+
+
+class AutomationApiLatency(models.Model):
+    """
+    每次任务执行各接口的请求耗时统计，单位毫秒
+    """
+    id = models.AutoField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='项目')
+    run = models.ForeignKey(AutomationTaskRunTime, on_delete=models.CASCADE, verbose_name='任务执行记录')
+    automationCaseApi = models.ForeignKey(AutomationCaseApi, on_delete=models.CASCADE, verbose_name='接口')
+    testTime = models.DateTimeField(verbose_name='测试时间')
+    count = models.IntegerField(default=0, verbose_name='请求数')
+    minTime = models.FloatField(verbose_name='最小耗时')
+    maxTime = models.FloatField(verbose_name='最大耗时')
+    p50 = models.FloatField(verbose_name='P50')
+    p95 = models.FloatField(verbose_name='P95')
+    p99 = models.FloatField(verbose_name='P99')
+
+    class Meta:
+        verbose_name = '接口耗时统计'
+        verbose_name_plural = '接口耗时统计'
+        index_together = (('project', 'testTime'), ('automationCaseApi', 'testTime'))
+
+
+class AutomationLoadTestRun(models.Model):
+    """
+    压测执行记录
+    """
+    id = models.AutoField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, verbose_name='项目')
+    case = models.ForeignKey(AutomationTestCase, on_delete=models.CASCADE, verbose_name='用例')
+    host = models.CharField(max_length=1024, null=True, blank=True, verbose_name='测试地址')
+    startTime = models.CharField(max_length=50, verbose_name='开始时间')
+    elapsedTime = models.FloatField(default=0, verbose_name='耗时(秒)')
+    virtualUsers = models.IntegerField(verbose_name='虚拟用户数')
+    duration = models.IntegerField(blank=True, null=True, verbose_name='压测时长(秒)')
+    iterations = models.IntegerField(blank=True, null=True, verbose_name='每用户执行次数')
+
+    class Meta:
+        verbose_name = '压测执行记录'
+        verbose_name_plural = '压测执行记录'
+
+
+class AutomationLoadTestResult(models.Model):
+    """
+    压测结果，每次压测每个接口一条，延迟单位毫秒
+    """
+    id = models.AutoField(primary_key=True)
+    run = models.ForeignKey(AutomationLoadTestRun, on_delete=models.CASCADE, verbose_name='压测记录',
+                            related_name='results')
+    automationCaseApi = models.ForeignKey(AutomationCaseApi, on_delete=models.CASCADE, verbose_name='接口')
+    count = models.IntegerField(default=0, verbose_name='请求数')
+    errors = models.IntegerField(default=0, verbose_name='失败数')
+    minTime = models.FloatField(blank=True, null=True, verbose_name='最小延迟')
+    maxTime = models.FloatField(blank=True, null=True, verbose_name='最大延迟')
+    meanTime = models.FloatField(blank=True, null=True, verbose_name='平均延迟')
+    p50 = models.FloatField(blank=True, null=True, verbose_name='P50')
+    p90 = models.FloatField(blank=True, null=True, verbose_name='P90')
+    p99 = models.FloatField(blank=True, null=True, verbose_name='P99')
+    p999 = models.FloatField(blank=True, null=True, verbose_name='P99.9')
+    throughput = models.FloatField(default=0, verbose_name='吞吐量(次/秒)')
+    errorRate = models.FloatField(default=0, verbose_name='错误率')
+    histogram = models.TextField(blank=True, null=True, verbose_name='延迟直方图')
+
+    class Meta:
+        verbose_name = '压测结果'
+        verbose_name_plural = '压测结果'
+
+
 class AutomationReportSendConfig(models.Model):
     """
     报告发送人配置
@@ -6,7 +6,8 @@ from api_test.models import Project, ProjectDynamic, ProjectMember, GlobalHost,
     ApiInfo, APIRequestHistory, ApiOperationHistory, AutomationGroupLevelFirst, \
     AutomationTestCase, AutomationCaseApi, AutomationHead, AutomationParameter, AutomationTestTask, \
     AutomationTestResult, ApiHead, ApiParameter, ApiResponse, ApiParameterRaw, AutomationParameterRaw, \
-    AutomationResponseJson, AutomationTaskRunTime, AutomationCaseTestResult, AutomationReportSendConfig
+    AutomationResponseJson, AutomationTaskRunTime, AutomationCaseTestResult, AutomationReportSendConfig, \
+    AutomationLoadTestRun, AutomationLoadTestResult
 
 
 class TokenSerializer(serializers.ModelSerializer):
@@ -116,7 +117,7 @@ class GlobalHostSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = GlobalHost
-        fields = ('id', 'project_id', 'name', 'host', 'status', 'description')
+        fields = ('id', 'project_id', 'name', 'host', 'status', 'description', 'maxConcurrency', 'requestsPerSecond')
 
 
 class ApiGroupLevelFirstSerializer(serializers.ModelSerializer):
@@ -500,7 +501,8 @@ class AutomationTestTaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AutomationTestTask
-        fields = ('id', 'project', 'Host', 'name', 'type', 'frequency', 'unit', 'startTime', 'endTime')
+        fields = ('id', 'project', 'Host', 'name', 'type', 'frequency', 'unit', 'startTime', 'endTime', 'case',
+                  'virtualUsers', 'duration', 'iterations', 'overlapPolicy', 'priority', 'cases', 'workers')
 
 
 class AutomationTestTaskDeserializer(serializers.ModelSerializer):
@@ -510,7 +512,8 @@ class AutomationTestTaskDeserializer(serializers.ModelSerializer):
 
     class Meta:
         model = AutomationTestTask
-        fields = ('id', 'project_id', 'Host_id', 'name', 'type', 'frequency', 'unit', 'startTime', 'endTime')
+        fields = ('id', 'project_id', 'Host_id', 'name', 'type', 'frequency', 'unit', 'startTime', 'endTime',
+                  'case_id', 'virtualUsers', 'duration', 'iterations', 'overlapPolicy', 'priority', 'workers')
 
 
 class AutomationTestReportSerializer(serializers.ModelSerializer):
@@ -540,7 +543,8 @@ class AutomationTaskRunTimeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AutomationTaskRunTime
-        fields = ('id', 'project', 'startTime', 'elapsedTime', 'host')
+        fields = ('id', 'project', 'task', 'startTime', 'elapsedTime', 'host', 'status', 'endTime', 'duration',
+                  'total', 'passCount', 'failCount', 'errorCount', 'timeoutCount', 'queueDelay')
 
 
 class AutomationTestResultSerializer(serializers.ModelSerializer):
@@ -552,7 +556,9 @@ class AutomationTestResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = AutomationTestResult
         fields = ('id', 'url', 'requestType', 'header', 'parameter', 'statusCode', 'examineType', 'data',
-                  'result', 'httpStatus', 'responseData', 'testTime')
+                  'result', 'httpStatus', 'responseData', 'testTime', 'dnsTime', 'connectTime', 'tlsTime',
+                  'firstByteTime', 'downloadTime', 'responseSize', 'examineMessage',
+                  'responseBody', 'contentType')
 
 
 class AutomationAutoTestResultSerializer(serializers.ModelSerializer):
@@ -570,7 +576,20 @@ class AutomationAutoTestResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = AutomationCaseTestResult
         fields = ('id', 'automationTestCase', 'name', 'httpType', 'header', 'requestType', 'apiAddress', 'examineType',
-                  'result', 'parameter', 'httpStatus', 'responseData', 'testTime')
+                  'result', 'parameter', 'httpStatus', 'responseData', 'testTime', 'dnsTime', 'connectTime',
+                  'tlsTime', 'firstByteTime', 'downloadTime', 'responseSize', 'examineMessage',
+                  'responseBody', 'contentType')
+
+
+class AutomationAutoTestResultBriefSerializer(AutomationAutoTestResultSerializer):
+    """
+    自动测试结果列表序列化，不包含返回内容
+    """
+
+    class Meta:
+        model = AutomationCaseTestResult
+        fields = tuple(i for i in AutomationAutoTestResultSerializer.Meta.fields
+                       if i not in ('responseData', 'responseBody'))
 
 
 class AutomationTestLatelyTenTimeSerializer(serializers.ModelSerializer):
@@ -579,7 +598,33 @@ class AutomationTestLatelyTenTimeSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = AutomationTaskRunTime
-        fields = ("id", "startTime")
+        fields = ("id", "startTime", "status", "total", "passCount", "failCount", "errorCount", "timeoutCount")
+
+
+class AutomationLoadTestRunSerializer(serializers.ModelSerializer):
+    """
+    压测执行记录序列化
+    """
+    caseName = serializers.CharField(source='case.caseName')
+
+    class Meta:
+        model = AutomationLoadTestRun
+        fields = ('id', 'case_id', 'caseName', 'host', 'startTime', 'elapsedTime', 'virtualUsers', 'duration',
+                  'iterations')
+
+
+class AutomationLoadTestResultSerializer(serializers.ModelSerializer):
+    """
+    压测结果序列化
+    """
+    name = serializers.CharField(source='automationCaseApi.name')
+    requestType = serializers.CharField(source='automationCaseApi.requestType')
+    apiAddress = serializers.CharField(source='automationCaseApi.apiAddress')
+
+    class Meta:
+        model = AutomationLoadTestResult
+        fields = ('id', 'automationCaseApi_id', 'name', 'requestType', 'apiAddress', 'count', 'errors', 'minTime',
+                  'maxTime', 'meanTime', 'p50', 'p90', 'p99', 'p999', 'throughput', 'errorRate')
 
 
 class AutomationReportSendConfigSerializer(serializers.ModelSerializer):
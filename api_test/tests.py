@@ -1,3 +1,582 @@
-from django.test import TestCase
+import datetime
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+PROJECT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 不依赖Django初始化的模块
+LIGHT_MODULES = ['api_test.common.http_client', 'api_test.common.template', 'api_test.common.assertion',
+                 'api_test.common.json_compare', 'api_test.common.jsonlib', 'api_test.common.throttle',
+                 'api_test.common.histogram']
+
+IMPORT_SCRIPT = '''
+import json
+import sys
+import time
+start = time.perf_counter()
+if sys.argv[1] == 'setup':
+    from api_test.common.bootstrap import setup
+    setup()
+for name in sys.argv[2:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+from django.apps import apps
+from api_test.common.jsonlib import dumps, loads
+print(json.dumps({'elapsed': elapsed, 'ready': apps.ready, 'models': 'api_test.models' in sys.modules,
+                  'json': loads(dumps({'a': 1}))}))
+'''
+
+
+def measure_import(modules, setup=False):
+    """
+    在新进程中导入模块
+    :param modules: 模块名列表
+    :param setup: 导入前是否初始化Django
+    :return: {'elapsed': 导入耗时（秒）, 'ready': Django是否已初始化, 'models': 是否导入了api_test.models}
+    """
+    env = dict(os.environ)
+    if not setup:
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT, 'setup' if setup else 'light'] + modules,
+                                     cwd=PROJECT_PATH, env=env)
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+class ImportTimeTest(SimpleTestCase):
+
+    def test_light_modules_without_django(self):
+        result = measure_import(LIGHT_MODULES)
+        self.assertFalse(result['ready'])
+        self.assertFalse(result['models'])
+        self.assertEqual(result['json'], {'a': 1})
+
+    def test_light_import_faster_than_setup(self):
+        light = min(measure_import(LIGHT_MODULES)['elapsed'] for _ in range(3))
+        full = min(measure_import(['api_test.common.auto_test'], setup=True)['elapsed'] for _ in range(3))
+        self.assertLess(light, full, '导入耗时 %.3fs，初始化Django后导入 %.3fs' % (light, full))
+
+
+class JsonlibTest(SimpleTestCase):
+
+    def test_response_text_keeps_default_separators(self):
+        from api_test.common.jsonlib import response_text
+        text = response_text({'data': {'token': 'abc', 'name': '测试'}, 'code': 0})
+        self.assertEqual(text, '{"data": {"token": "abc", "name": "测试"}, "code": 0}')
+        self.assertEqual(re.findall('"token": "(.*?)"', text), ['abc'])
+        self.assertEqual(response_text('plain'), 'plain')
+
+    def test_stored_payload_is_compact(self):
+        from api_test.common.jsonlib import decode_response, encode_response
+        stored = encode_response({'a': [1, None], 'b': '文'})
+        self.assertEqual(stored, '{"a":[1,null],"b":"文"}')
+        self.assertEqual(decode_response(stored), {'a': [1, None], 'b': '文'})
+        self.assertEqual(decode_response("{'a': 1}"), {'a': 1})
+
+
+class TemplateTest(SimpleTestCase):
+    data = {'12': {'data': {'token': 'abc', 'items': [{'id': 7}]}}, '13': {'a': 'A'}}
+
+    def render(self, value):
+        from api_test.common.template import parse
+        return parse(value).render(lambda i: self.data[i], lambda i: json.dumps(self.data[i]))
+
+    def test_json_placeholder(self):
+        self.assertEqual(self.render('Bearer <response[JSON][12]>["data"]["token"]'), 'Bearer abc')
+
+    def test_closing_bracket_after_path(self):
+        self.assertEqual(self.render('<response[JSON][13]["a"]>'), 'A')
+        self.assertEqual(self.render('x<response[JSON][13]["a"]>y'), 'xAy')
+
+    def test_text_after_closed_placeholder_is_kept(self):
+        self.assertEqual(self.render('<response[JSON][13]>["a"]>'), 'A>')
+
+    def test_multiple_placeholders(self):
+        from api_test.common.template import parse
+        value = '<response[JSON][12]>["data"]["token"]-<response[JSON][13]>["a"]'
+        self.assertEqual(self.render(value), 'abc-A')
+        self.assertEqual(parse(value).api_ids, ['12', '13'])
+
+    def test_regular_placeholder(self):
+        self.assertEqual(self.render('<response[Regular][12]["token": "(.*?)""]'), 'abc')
+
+    def test_errors(self):
+        from api_test.common.template import TemplateError, parse
+        with self.assertRaises(TemplateError):
+            self.render('no placeholder')
+        with self.assertRaises(TemplateError):
+            self.render('<response[XML][12]>["a"]')
+        with self.assertRaises(TemplateError):
+            self.render('<response[Regular][12]["("]')
+        self.assertIs(parse('<response[JSON][13]>["a"]'), parse('<response[JSON][13]>["a"]'))
+
+
+class AssertionTest(SimpleTestCase):
+
+    def verify(self, expected, actual, diagnostic=True):
+        from api_test.common.assertion import compile_json
+        return [str(i) for i in compile_json(json.dumps(expected)).verify(actual, diagnostic)]
+
+    def test_presence_and_type(self):
+        expected = {'code': 0, 'data': {'token': 'x', 'ok': True}}
+        self.assertEqual(self.verify(expected, {'code': 1, 'data': {'token': 'abc', 'ok': False}, 'extra': 1}), [])
+        self.assertEqual(self.verify(expected, {'code': '0', 'data': {'ok': 1}}),
+                         ['$.code: type校验失败，期望 number，实际 string',
+                          '$.data.token: 缺少字段',
+                          '$.data.ok: type校验失败，期望 boolean，实际 number'])
+
+    def test_first_failure_only(self):
+        failures = self.verify({'a': 1, 'b': 1}, {}, diagnostic=False)
+        self.assertEqual(failures, ['$.a: 缺少字段'])
+
+    def test_null_and_any_skip_type(self):
+        self.assertEqual(self.verify({'a': None, 'b': '<any>'}, {'a': [1], 'b': {'c': 1}}), [])
+        self.assertEqual(self.verify({'a': '<any>'}, {}), ['$.a: 缺少字段'])
+
+    def test_directives(self):
+        expected = {'v': '<value>1', 's': '<value>ok', 'n': '<length>2', 'r': '<regex>^\\d+$'}
+        self.assertEqual(self.verify(expected, {'v': 1, 's': 'ok', 'n': [1, 2], 'r': '123'}), [])
+        self.assertEqual(self.verify(expected, {'v': 2, 's': 'no', 'n': 'abc', 'r': 'x1'}),
+                         ['$.v: value校验失败，期望 1，实际 2',
+                          '$.s: value校验失败，期望 ok，实际 no',
+                          '$.n: length校验失败，期望 2，实际 3',
+                          '$.r: regex校验失败，期望 ^\\d+$，实际 x1'])
+
+    def test_array_items_checked_against_first_element(self):
+        expected = {'items': [{'id': 0}]}
+        self.assertEqual(self.verify(expected, {'items': []}), [])
+        self.assertEqual(self.verify(expected, {'items': [{'id': 1}, {'id': 'x'}, {}]}),
+                         ['$.items[1].id: type校验失败，期望 number，实际 string',
+                          '$.items[2].id: 缺少字段'])
+        self.assertEqual(self.verify(expected, {'items': {}}), ['$.items: type校验失败，期望 array，实际 object'])
+
+    def test_key_path_quotes_non_identifiers(self):
+        self.assertEqual(self.verify({'a-b': {'1': 0}}, {'a-b': {}}), ['$["a-b"]["1"]: 缺少字段'])
+
+    def test_python_literal_expected(self):
+        from api_test.common.assertion import compile_json, describe
+        assertion = compile_json("{'ok': true, 'data': null}")
+        self.assertIs(assertion, compile_json("{'ok': true, 'data': null}"))
+        self.assertIsNone(describe(assertion.verify({'ok': False, 'data': 1})))
+        self.assertEqual(compile_json('').verify({'any': 1}), [])
+
+
+class JsonCompareTest(SimpleTestCase):
+    cases = [
+        ({'a': 1, 'b': [1, 2]}, {'a': 1, 'b': [1, 2]}, None),
+        ({'a': 1, 'b': 2}, {'a': 1}, '$.b: 缺少字段'),
+        ({'a': 1}, {'a': 1, 'c': 3}, '$.c: 多余字段'),
+        ({'a': [1, 2]}, {'a': [1, 2, 3]}, '$.a: length校验失败，期望 2，实际 3'),
+        ({'a': [{'id': 1}, {'id': 2}]}, {'a': [{'id': 1}, {'id': 3}]}, '$.a[1].id: value校验失败，期望 2，实际 3'),
+        ({'a': '1'}, {'a': 1}, '$.a: type校验失败，期望 string，实际 number'),
+        ({'a': 1.0}, {'a': 1}, None),
+        ({'名称': '文'}, {'名称': '字'}, '$.名称: value校验失败，期望 文，实际 字'),
+    ]
+
+    def test_stream_compare(self):
+        from api_test.common.json_compare import compare
+        for expected, actual, message in self.cases:
+            failure = compare(json.dumps(expected, ensure_ascii=False), actual)
+            self.assertEqual(str(failure) if failure else None, message, expected)
+
+    def test_stream_matches_parsed_compare(self):
+        from api_test.common.json_compare import compare, first_difference
+        for expected, actual, _ in self.cases:
+            self.assertEqual(compare(json.dumps(expected), actual), first_difference(expected, actual))
+
+    def test_large_array(self):
+        from api_test.common.json_compare import compare
+        expected = [{'k': i} for i in range(2000)]
+        actual = [{'k': i} for i in range(2000)]
+        self.assertIsNone(compare(json.dumps(expected), actual))
+        actual[1500]['k'] = -1
+        self.assertEqual(str(compare(json.dumps(expected), actual)), '$[1500].k: value校验失败，期望 1500，实际 -1')
+
+    def test_python_literal_expected(self):
+        from api_test.common.json_compare import compare
+        self.assertIsNone(compare("{'a': True, 'b': None}", {'a': True, 'b': None}))
+        self.assertEqual(str(compare("{'a': 1}", {'a': 2})), '$.a: value校验失败，期望 1，实际 2')
+
+
+class HistogramTest(SimpleTestCase):
+
+    def test_small_values_are_exact(self):
+        from api_test.common.histogram import Histogram
+        histogram = Histogram()
+        for i in range(1, 101):
+            histogram.record(i)
+        self.assertEqual((histogram.count, histogram.min, histogram.max, histogram.mean), (100, 1, 100, 50.5))
+        self.assertEqual([histogram.percentile(i) for i in (1, 50, 90, 99, 100)], [1, 50, 90, 99, 100])
+
+    def test_relative_error(self):
+        import random
+        from api_test.common.histogram import Histogram
+        values = sorted(random.Random(1).randint(1, 10 ** 7) for _ in range(10000))
+        histogram = Histogram()
+        for i in values:
+            histogram.record(i)
+        for percent in (50, 90, 99, 99.9):
+            exact = values[int(round(percent / 100.0 * len(values) + 0.5)) - 1]
+            self.assertLessEqual(abs(histogram.percentile(percent) - exact) / exact, 1.0 / 64)
+        self.assertEqual(histogram.percentile(100), values[-1])
+
+    def test_merge_and_encode(self):
+        from api_test.common.histogram import Histogram
+        first, second = Histogram(), Histogram()
+        first.record(5, count=3)
+        second.record(1000)
+        second.record(-1)
+        merged = Histogram.decode(first.merge(second).encode())
+        self.assertEqual((merged.count, merged.total, merged.min, merged.max), (5, 1015, 0, 1000))
+        self.assertEqual(merged.percentile(50), 5)
+        self.assertIsNone(Histogram().percentile(50))
+        with self.assertRaises(ValueError):
+            Histogram(5).merge(Histogram(7))
+
+
+class ThrottleTest(SimpleTestCase):
+
+    def test_token_bucket(self):
+        from unittest import mock
+        from api_test.common.throttle import TokenBucket
+        now = [100.0]
+        with mock.patch('api_test.common.throttle.time.monotonic', lambda: now[0]):
+            bucket = TokenBucket(rate=2, burst=2)
+            self.assertEqual([bucket.reserve(), bucket.reserve()], [0, 0])
+            self.assertAlmostEqual(bucket.reserve(), 0.5)
+            self.assertAlmostEqual(bucket.reserve(), 1.0)
+            now[0] += 1.5
+            self.assertEqual(bucket.reserve(), 0)
+            now[0] += 60
+            self.assertEqual([bucket.reserve(), bucket.reserve()], [0, 0])
+            self.assertGreater(bucket.reserve(), 0)
+
+    def test_max_concurrency(self):
+        from api_test.common.throttle import HostThrottle
+        throttle = HostThrottle(max_concurrency=2)
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def request():
+            with throttle:
+                with lock:
+                    active[0] += 1
+                    active[1] = max(active)
+                time.sleep(0.02)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(active, [0, 2])
+        self.assertEqual(HostThrottle().delay(), 0)
+
+    def test_get_throttle_follows_host_config(self):
+        from types import SimpleNamespace
+        from api_test.common.throttle import get_throttle
+        host = SimpleNamespace(id=-1, maxConcurrency=2, requestsPerSecond=None)
+        throttle = get_throttle(host)
+        self.assertIs(get_throttle(host), throttle)
+        host.requestsPerSecond = 5
+        self.assertIsNot(get_throttle(host), throttle)
+        self.assertEqual(get_throttle(host).requests_per_second, 5)
+
+
+class CompressionTest(SimpleTestCase):
+
+    def test_round_trip(self):
+        from api_test.common.compression import MARKER, compress_text, decompress_text, is_compressed
+        text = json.dumps([{'id': i, 'name': '名称%d' % i} for i in range(200)], ensure_ascii=False)
+        for method in ('zlib', 'lzma'):
+            value = compress_text(text, method, 1024)
+            self.assertTrue(value.startswith(MARKER + method + ':'))
+            self.assertLess(len(value), len(text))
+            self.assertTrue(is_compressed(value))
+            self.assertEqual(decompress_text(value), text)
+
+    def test_not_compressed(self):
+        from api_test.common.compression import compress_text, decompress_text
+        self.assertEqual(compress_text('short', 'zlib', 1024), 'short')
+        with self.settings(RESPONSE_COMPRESSION=None):
+            self.assertEqual(compress_text('x' * 2000, threshold=1024), 'x' * 2000)
+        self.assertIsNone(compress_text(None, 'zlib', 0))
+        # 压缩后更大时保存原文
+        self.assertEqual(compress_text('ab', 'zlib', 0), 'ab')
+        self.assertEqual(decompress_text('plain'), 'plain')
+
+    def test_text_starting_with_marker(self):
+        from api_test.common.compression import MARKER, compress_text, decompress_text
+        text = MARKER + 'zlib:not compressed'
+        self.assertEqual(decompress_text(compress_text(text, 'zlib', 1024)), text)
+
+    def test_field(self):
+        from api_test.common.compression import CompressedTextField, MARKER
+        field = CompressedTextField()
+        with self.settings(RESPONSE_COMPRESSION='zlib', RESPONSE_COMPRESSION_THRESHOLD=100):
+            value = field.get_prep_value('a' * 1000)
+        self.assertTrue(value.startswith(MARKER))
+        self.assertEqual(field.from_db_value(value, None, None), 'a' * 1000)
+        self.assertEqual(field.to_python(value), 'a' * 1000)
+
+
+def create_case_api():
+    """
+    测试用的用例接口
+    """
+    from django.contrib.auth.models import User
+    from api_test.models import AutomationCaseApi, AutomationTestCase, Project
+    user = User.objects.create(username='tester')
+    project = Project.objects.create(name='p', version='1', type='Web', user=user)
+    case = AutomationTestCase.objects.create(project=project, caseName='c', user=user)
+    return AutomationCaseApi.objects.create(automationTestCase=case, name='api', requestType='GET', apiAddress='/a',
+                                            requestParameterType='form-data')
+
+
+def write_raw(model, _id, **values):
+    """
+    不经过字段转换直接写入数据库，模拟旧数据
+    """
+    from django.db import connection
+    columns = ', '.join('%s = %%s' % connection.ops.quote_name(i) for i in values)
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE %s SET %s WHERE id = %%s' % (connection.ops.quote_name(model._meta.db_table), columns),
+                       list(values.values()) + [_id])
+
+
+class CompressResultsTest(TestCase):
+
+    def test_idempotent(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from api_test.models import AutomationCaseTestResult, ResponseBlob
+        api = create_case_api()
+        big = json.dumps([{'k': i} for i in range(500)])
+        rows = [AutomationCaseTestResult.objects.create(automationCaseApi=api, result='PASS') for _ in range(2)]
+        write_raw(AutomationCaseTestResult, rows[0].id, responseData=big, responseBody='not json')
+        write_raw(AutomationCaseTestResult, rows[1].id, responseData='{"a": 1}', responseBody=None)
+        outputs = []
+        for _ in range(2):
+            out = StringIO()
+            call_command('compress_results', stdout=out)
+            outputs.append(out.getvalue().splitlines()[0])
+        self.assertEqual(outputs, ['自动测试结果 已压缩 1 条', '自动测试结果 已压缩 0 条'])
+        self.assertEqual(list(ResponseBlob.objects.values_list('refCount', flat=True)), [1])
+        self.assertEqual(AutomationCaseTestResult.objects.get(id=rows[0].id).responseData, big)
+        self.assertEqual(AutomationCaseTestResult.objects.get(id=rows[1].id).responseData, '{"a": 1}')
+
+
+class BlobStoreTest(TestCase):
+
+    def setUp(self):
+        from api_test.common import blob_store
+        blob_store.load.cache_clear()
+        self.api = create_case_api()
+        self.body = json.dumps([{'k': i} for i in range(300)])
+
+    def create(self, text):
+        from api_test.models import AutomationCaseTestResult
+        return AutomationCaseTestResult.objects.create(automationCaseApi=self.api, result='PASS', responseData=text)
+
+    def test_same_content_stored_once(self):
+        from api_test.models import AutomationCaseTestResult, ResponseBlob
+        self.create(self.body)
+        result = self.create(self.body)
+        small = self.create('{}')
+        blob = ResponseBlob.objects.get()
+        self.assertEqual((blob.refCount, blob.size), (2, len(self.body)))
+        self.assertEqual(AutomationCaseTestResult.objects.get(id=result.id).responseData, self.body)
+        self.assertEqual(AutomationCaseTestResult.objects.get(id=small.id).responseData, '{}')
+
+    def test_release_and_collect(self):
+        from api_test.common.blob_store import collect, references, release
+        from api_test.models import AutomationCaseTestResult, ResponseBlob
+        self.create(self.body)
+        self.create(self.body)
+        self.create('small')
+        results = AutomationCaseTestResult.objects.all()
+        self.assertEqual(list(references(results).values()), [2])
+        release(results.filter(id=results.first().id))
+        self.assertEqual(ResponseBlob.objects.get().refCount, 1)
+        self.assertEqual(collect(), 0)
+        release(results)
+        self.assertEqual(collect(), 1)
+
+    def test_recount(self):
+        from api_test.common.blob_store import recount
+        from api_test.models import ResponseBlob
+        self.create(self.body)
+        ResponseBlob.objects.update(refCount=5)
+        recount()
+        self.assertEqual(ResponseBlob.objects.get().refCount, 1)
+
+    def test_missing_blob_reads_as_none(self):
+        from api_test.models import AutomationCaseTestResult, ResponseBlob
+        result = self.create(self.body)
+        ResponseBlob.objects.all().delete()
+        self.assertIsNone(AutomationCaseTestResult.objects.get(id=result.id).responseData)
+
+
+def scheduled_task(**fields):
+    from types import SimpleNamespace
+    start = datetime.datetime(2026, 1, 1, 8, 0)
+    values = dict(id=1, type='circulation', startTime=start, endTime=start + datetime.timedelta(days=1), frequency=10,
+                  unit='m')
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+class LastFireTest(SimpleTestCase):
+    start = datetime.datetime(2026, 1, 1, 8, 0)
+
+    def fire(self, task, after, until):
+        from api_test.common.scheduler import last_fire
+        minutes = datetime.timedelta(minutes=1)
+        return last_fire(task, self.start + after * minutes, self.start + until * minutes)
+
+    def test_timing_fires_once(self):
+        task = scheduled_task(type='timing')
+        self.assertEqual(self.fire(task, -1, 0), self.start)
+        self.assertIsNone(self.fire(task, 0, 60))
+        self.assertIsNone(self.fire(task, -10, -1))
+
+    def test_circulation_latest_fire_in_window(self):
+        task = scheduled_task()
+        self.assertEqual(self.fire(task, 5, 25), self.start + datetime.timedelta(minutes=20))
+        self.assertIsNone(self.fire(task, 21, 29))
+        self.assertEqual(self.fire(task, 29, 30), self.start + datetime.timedelta(minutes=30))
+        self.assertIsNone(self.fire(task, -5, -1))
+
+    def test_circulation_stops_at_end_time(self):
+        task = scheduled_task(endTime=self.start + datetime.timedelta(minutes=25))
+        self.assertEqual(self.fire(task, 15, 60), self.start + datetime.timedelta(minutes=20))
+        self.assertIsNone(self.fire(task, 20, 60))
+
+    def test_invalid_interval(self):
+        self.assertIsNone(self.fire(scheduled_task(frequency=None), -1, 60))
+        self.assertIsNone(self.fire(scheduled_task(unit='s'), -1, 60))
+
+
+class SpreadOffsetTest(SimpleTestCase):
+
+    def test_stable_and_within_window(self):
+        from api_test.common.scheduler import spread_offset
+        with self.settings(SCHEDULER_SPREAD_WINDOW=120):
+            offsets = [spread_offset(i) for i in range(1, 1201)]
+            self.assertEqual(offsets, [spread_offset(i) for i in range(1, 1201)])
+        self.assertTrue(all(0 <= i < 120 for i in offsets))
+        # 按任务ID均匀分散，每10秒内的任务数不超过平均值的两倍
+        buckets = [0] * 12
+        for i in offsets:
+            buckets[i // 10] += 1
+        self.assertLess(max(buckets), 200)
+
+    def test_period_and_disabled(self):
+        from api_test.common.scheduler import spread_offset, task_offset
+        with self.settings(SCHEDULER_SPREAD_WINDOW=600):
+            self.assertTrue(all(spread_offset(i, 60) < 60 for i in range(1, 200)))
+            self.assertEqual(spread_offset(None), 0)
+            self.assertLess(task_offset(scheduled_task(id=3, frequency=1, unit='m')).total_seconds(), 60)
+        with self.settings(SCHEDULER_SPREAD_WINDOW=0):
+            self.assertEqual(spread_offset(5), 0)
+
+
+class RunQueueTest(TestCase):
+
+    def setUp(self):
+        from api_test.models import AutomationTestTask, GlobalHost
+        api = create_case_api()
+        self.project = api.automationTestCase.project
+        self.host = GlobalHost.objects.create(project=self.project, name='h', host='127.0.0.1')
+        self.start = datetime.datetime.now().replace(microsecond=0) - datetime.timedelta(hours=1)
+        self.task = AutomationTestTask.objects.create(project=self.project, Host=self.host, name='t', type='timing',
+                                                      startTime=self.start,
+                                                      endTime=self.start + datetime.timedelta(days=1))
+
+    def test_due_applies_spread_offset(self):
+        from api_test.common.scheduler import Scheduler, task_offset
+        with self.settings(SCHEDULER_SPREAD_WINDOW=3600):
+            offset = task_offset(self.task)
+            scheduler = Scheduler(workers=1)
+            scheduler.checked = self.start - datetime.timedelta(seconds=1)
+            self.assertEqual(scheduler.due(self.start + offset - datetime.timedelta(seconds=1)), [])
+            self.assertEqual(scheduler.due(self.start + offset), [(self.task, self.start + offset)])
+            scheduler.executor.shutdown()
+
+    def test_global_cap_and_queue_delay(self):
+        from api_test.common.run_queue import at_capacity, claim, enqueue
+        from api_test.models import AutomationRunQueue, GlobalHost
+        other = GlobalHost.objects.create(project=self.project, name='h2', host='127.0.0.1')
+        with self.settings(RUN_MAX_CONCURRENT=1):
+            first = enqueue(self.project.id, self.host.id, task=self.task,
+                            scheduled=datetime.datetime.now() - datetime.timedelta(seconds=30))
+            second = enqueue(self.project.id, other.id)
+            entry = claim()
+            self.assertEqual(entry.id, first.id)
+            self.assertAlmostEqual(entry.queueDelay, 30, delta=2)
+            self.assertTrue(at_capacity())
+            self.assertIsNone(claim())
+            AutomationRunQueue.objects.filter(id=first.id).update(status='finished')
+            self.assertEqual(claim().id, second.id)
+        with self.settings(RUN_MAX_CONCURRENT=0):
+            self.assertFalse(at_capacity())
+
+
+class LoadTaskTest(TestCase):
+
+    def setUp(self):
+        from api_test.models import AutomationTestCase, GlobalHost
+        api = create_case_api()
+        self.project = api.automationTestCase.project
+        self.host = GlobalHost.objects.create(project=self.project, name='h', host='127.0.0.1')
+        self.case = AutomationTestCase.objects.create(project=self.project, caseName='empty',
+                                                      user=self.project.user)
+
+    def run_in_thread(self, func, timeout=5):
+        thread = threading.Thread(target=func, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive(), '压测未结束')
+
+    def test_empty_case_with_duration(self):
+        from api_test.common.load_test import load_task
+        from api_test.models import AutomationLoadTestResult
+        start = time.perf_counter()
+        run = load_task(self.host.id, self.project.id, self.case.id, 3, duration=60)
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual((run.virtualUsers, run.duration, run.iterations), (3, 60, None))
+        self.assertFalse(AutomationLoadTestResult.objects.filter(run=run).exists())
+
+    def test_user_stops_at_deadline(self):
+        from api_test.common.load_test import LoadRunner
+        runner = LoadRunner(self.host, self.case.id, 1, duration=1)
+        output = []
+        self.run_in_thread(lambda: runner._user(time.perf_counter() + 0.2, output))
+        self.assertEqual(len(output), 1)
+
+
+class RawParameterTest(TestCase):
+
+    def test_code_is_not_executed(self):
+        import tempfile
+        from api_test.common.confighttp import test_api
+        from api_test.models import AutomationParameterRaw, AutomationTestResult, GlobalHost
+        api = create_case_api()
+        api.requestParameterType = 'raw'
+        api.save()
+        project = api.automationTestCase.project
+        host = GlobalHost.objects.create(project=project, name='h', host='127.0.0.1')
+        marker = os.path.join(tempfile.mkdtemp(), 'executed')
+        AutomationParameterRaw.objects.create(automationCaseApi=api,
+                                              data='__import__("os").mkdir(%r)' % marker)
+        self.assertEqual(test_api(host.id, api.automationTestCase.id, project.id, api.id), 'fail')
+        self.assertFalse(os.path.exists(marker))
+        self.assertEqual(AutomationTestResult.objects.get(automationCaseApi=api).result, 'ERROR')
@@ -57,14 +57,19 @@ urlpatterns = [
     url(r'automation/update_api', Case.UpdateApi.as_view()),
     url(r'automation/del_api', Case.DelApi.as_view()),
     url(r'automation/start_test', Case.StartTest.as_view()),
+    url(r'automation/rerun_failed', Case.RerunFailed.as_view()),
     url(r'automation/add_time_task', Case.AddTimeTask.as_view()),
     url(r'automation/get_time_task', Case.GetTask.as_view()),
+    url(r'automation/task_list', Case.TaskList.as_view()),
     url(r'automation/del_task', Case.DelTask.as_view()),
     url(r'automation/look_result', Case.LookResult.as_view()),
     url(r'automation/test_report', Case.TestReport.as_view()),
     url(r'report/auto_test_report', Report.AutoTestReport.as_view()),
+    url(r'report/auto_test_result', Report.AutoTestResult.as_view()),
     url(r'report/test_time', Report.TestTime.as_view()),
     url(r'report/lately_ten', Report.AutoLatelyTenTime.as_view()),
+    url(r'report/load_test', Report.LoadTestReport.as_view()),
+    url(r'report/latency_trend', Report.ApiLatencyTrend.as_view()),
     url(r'member/project_member', member.ProjectMemberList.as_view()),
     url(r'member/email_config', member.EmailConfig.as_view()),
     url(r'member/del_email', member.DelEmail.as_view()),